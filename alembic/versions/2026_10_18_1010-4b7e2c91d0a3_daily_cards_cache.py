@@ -0,0 +1,37 @@
+"""daily cards cache
+
+Revision ID: 4b7e2c91d0a3
+Revises: 702eca23867a
+Create Date: 2026-10-18 10:10:42.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b7e2c91d0a3'
+down_revision: Union[str, Sequence[str], None] = '702eca23867a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_cards',
+    sa.Column('card_date', sa.Date(), nullable=False),
+    sa.Column('arcana', sa.Integer(), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('file_id', sa.String(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_daily_cards')),
+    sa.UniqueConstraint('card_date', 'arcana', name='uq_daily_card')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_cards')
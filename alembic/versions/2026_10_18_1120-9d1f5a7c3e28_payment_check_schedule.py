@@ -0,0 +1,30 @@
+"""payment check schedule
+
+Revision ID: 9d1f5a7c3e28
+Revises: 4b7e2c91d0a3
+Create Date: 2026-10-18 11:20:07.514903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d1f5a7c3e28'
+down_revision: Union[str, Sequence[str], None] = '4b7e2c91d0a3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('payments', sa.Column('next_check_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False))
+    op.add_column('payments', sa.Column('check_attempts', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('payments', 'check_attempts')
+    op.drop_column('payments', 'next_check_at')
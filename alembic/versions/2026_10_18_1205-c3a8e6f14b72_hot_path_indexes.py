@@ -0,0 +1,59 @@
+"""hot path indexes
+
+Revision ID: c3a8e6f14b72
+Revises: 9d1f5a7c3e28
+Create Date: 2026-10-18 12:05:31.902144
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a8e6f14b72'
+down_revision: Union[str, Sequence[str], None] = '9d1f5a7c3e28'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+#  (name, table, columns, partial condition)
+INDEXES = [
+    ('ix_payments_pending_next_check_at', 'payments', ['next_check_at'], "status = 'pending'"),
+    ('ix_payments_user_id', 'payments', ['user_id'], None),
+    ('ix_payments_created_at', 'payments', ['created_at'], None),
+    ('ix_generation_history_user_id', 'generation_history', ['user_id'], None),
+    ('ix_generation_history_created_at', 'generation_history', ['created_at'], None),
+    ('ix_users_referred_id', 'users', ['referred_id'], None),
+    ('ix_users_created_at', 'users', ['created_at'], None),
+    ('ix_users_last_updated', 'users', ['last_updated'], None),
+]
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    #  CONCURRENTLY не блокирует запись в таблицы, но не работает внутри транзакции
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name=table,
+                postgresql_concurrently=True,
+                if_exists=True,
+            )
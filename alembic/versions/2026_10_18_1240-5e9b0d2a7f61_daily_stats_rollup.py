@@ -0,0 +1,55 @@
+"""daily stats rollup
+
+Revision ID: 5e9b0d2a7f61
+Revises: c3a8e6f14b72
+Create Date: 2026-10-18 12:40:18.220671
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9b0d2a7f61'
+down_revision: Union[str, Sequence[str], None] = 'c3a8e6f14b72'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('metric', sa.String(), nullable=False),
+    sa.Column('value', sa.BigInteger(), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_daily_stats')),
+    sa.UniqueConstraint('day', 'metric', name='uq_daily_stat')
+    )
+
+    #  Заполняем сводку по уже накопленной истории
+    op.execute("""
+        INSERT INTO daily_stats (day, metric, value)
+        SELECT created_at::date, 'users_new', count(*)
+        FROM users GROUP BY 1
+        UNION ALL
+        SELECT created_at::date, 'generations', count(*)
+        FROM generation_history GROUP BY 1
+        UNION ALL
+        SELECT created_at::date, 'generations:' || (request ->> 'job'), count(*)
+        FROM generation_history WHERE request ->> 'job' IS NOT NULL GROUP BY 1, 2
+        UNION ALL
+        SELECT coalesce(completed_at, created_at)::date, 'payments_completed', count(*)
+        FROM payments WHERE status = 'completed' GROUP BY 1
+        UNION ALL
+        SELECT coalesce(completed_at, created_at)::date, 'payments_rub', sum(rub_amount)
+        FROM payments WHERE status = 'completed' GROUP BY 1
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_stats')
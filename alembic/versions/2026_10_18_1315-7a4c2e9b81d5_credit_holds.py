@@ -0,0 +1,43 @@
+"""credit holds
+
+Revision ID: 7a4c2e9b81d5
+Revises: 5e9b0d2a7f61
+Create Date: 2026-10-18 13:15:44.108352
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a4c2e9b81d5'
+down_revision: Union[str, Sequence[str], None] = '5e9b0d2a7f61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('credit_holds',
+    sa.Column('user_id', sa.BigInteger(), nullable=False),
+    sa.Column('amount', sa.Integer(), nullable=False),
+    sa.Column('purpose', sa.String(), nullable=False),
+    sa.Column('status', sa.Enum('held', 'captured', 'released', name='credit_hold_status_enum'), nullable=False),
+    sa.Column('expires_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], name=op.f('fk_credit_holds_user_id_users'), ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_credit_holds'))
+    )
+    op.create_index('uq_credit_holds_active', 'credit_holds', ['user_id', 'purpose'], unique=True, postgresql_where=sa.text("status = 'held'"))
+    op.create_index('ix_credit_holds_held_expires_at', 'credit_holds', ['expires_at'], unique=False, postgresql_where=sa.text("status = 'held'"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_credit_holds_held_expires_at', table_name='credit_holds')
+    op.drop_index('uq_credit_holds_active', table_name='credit_holds')
+    op.drop_table('credit_holds')
+    sa.Enum(name='credit_hold_status_enum').drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,37 @@
+"""telegram updates inbox
+
+Revision ID: b81d3f6e2c47
+Revises: e2f7b4c19a06
+Create Date: 2026-10-18 14:25:37.918402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b81d3f6e2c47'
+down_revision: Union[str, Sequence[str], None] = 'e2f7b4c19a06'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('telegram_updates',
+    sa.Column('update_id', sa.BigInteger(), nullable=False),
+    sa.Column('chat_id', sa.BigInteger(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_telegram_updates')),
+    sa.UniqueConstraint('update_id', name=op.f('uq_telegram_updates_update_id'))
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('telegram_updates')
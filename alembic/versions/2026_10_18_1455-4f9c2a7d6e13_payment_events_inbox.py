@@ -0,0 +1,42 @@
+"""payment events inbox
+
+Revision ID: 4f9c2a7d6e13
+Revises: b81d3f6e2c47
+Create Date: 2026-10-18 14:55:09.227615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4f9c2a7d6e13'
+down_revision: Union[str, Sequence[str], None] = 'b81d3f6e2c47'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('payment_events',
+    sa.Column('payment_id', sa.String(), nullable=False),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=False),
+    sa.Column('attempts', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('locked_until', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('processed_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_payment_events')),
+    sa.UniqueConstraint('payment_id', 'status', name='uq_payment_event')
+    )
+    op.create_index('ix_payment_events_unprocessed', 'payment_events', ['id'], unique=False, postgresql_where=sa.text('processed_at IS NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_payment_events_unprocessed', table_name='payment_events')
+    op.drop_table('payment_events')
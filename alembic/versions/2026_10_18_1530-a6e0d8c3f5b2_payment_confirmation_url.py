@@ -0,0 +1,28 @@
+"""payment confirmation url
+
+Revision ID: a6e0d8c3f5b2
+Revises: 4f9c2a7d6e13
+Create Date: 2026-10-18 15:30:48.551903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a6e0d8c3f5b2'
+down_revision: Union[str, Sequence[str], None] = '4f9c2a7d6e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('payments', sa.Column('confirmation_url', sa.String(), nullable=True))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('payments', 'confirmation_url')
@@ -0,0 +1,73 @@
+"""users segment counters
+
+Revision ID: 9d2e5c7a1f38
+Revises: a6e0d8c3f5b2
+Create Date: 2026-10-18 16:00:12.804417
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9d2e5c7a1f38'
+down_revision: Union[str, Sequence[str], None] = 'a6e0d8c3f5b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    #  Изменения сегментов пишутся в daily_stats как приращения
+    #  users_segment:<segment>; сумма за всю историю — текущее число
+    #  пользователей в сегменте, без прохода по таблице users
+    op.execute("""
+        CREATE FUNCTION users_segment_stats() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.segment IS NOT NULL THEN
+                INSERT INTO daily_stats (day, metric, value)
+                VALUES (current_date, 'users_segment:' || OLD.segment, -1)
+                ON CONFLICT (day, metric)
+                DO UPDATE SET value = daily_stats.value - 1;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.segment IS NOT NULL THEN
+                INSERT INTO daily_stats (day, metric, value)
+                VALUES (current_date, 'users_segment:' || NEW.segment, 1)
+                ON CONFLICT (day, metric)
+                DO UPDATE SET value = daily_stats.value + 1;
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER users_segment_stats_insert_delete
+        AFTER INSERT OR DELETE ON users
+        FOR EACH ROW EXECUTE FUNCTION users_segment_stats()
+    """)
+    op.execute("""
+        CREATE TRIGGER users_segment_stats_update
+        AFTER UPDATE OF segment ON users
+        FOR EACH ROW WHEN (OLD.segment IS DISTINCT FROM NEW.segment)
+        EXECUTE FUNCTION users_segment_stats()
+    """)
+
+    #  Текущие размеры сегментов. Триггер уже держит блокировку users,
+    #  поэтому параллельные записи не посчитаются дважды
+    op.execute("""
+        INSERT INTO daily_stats (day, metric, value)
+        SELECT current_date, 'users_segment:' || segment, count(*)
+        FROM users WHERE segment IS NOT NULL GROUP BY segment
+        ON CONFLICT (day, metric)
+        DO UPDATE SET value = daily_stats.value + excluded.value
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("DROP TRIGGER users_segment_stats_update ON users")
+    op.execute("DROP TRIGGER users_segment_stats_insert_delete ON users")
+    op.execute("DROP FUNCTION users_segment_stats()")
+    op.execute("DELETE FROM daily_stats WHERE metric LIKE 'users_segment:%'")
@@ -2,8 +2,11 @@
 import os
 import json
 import pathlib
+from datetime import date, datetime
+from typing import Literal
+from zoneinfo import ZoneInfo
 from dotenv import load_dotenv
-from pydantic import Field, BaseModel
+from pydantic import Field, BaseModel, model_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 from aiogram import Bot
@@ -50,6 +53,7 @@ with open(pathlib.Path(__file__).parent / "roles.json", "r") as f:
 class YKPaymentsConfig(BaseModel):
     shop_id: str
     key: str
+    api_url: str = "https://api.yookassa.ru/v3/"
 
 
 class Settings(BaseSettings):
@@ -67,9 +71,81 @@ class Settings(BaseSettings):
     rubles_per_credit: int = 10
     yk: YKPaymentsConfig
 
+    #  Сколько генераций Gemini одновременно допускается в одном процессе
+    google_ai_concurrency: int = 4
+    #  Таймаут одного запроса к Gemini в секундах
+    google_ai_timeout: float = 90.0
+    #  Общий лимит на генерацию изображения со всеми повторами (5 попыток
+    #  по google_ai_timeout без него могли бы занять 7,5 минут)
+    google_ai_deadline: float = 180.0
+    #  Таймаут одного запроса к OpenAI в секундах
+    openai_timeout: float = 120.0
+    #  Запас токенов на рассуждения сверх длины ответа: у reasoning-моделей
+    #  они входят в max_output_tokens
+    openai_reasoning_tokens: int = 4096
+    #  Усилие рассуждений (reasoning.effort). None — значение модели по умолчанию
+    openai_reasoning_effort: Literal["minimal", "low", "medium", "high"] | None = None
+    #  Чат, куда загружаются заранее сгенерированные карты дня ради file_id.
+    #  Если не задан, используется первый разработчик из roles.json
+    daily_card_chat_id: int | None = None
+    #  Часовой пояс бота: по нему считаются «сегодня» и полночь карты дня,
+    #  и он же задаётся сессиям Postgres (current_date в статистике)
+    timezone: str = "Europe/Moscow"
+    #  Перечитывать YAML-карты разборов и образов при их изменении
+    content_hot_reload: bool = False
+    #  Общий бюджет правок анимаций «...» в секунду на весь процесс
+    animation_edits_per_second: float = 20.0
+    #  Расписание проверки платежей: первая задержка, потолок задержки (секунды)
+    payment_check_base_delay: float = 10.0
+    payment_check_max_delay: float = 1800.0
+    #  Через сколько часов неоплаченный платеж считается брошенным и отменяется
+    payment_ttl_hours: float = 24.0
+    #  Сколько минут неоплаченная ссылка на оплату выдаётся повторно
+    #  при выборе того же тарифа вместо создания нового платежа
+    payment_checkout_ttl_minutes: float = 30.0
+    #  Через сколько секунд неподтверждённый резерв энергии возвращается на баланс.
+    #  Если не задан, выводится из таймаутов генерации (см. _derive_credit_hold_ttl)
+    credit_hold_ttl: float | None = None
+    #  Где хранить состояния FSM: "postgres" переживает рестарт, "memory" нет
+    fsm_storage: Literal["postgres", "memory"] = "postgres"
+    #  Через сколько дней без изменений состояние FSM удаляется из БД
+    fsm_state_ttl_days: int = 30
+    #  Лимиты хранилища "memory": максимум ключей и TTL без обращений (секунды)
+    fsm_memory_max_entries: int = 100_000
+    fsm_memory_ttl: float = 86400.0
+    #  Публичный HTTPS-адрес бота. Если задан, апдейты принимаются вебхуком
+    #  (/webhook/telegram) вместо long polling
+    webhook_url: str | None = None
+    #  Секрет, который Telegram присылает в X-Telegram-Bot-Api-Secret-Token
+    webhook_secret: str | None = None
+    #  Шард апдейтов этого процесса и общее число процессов в режиме вебхука
+    worker_index: int = 0
+    worker_count: int = 1
+    #  Порт HTTP-сервера (вебхуки, /metrics): процесс worker_index слушает
+    #  http_port + worker_index, чтобы процессы на одном хосте не конфликтовали
+    http_port: int = 8000
+
+    @model_validator(mode="after")
+    def _derive_credit_hold_ttl(self) -> "Settings":
+        """Резерв не должен истечь, пока генерация ещё может завершиться."""
+        if self.credit_hold_ttl is None:
+            #  Худший случай: генерация Gemini до google_ai_deadline и запрос
+            #  OpenAI с 3 попытками SDK (max_retries=2). Удваиваем с запасом
+            worst_case = self.google_ai_deadline + 3 * self.openai_timeout
+            self.credit_hold_ttl = 2 * worst_case
+        return self
+
 
 settings = Settings()
 
+TZ = ZoneInfo(settings.timezone)
+
+
+def today() -> date:
+    """Текущая дата в часовом поясе бота (совпадает с current_date в БД)."""
+    return datetime.now(TZ).date()
+
+
 bot = Bot(
     token=settings.token,
     default=DefaultBotProperties(parse_mode=ParseMode.HTML),
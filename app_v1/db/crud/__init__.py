@@ -1,4 +1,5 @@
 __all__ = (
+    "cache_user",
     "get_user",
     "get_last_added_user",
     "get_last_added_user_id",
@@ -14,17 +15,39 @@ __all__ = (
     "add_entry_to_user_sources",
     "create_payment",
     "get_payment_by_payment_id",
+    "get_open_payment",
+    "get_last_payment_id",
     "update_payment_status",
     "get_pending_payments",
+    "get_pending_payments_by_ids",
+    "reschedule_payment_checks",
+    "settle_payment",
     "create_referral_bonus",
     "get_user_referral_bonuses_total",
     "upsert_user_bonus",
     "add_user_bonus",
     "get_user_bonus_by_name",
     "add_generation",
+    "get_daily_card",
+    "get_daily_card_arcanas",
+    "save_daily_card",
+    "bump_daily_stats",
+    "get_daily_stats_totals",
+    "reserve_credits",
+    "capture_credits",
+    "release_credits",
+    "release_expired_holds",
+    "add_telegram_update",
+    "get_telegram_updates",
+    "delete_telegram_updates",
+    "add_payment_event",
+    "claim_payment_events",
+    "mark_payment_event_processed",
+    "retry_payment_event",
 )
 
 from .users_crud import (
+    cache_user,
     get_user,
     get_last_added_user,
     get_last_added_user_id,
@@ -43,8 +66,13 @@ from .user_source_crud import add_entry_to_user_sources
 from .payment_crud import (
     create_payment,
     get_payment_by_payment_id,
+    get_open_payment,
+    get_last_payment_id,
     update_payment_status,
     get_pending_payments,
+    get_pending_payments_by_ids,
+    reschedule_payment_checks,
+    settle_payment,
 )
 from .ref_bonuses_crud import (
     create_referral_bonus,
@@ -52,3 +80,22 @@ from .ref_bonuses_crud import (
 )
 from .user_bonuses_crud import upsert_user_bonus, add_user_bonus, get_user_bonus_by_name
 from .generations_crud import add_generation
+from .daily_cards_crud import get_daily_card, get_daily_card_arcanas, save_daily_card
+from .daily_stats_crud import bump_daily_stats, get_daily_stats_totals
+from .credit_holds_crud import (
+    reserve_credits,
+    capture_credits,
+    release_credits,
+    release_expired_holds,
+)
+from .telegram_updates_crud import (
+    add_telegram_update,
+    get_telegram_updates,
+    delete_telegram_updates,
+)
+from .payment_events_crud import (
+    add_payment_event,
+    claim_payment_events,
+    mark_payment_event_processed,
+    retry_payment_event,
+)
@@ -0,0 +1,213 @@
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from core.config import settings
+from .users_crud import _sync_balance
+
+logger = logging.getLogger(__name__)
+
+
+#  --------------- RESERVE ---------------
+
+#  Списание с баланса и создание резерва одним запросом. Если денег не хватает,
+#  charged пуст и резерв не создаётся; если у пользователя уже есть активный
+#  резерв на эту фичу, уникальный индекс откатывает весь запрос целиком.
+RESERVE_SQL = text(
+    """
+    WITH charged AS (
+        UPDATE users SET balance = balance - :amount
+        WHERE id = :user_id AND balance >= :amount
+        RETURNING id, balance
+    )
+    INSERT INTO credit_holds (user_id, amount, purpose, status, expires_at)
+    SELECT id, :amount, :purpose, 'held', now() + make_interval(secs => :ttl)
+    FROM charged
+    RETURNING id, (SELECT balance FROM charged) AS balance
+    """
+)
+
+
+async def reserve_credits(
+    *,
+    user_id: int,
+    amount: int,
+    purpose: str,
+    session: AsyncSession,
+    ttl: float = settings.credit_hold_ttl,
+) -> int | None:
+    """
+    Reserve credits before a paid generation.
+
+    Args:
+        user_id: User ID (pk)
+        amount: Credits to hold
+        purpose: Feature name; one active hold per (user, purpose)
+        session: Database session (committed here)
+        ttl: Seconds until an unsettled hold is released by the sweeper
+
+    Returns:
+        Hold ID, or None if the balance is too low or a hold for the same
+        feature is already active
+    """
+    try:
+        result = await session.execute(
+            RESERVE_SQL,
+            {"user_id": user_id, "amount": amount, "purpose": purpose, "ttl": ttl},
+        )
+        row = result.one_or_none()
+        await session.commit()
+    except IntegrityError:
+        await session.rollback()
+        logger.info(f"User {user_id} already has an active '{purpose}' hold")
+        return None
+
+    if row is None:
+        logger.info(f"User {user_id} has not enough balance for '{purpose}'")
+        return None
+
+    _sync_balance(user_id, row.balance, session)
+    logger.info(f"User {user_id} hold {row.id} -{amount} -> {row.balance}")
+    return row.id
+
+
+#  --------------- CAPTURE ---------------
+
+#  Подтверждение резерва. Если резерв уже вернул сборщик просроченных
+#  (генерация шла дольше credit_hold_ttl), энергия списывается повторно:
+#  результат пользователь получил, бесплатным он быть не должен. Но сборщик
+#  освобождает и уникальный слот (user_id, purpose), так что пользователь мог
+#  уже потратить возвращённую энергию на следующую генерацию. Повторное
+#  списание поэтому делается только при достаточном балансе, иначе резерв
+#  остаётся released и баланс не уходит в минус.
+CAPTURE_SQL = text(
+    """
+    WITH hold AS (
+        SELECT id, user_id, amount, status FROM credit_holds
+        WHERE id = :hold_id AND status IN ('held', 'released')
+        FOR UPDATE
+    ), recharged AS (
+        UPDATE users SET balance = users.balance - hold.amount
+        FROM hold
+        WHERE users.id = hold.user_id AND hold.status = 'released'
+            AND users.balance >= hold.amount
+        RETURNING users.id, users.balance
+    ), captured AS (
+        UPDATE credit_holds SET status = 'captured'
+        FROM hold
+        WHERE credit_holds.id = hold.id
+            AND (hold.status = 'held' OR EXISTS (SELECT 1 FROM recharged))
+        RETURNING credit_holds.id
+    )
+    SELECT hold.status AS previous, hold.user_id, recharged.balance,
+        captured.id IS NOT NULL AS captured
+    FROM hold LEFT JOIN captured ON true LEFT JOIN recharged ON true
+    """
+)
+
+
+async def capture_credits(hold_id: int, session: AsyncSession) -> bool:
+    """
+    Settle a hold after a successful generation.
+
+    A hold that the sweeper already refunded is charged again, so a
+    generation that outlived credit_hold_ttl is still paid for. If the
+    refunded credits were already spent, nothing is charged: the balance
+    never goes negative and the generation is logged as unpaid.
+
+    Returns:
+        False if there is no such hold, it was already captured, or an
+        expired hold could not be charged again
+    """
+    result = await session.execute(CAPTURE_SQL, {"hold_id": hold_id})
+    row = result.one_or_none()
+    await session.commit()
+    if row is None:
+        logger.warning(f"Hold {hold_id} was not active when captured")
+        return False
+
+    if not row.captured:
+        logger.warning(
+            f"Hold {hold_id} expired before capture and user {row.user_id} "
+            f"has not enough balance to pay again, generation left unpaid"
+        )
+        return False
+
+    if row.previous == "released":
+        _sync_balance(row.user_id, row.balance, session)
+        logger.warning(
+            f"Hold {hold_id} expired before capture, "
+            f"user {row.user_id} charged again -> {row.balance}"
+        )
+    return True
+
+
+#  --------------- RELEASE ---------------
+
+
+async def release_credits(hold_id: int, session: AsyncSession) -> int | None:
+    """
+    Return held credits to the balance after a failed generation.
+
+    Returns:
+        New balance, or None if the hold was not active
+    """
+    result = await session.execute(
+        text(
+            """
+            WITH released AS (
+                UPDATE credit_holds SET status = 'released'
+                WHERE id = :hold_id AND status = 'held'
+                RETURNING user_id, amount
+            )
+            UPDATE users SET balance = users.balance + released.amount
+            FROM released
+            WHERE users.id = released.user_id
+            RETURNING users.id, users.balance
+            """
+        ),
+        {"hold_id": hold_id},
+    )
+    row = result.one_or_none()
+    await session.commit()
+    if row is None:
+        return None
+
+    _sync_balance(row.id, row.balance, session)
+    logger.info(f"Hold {hold_id} released, user {row.id} balance -> {row.balance}")
+    return row.balance
+
+
+#  --------------- SWEEP EXPIRED ---------------
+
+
+async def release_expired_holds(session: AsyncSession) -> int:
+    """
+    Release every expired hold and refund the users in one statement.
+
+    Returns:
+        Number of refunded users
+    """
+    result = await session.execute(
+        text(
+            """
+            WITH expired AS (
+                UPDATE credit_holds SET status = 'released'
+                WHERE status = 'held' AND expires_at < now()
+                RETURNING user_id, amount
+            ), refunds AS (
+                SELECT user_id, sum(amount) AS amount
+                FROM expired GROUP BY user_id
+            )
+            UPDATE users SET balance = users.balance + refunds.amount
+            FROM refunds
+            WHERE users.id = refunds.user_id
+            RETURNING users.id
+            """
+        )
+    )
+    refunded = len(result.all())
+    await session.commit()
+    return refunded
@@ -0,0 +1,69 @@
+from datetime import date
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import SQLAlchemyError
+
+from db.models import DailyCard
+
+
+#  --------------- GET DAILY CARD ---------------
+
+
+async def get_daily_card(
+    card_date: date,
+    arcana: int,
+    session: AsyncSession,
+) -> DailyCard | None:
+    """Get cached daily card for the date and main arcana."""
+    stmt = select(DailyCard).where(
+        DailyCard.card_date == card_date, DailyCard.arcana == arcana
+    )
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+#  --------------- GET READY ARCANAS ---------------
+
+
+async def get_daily_card_arcanas(card_date: date, session: AsyncSession) -> set[int]:
+    """Get arcanas that already have a daily card for the date."""
+    stmt = select(DailyCard.arcana).where(DailyCard.card_date == card_date)
+    result = await session.execute(stmt)
+    return set(result.scalars().all())
+
+
+#  --------------- SAVE DAILY CARD ---------------
+
+
+async def save_daily_card(
+    *,
+    card_date: date,
+    arcana: int,
+    text: str,
+    file_id: str,
+    session: AsyncSession,
+    commit: bool = True,
+) -> None:
+    """Save daily card. The first card saved for (date, arcana) wins."""
+    stmt = (
+        insert(DailyCard)
+        .values(
+            card_date=card_date,
+            arcana=arcana,
+            text=text,
+            file_id=file_id,
+        )
+        .on_conflict_do_nothing(index_elements=[DailyCard.card_date, DailyCard.arcana])
+    )
+
+    try:
+        await session.execute(stmt)
+        if commit:
+            await session.commit()
+        else:
+            await session.flush()
+    except SQLAlchemyError:
+        await session.rollback()
+        raise
@@ -0,0 +1,71 @@
+from datetime import date
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import DailyStat
+
+
+#  --------------- BUMP ---------------
+
+
+async def bump_daily_stats(metrics: dict[str, int], session: AsyncSession) -> None:
+    """
+    Add values to today's counters in the caller's transaction.
+
+    Args:
+        metrics: {metric: increment}
+        session: Database session (not committed here)
+    """
+    if not metrics:
+        return
+
+    stmt = insert(DailyStat).values(
+        [
+            {"day": func.current_date(), "metric": metric, "value": value}
+            for metric, value in metrics.items()
+        ]
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DailyStat.day, DailyStat.metric],
+        set_={"value": DailyStat.value + stmt.excluded.value},
+    )
+    await session.execute(stmt)
+
+
+#  --------------- TOTALS FOR A RANGE ---------------
+
+
+async def get_daily_stats_totals(
+    session: AsyncSession,
+    *,
+    start: date | None = None,
+    end: date | None = None,
+    prefix: str | None = None,
+) -> dict[str, int]:
+    """
+    Sum counters over an inclusive date range.
+
+    Args:
+        session: Database session
+        start: First day (None for the beginning of history)
+        end: Last day (None for today)
+        prefix: Only metrics starting with it, e.g. "generations:" for the
+                per-feature breakdown
+
+    Returns:
+        {metric: total}
+    """
+    stmt = select(DailyStat.metric, func.sum(DailyStat.value)).group_by(
+        DailyStat.metric
+    )
+    if start is not None:
+        stmt = stmt.where(DailyStat.day >= start)
+    if end is not None:
+        stmt = stmt.where(DailyStat.day <= end)
+    if prefix is not None:
+        stmt = stmt.where(DailyStat.metric.startswith(prefix))
+
+    result = await session.execute(stmt)
+    return {metric: int(total) for metric, total in result.all()}
@@ -1,8 +1,7 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from core.config import devs
 from db.models import GenerationHistory
-from .users_crud import get_user
+from .daily_stats_crud import bump_daily_stats
 
 
 #  --------------- CREATE ---------------
@@ -14,11 +13,19 @@ async def add_generation(
     commit: bool = True,
     **kwargs,
 ) -> GenerationHistory:
-    """Add a new generation to the database."""
-    user = await get_user(kwargs["user_id"], session)
-    # if user.user_id not in [int(dev) for dev in devs]:
+    """Add a new generation to the database right away.
+
+    Handlers normally go through services.GENERATIONS, which writes in
+    batches; use this only when the row id is needed synchronously.
+    """
     generation = GenerationHistory(**kwargs)
     session.add(generation)
+    #  Дневные счётчики: всего и по фиче (job из запроса)
+    metrics = {"generations": 1}
+    job = (kwargs.get("request") or {}).get("job")
+    if job:
+        metrics[f"generations:{job}"] = 1
+    await bump_daily_stats(metrics, session)
     if commit:
         await session.commit()
     else:
@@ -1,11 +1,14 @@
 import logging
 from datetime import datetime
-from typing import Optional
-from sqlalchemy import select, update, func
+from decimal import Decimal
+from typing import Iterable, Optional
+from sqlalchemy import Row, bindparam, select, text, update, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
 
 from db.models.payment import Payment, PaymentStatus
+from .daily_stats_crud import bump_daily_stats
+from .users_crud import _sync_balance
 
 logger = logging.getLogger(__name__)
 
@@ -17,6 +20,7 @@ async def create_payment(
     amount: int,
     rub_amount: int,
     status: PaymentStatus | None = None,
+    confirmation_url: str | None = None,
     session: AsyncSession,
 ) -> Payment:
     """
@@ -28,6 +32,7 @@ async def create_payment(
         amount: Количество кредитов
         rub_amount: Количество рублей
         status: Статус платежа (по умолчанию "pending")
+        confirmation_url: Ссылка на оплату
         session: Сессия БД
 
     Returns:
@@ -40,6 +45,7 @@ async def create_payment(
             amount=amount,
             rub_amount=rub_amount,
             status=status,
+            confirmation_url=confirmation_url,
         )
         session.add(payment)
         await session.commit()
@@ -70,6 +76,56 @@ async def get_payment_by_payment_id(
     return result.scalar_one_or_none()
 
 
+async def get_open_payment(
+    *,
+    user_id: int,
+    rub_amount: int,
+    created_after: datetime,
+    session: AsyncSession,
+) -> Optional[Payment]:
+    """
+    Получает последний неоплаченный платеж пользователя на ту же сумму.
+
+    Args:
+        user_id: ID пользователя
+        rub_amount: Сумма в рублях
+        created_after: Платежи старше этого времени не переиспользуются
+        session: Сессия БД
+
+    Returns:
+        Платеж со ссылкой на оплату или None
+    """
+    stmt = (
+        select(Payment)
+        .where(
+            Payment.user_id == user_id,
+            Payment.rub_amount == rub_amount,
+            Payment.status == "pending",
+            Payment.confirmation_url.is_not(None),
+            Payment.created_at > created_after,
+        )
+        .order_by(Payment.created_at.desc())
+        .limit(1)
+    )
+    result = await session.execute(stmt)
+    return result.scalar_one_or_none()
+
+
+async def get_last_payment_id(user_id: int, session: AsyncSession) -> int:
+    """
+    Получает id последнего платежа пользователя (0, если платежей не было).
+
+    Args:
+        user_id: ID пользователя
+        session: Сессия БД
+    """
+    stmt = select(func.coalesce(func.max(Payment.id), 0)).where(
+        Payment.user_id == user_id
+    )
+    result = await session.execute(stmt)
+    return result.scalar_one()
+
+
 async def update_payment_status(
     *,
     payment_id: str,
@@ -95,6 +151,12 @@ async def update_payment_status(
         if not payment:
             return None
 
+        if status == "completed" and payment.status != "completed":
+            await bump_daily_stats(
+                {"payments_completed": 1, "payments_rub": payment.rub_amount},
+                session,
+            )
+
         payment.status = status
         if completed_at:
             payment.completed_at = completed_at
@@ -123,16 +185,180 @@ async def update_payment_status(
 
 async def get_pending_payments(
     session: AsyncSession,
+    limit: int = 100,
 ) -> list[Payment]:
     """
-    Получает все платежи со статусом "pending".
+    Получает платежи со статусом "pending", время проверки которых наступило.
 
     Args:
         session: Сессия БД
+        limit: Максимум платежей за один цикл опроса
 
     Returns:
-        Список платежей со статусом "pending"
+        Список платежей, самые просроченные первыми
     """
-    stmt = select(Payment).where(Payment.status == "pending")
+    stmt = (
+        select(Payment)
+        .where(Payment.status == "pending", Payment.next_check_at <= func.now())
+        .order_by(Payment.next_check_at)
+        .limit(limit)
+    )
     result = await session.execute(stmt)
     return list(result.scalars().all())
+
+
+async def get_pending_payments_by_ids(
+    payment_ids: Iterable[str],
+    session: AsyncSession,
+    statuses: Iterable[PaymentStatus] = ("pending",),
+) -> list[Payment]:
+    """
+    Получает незавершённые платежи из списка ID одним запросом.
+
+    Args:
+        payment_ids: ID платежей от YooKassa
+        session: Сессия БД
+        statuses: Какие локальные статусы считать незавершёнными. Сверка
+                  добавляет "canceled": платеж, отменённый у нас по TTL,
+                  в YooKassa ещё может пройти
+
+    Returns:
+        Платежи с одним из статусов, чьи ID есть в списке
+    """
+    payment_ids = list(payment_ids)
+    if not payment_ids:
+        return []
+
+    stmt = select(Payment).where(
+        Payment.status.in_(list(statuses)), Payment.payment_id.in_(payment_ids)
+    )
+    result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def reschedule_payment_checks(
+    schedule: Iterable[tuple[int, datetime]],
+    session: AsyncSession,
+) -> None:
+    """
+    Переносит следующую проверку ожидающих платежей одним UPDATE по id.
+
+    Работает через Core, а не через ORM-объекты: расписание пишется
+    отдельной короткой транзакцией и не зависит от сессий, в которых
+    платежи обрабатывались.
+
+    Args:
+        schedule: Пары (id платежа, время следующей проверки)
+        session: Сессия БД
+    """
+    params = [{"b_id": id, "b_next_check_at": at} for id, at in schedule]
+    if not params:
+        return
+
+    payments = Payment.__table__
+    stmt = (
+        update(payments)
+        .where(payments.c.id == bindparam("b_id"), payments.c.status == "pending")
+        .values(
+            next_check_at=bindparam("b_next_check_at"),
+            check_attempts=payments.c.check_attempts + 1,
+        )
+    )
+    await session.execute(stmt, params)
+    await session.commit()
+
+
+#  --------------- SETTLE ---------------
+
+#  Вся обработка успешного платежа одним запросом. Первая CTE меняет статус
+#  только у ещё не завершённого платежа и блокирует строку: если вебхук и
+#  поллер гонятся за одним платежом, второй запрос дождётся первого, не найдёт
+#  строку и ничего не начислит. :bonus_percent приводится к numeric явно:
+#  рядом с целым amount asyncpg иначе выведет для него тип integer.
+SETTLE_PAYMENT_SQL = text(
+    """
+    WITH settled AS (
+        UPDATE payments SET status = 'completed', completed_at = now()
+        WHERE payment_id = :payment_id AND status <> 'completed'
+        RETURNING id, user_id, amount, rub_amount
+    ), credited AS (
+        UPDATE users SET balance = users.balance + settled.amount, segment = 'client'
+        FROM settled
+        WHERE users.id = settled.user_id
+        RETURNING users.id, users.user_id, users.referred_id, users.balance
+    ), referrer AS (
+        SELECT users.id, users.user_id
+        FROM users JOIN credited ON users.id = credited.referred_id
+        WHERE users.id <> credited.id
+    ), bonus AS (
+        INSERT INTO referral_bonuses (
+            ref_id, referred_user_id, referrer_user_id, bonus_type, amount,
+            deposit_rub_amount, deposit_token_amount, pay_id
+        )
+        SELECT referrer.id, referrer.user_id, credited.user_id, 'deposit',
+               ceil(settled.amount * CAST(:bonus_percent AS numeric))::int,
+               settled.rub_amount, settled.amount, settled.id
+        FROM settled, credited, referrer
+        WHERE ceil(settled.amount * CAST(:bonus_percent AS numeric)) > 0
+        RETURNING ref_id, amount
+    ), referrer_credited AS (
+        UPDATE users SET balance = users.balance + bonus.amount
+        FROM bonus
+        WHERE users.id = bonus.ref_id
+        RETURNING users.id
+    ), stats AS (
+        INSERT INTO daily_stats (day, metric, value)
+        SELECT current_date, m.metric, m.value
+        FROM settled, LATERAL (
+            VALUES ('payments_completed', 1::bigint),
+                   ('payments_rub', settled.rub_amount::bigint)
+        ) AS m (metric, value)
+        ON CONFLICT (day, metric)
+        DO UPDATE SET value = daily_stats.value + EXCLUDED.value
+    )
+    SELECT credited.id AS user_id, credited.user_id AS telegram_id,
+           credited.balance,
+           (SELECT bonus.amount FROM bonus) AS bonus_amount,
+           (SELECT bonus.ref_id FROM bonus) AS referrer_id
+    FROM credited
+    """
+)
+
+
+async def settle_payment(
+    *,
+    payment_id: str,
+    bonus_percent: float,
+    session: AsyncSession,
+) -> Optional[Row]:
+    """
+    Завершает успешный платеж одним запросом и коммитит транзакцию.
+
+    Отмечает платеж completed, начисляет энергию, переводит пользователя в
+    сегмент client, начисляет реферальный бонус пригласившему и обновляет
+    дневную статистику. Идемпотентно по payment_id.
+
+    Args:
+        payment_id: ID платежа от YooKassa
+        bonus_percent: Доля реферального бонуса от суммы в энергии
+        session: Сессия БД
+
+    Returns:
+        Строка (user_id, telegram_id, balance, bonus_amount, referrer_id)
+        или None, если платеж уже был завершен
+    """
+    try:
+        result = await session.execute(
+            SETTLE_PAYMENT_SQL,
+            {"payment_id": payment_id, "bonus_percent": Decimal(str(bonus_percent))},
+        )
+        row = result.one_or_none()
+        await session.commit()
+    except SQLAlchemyError as e:
+        await session.rollback()
+        logger.error(f"Error settling payment {payment_id}: {e}")
+        raise
+
+    if row is not None:
+        _sync_balance(row.user_id, row.balance, session)
+    return row
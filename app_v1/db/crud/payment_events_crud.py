@@ -0,0 +1,97 @@
+from datetime import timedelta
+from typing import Any, Sequence
+
+from sqlalchemy import func, or_, select, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import PaymentEvent
+
+
+#  --------------- ADD ---------------
+
+
+async def add_payment_event(
+    *, payment_id: str, status: str, payload: dict[str, Any], session: AsyncSession
+) -> bool:
+    """
+    Store a webhook notification in one statement (duplicates are ignored).
+
+    Returns:
+        True if the event is new
+    """
+    stmt = (
+        insert(PaymentEvent)
+        .values(payment_id=payment_id, status=status, payload=payload)
+        .on_conflict_do_nothing(constraint="uq_payment_event")
+        .returning(PaymentEvent.id)
+    )
+    result = await session.execute(stmt)
+    await session.commit()
+    return result.scalar_one_or_none() is not None
+
+
+#  --------------- CLAIM ---------------
+
+
+async def claim_payment_events(
+    session: AsyncSession, *, limit: int = 50, lease: timedelta
+) -> Sequence[PaymentEvent]:
+    """
+    Take a batch of unprocessed events for `lease` and commit.
+
+    Rows locked by another consumer are skipped (FOR UPDATE SKIP LOCKED);
+    events of a consumer that died mid-batch come back once the lease ends.
+    """
+    claimable = (
+        select(PaymentEvent.id)
+        .where(
+            PaymentEvent.processed_at.is_(None),
+            or_(
+                PaymentEvent.locked_until.is_(None),
+                PaymentEvent.locked_until < func.now(),
+            ),
+        )
+        .order_by(PaymentEvent.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(PaymentEvent)
+        .where(PaymentEvent.id.in_(claimable.scalar_subquery()))
+        .values(locked_until=func.now() + lease)
+        .returning(PaymentEvent)
+        .execution_options(synchronize_session=False)
+    )
+    result = await session.execute(stmt)
+    events = result.scalars().all()
+    await session.commit()
+    return sorted(events, key=lambda event: event.id)
+
+
+#  --------------- RESULT ---------------
+
+
+async def mark_payment_event_processed(event_id: int, session: AsyncSession) -> None:
+    """Mark an event as handled."""
+    await session.execute(
+        update(PaymentEvent)
+        .where(PaymentEvent.id == event_id)
+        .values(processed_at=func.now(), locked_until=None)
+    )
+    await session.commit()
+
+
+async def retry_payment_event(
+    event_id: int, delay: timedelta, session: AsyncSession
+) -> None:
+    """Count a failed attempt and postpone the event by `delay`."""
+    await session.execute(
+        update(PaymentEvent)
+        .where(PaymentEvent.id == event_id)
+        .values(
+            attempts=PaymentEvent.attempts + 1,
+            locked_until=func.now() + delay,
+        )
+    )
+    await session.commit()
@@ -0,0 +1,77 @@
+from typing import Any, Iterable, Sequence
+
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from db.models import TelegramUpdate
+
+
+#  --------------- ADD ---------------
+
+
+async def add_telegram_update(
+    update_id: int, chat_id: int, payload: dict[str, Any], session: AsyncSession
+) -> bool:
+    """
+    Store an incoming webhook update (Telegram retries are ignored).
+
+    Returns:
+        True if the update is new
+    """
+    stmt = (
+        insert(TelegramUpdate)
+        .values(update_id=update_id, chat_id=chat_id, payload=payload)
+        .on_conflict_do_nothing(index_elements=[TelegramUpdate.update_id])
+        .returning(TelegramUpdate.id)
+    )
+    result = await session.execute(stmt)
+    await session.commit()
+    return result.scalar_one_or_none() is not None
+
+
+#  --------------- GET ---------------
+
+
+async def get_telegram_updates(
+    session: AsyncSession,
+    *,
+    shard: int,
+    shards: int,
+    exclude: Iterable[int] = (),
+    limit: int = 100,
+) -> Sequence[TelegramUpdate]:
+    """
+    Oldest stored updates of one shard (abs(chat_id) % shards == shard).
+
+    Args:
+        session: Database session
+        shard: Shard owned by this process
+        shards: Total number of shards
+        exclude: Row ids already taken by this process
+        limit: Max rows
+    """
+    stmt = (
+        select(TelegramUpdate)
+        .where(func.abs(TelegramUpdate.chat_id) % shards == shard)
+        .order_by(TelegramUpdate.update_id)
+        .limit(limit)
+    )
+    exclude = list(exclude)
+    if exclude:
+        stmt = stmt.where(TelegramUpdate.id.not_in(exclude))
+
+    result = await session.execute(stmt)
+    return result.scalars().all()
+
+
+#  --------------- DELETE ---------------
+
+
+async def delete_telegram_updates(ids: Iterable[int], session: AsyncSession) -> None:
+    """Delete processed updates."""
+    ids = list(ids)
+    if not ids:
+        return
+    await session.execute(delete(TelegramUpdate).where(TelegramUpdate.id.in_(ids)))
+    await session.commit()
@@ -1,14 +1,46 @@
 import logging
-from sqlalchemy import select, update, func
+from sqlalchemy import select, update, func, literal_column
 from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import DBAPIError, SQLAlchemyError
+from sqlalchemy.orm.attributes import set_committed_value
 
 from db.models import User
+from .daily_stats_crud import bump_daily_stats
 
 logger = logging.getLogger(__name__)
 
 
+#  --------------- REQUEST-SCOPED CACHE ---------------
+
+
+def cache_user(user: User | None, session: AsyncSession) -> None:
+    """
+    Remember the update's user for the lifetime of the session.
+
+    UserMiddleware calls this once per update; lookups by Telegram ID
+    below return the cached object instead of querying again.
+    """
+    if user is None:
+        session.info.pop("user", None)
+    else:
+        session.info["user"] = user
+
+
+def _cached_user(tg_id: int, session: AsyncSession) -> User | None:
+    user = session.info.get("user")
+    if user is not None and user.user_id == tg_id:
+        return user
+    return None
+
+
+def _sync_balance(id: int, balance: int | None, session: AsyncSession) -> None:
+    """Keep the cached user's balance equal to the value RETURNING gave us."""
+    user = session.info.get("user")
+    if balance is not None and user is not None and user.id == id:
+        set_committed_value(user, "balance", balance)
+
+
 async def get_user(id: int, session: AsyncSession | None = None) -> User | None:
     """
     Get user by ID.
@@ -20,9 +52,8 @@ async def get_user(id: int, session: AsyncSession | None = None) -> User | None:
     Returns:
         User object or None
     """
-    stmt = select(User).where(User.id == id)
-    result = await session.execute(stmt)
-    return result.scalar_one_or_none()
+    #  Identity map first: no query if the user is already loaded
+    return await session.get(User, id)
 
 
 #  --------------- GET LAST ADDED USER ---------------
@@ -80,12 +111,16 @@ async def upsert_user(
                 # anything else you want to update
             },
         )
-        .returning(User)
+        #  xmax = 0 только у только что вставленной строки
+        .returning(User, literal_column("(xmax = 0)").label("inserted"))
     )
 
     result = await session.execute(stmt)
-    user = result.scalar_one_or_none()
+    user, inserted = result.one()
+    if inserted:
+        await bump_daily_stats({"users_new": 1}, session)
     await session.commit()
+    cache_user(user, session)
     return user
 
 
@@ -122,6 +157,10 @@ async def update_user_info(
 
 async def get_user_by_telegram_id(tg_id: int, session: AsyncSession) -> User | None:
     """Get user by Telegram ID."""
+    cached = _cached_user(tg_id, session)
+    if cached is not None:
+        return cached
+
     stmt = select(User).where(User.user_id == tg_id)
     result = await session.execute(stmt)
     return result.scalar_one_or_none()
@@ -138,6 +177,10 @@ async def get_user_balance(
         logger.error("Session is required for get_user_balance")
         return None
 
+    cached = _cached_user(user_id, session)
+    if cached is not None:
+        return cached.balance
+
     stmt = select(User.balance).where(User.user_id == user_id)
     result = await session.execute(stmt)
     return result.scalar_one_or_none()
@@ -167,6 +210,7 @@ async def decrease_user_balance(
 
     if new_balance is not None:
         await session.commit()
+        _sync_balance(user_id, new_balance, session)
 
     logger.info(f"User {user_id} balance -{amount} -> {new_balance}")
 
@@ -198,6 +242,7 @@ async def increase_user_balance(
     else:
         await session.flush()
     new_balance = result.scalar_one_or_none()
+    _sync_balance(user_id, new_balance, session)
 
     logger.info(f"User {user_id} balance +{amount} -> {new_balance}")
 
@@ -227,6 +272,7 @@ async def change_user_balance(
     else:
         await session.flush()
     new_balance = result.scalar_one_or_none()
+    _sync_balance(user_id, new_balance, session)
     logger.info(f"User {user_id} balance {amount} -> {new_balance}")
 
     return new_balance
@@ -18,6 +18,8 @@ engine = create_async_engine(
     pool_timeout=30,  # Seconds to wait before giving up on getting a connection
     pool_recycle=3600,  # Recycle connections after 1 hour
     pool_pre_ping=True,  # Verify connections before using them
+    # current_date in SQL must match core.config.today()
+    connect_args={"server_settings": {"timezone": settings.timezone}},
 )
 
 # Create session factory
@@ -30,6 +32,19 @@ AsyncSessionLocal = async_sessionmaker(
 )
 
 
+async def release_connection(session: AsyncSession) -> None:
+    """Return the session's pooled connection before a long external await.
+
+    AsyncSession checks a connection out lazily on the first query and holds
+    it until the transaction ends. Committing ends the transaction and gives
+    the connection back to the pool; with expire_on_commit=False loaded
+    objects stay usable and the next query simply checks out a new one.
+    Call this right before waiting on OpenAI / Gemini.
+    """
+    if session.in_transaction():
+        await session.commit()
+
+
 async def get_db_session():
     """Get database session generator."""
     async with AsyncSessionLocal() as session:
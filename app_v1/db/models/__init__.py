@@ -7,6 +7,12 @@ __all__ = (
     "Payment",
     "ReferralBonus",
     "GenerationHistory",
+    "DailyCard",
+    "DailyStat",
+    "CreditHold",
+    "FsmState",
+    "TelegramUpdate",
+    "PaymentEvent",
 )
 
 from .base import Base
@@ -16,3 +22,9 @@ from .user_source import UserSource
 from .payment import Payment
 from .referral_bonus import ReferralBonus
 from .generation_history import GenerationHistory
+from .daily_card import DailyCard
+from .daily_stat import DailyStat
+from .credit_hold import CreditHold
+from .fsm_state import FsmState
+from .telegram_update import TelegramUpdate
+from .payment_event import PaymentEvent
@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import Literal
+
+from sqlalchemy import BigInteger, DateTime, Enum, ForeignKey, Index, String, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.models.base import Base
+
+HoldStatus = Literal["held", "captured", "released"]
+
+
+#  Резерв энергии на время генерации: списывается до вызова AI,
+#  затем подтверждается (captured) или возвращается на баланс (released)
+class CreditHold(Base):
+    """Credit reservation model."""
+
+    __tablename__ = "credit_holds"
+
+    __table_args__ = (
+        #  Не больше одного активного резерва на пользователя и фичу:
+        #  повторное нажатие кнопки не запустит вторую платную генерацию
+        Index(
+            "uq_credit_holds_active",
+            "user_id",
+            "purpose",
+            unique=True,
+            postgresql_where=text("status = 'held'"),
+        ),
+        #  Для автоматического возврата просроченных резервов
+        Index(
+            "ix_credit_holds_held_expires_at",
+            "expires_at",
+            postgresql_where=text("status = 'held'"),
+        ),
+    )
+
+    #  ID пользователя
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE")
+    )
+    #  Сколько энергии зарезервировано
+    amount: Mapped[int]
+    #  Для чего резерв (readings, ai_portraits, daily_card, follow_up)
+    purpose: Mapped[str] = mapped_column(String)
+    #  held - удерживается, captured - списан, released - возвращен
+    status: Mapped[HoldStatus] = mapped_column(
+        Enum("held", "captured", "released", name="credit_hold_status_enum"),
+        default="held",
+    )
+    #  После этого времени резерв возвращается на баланс автоматически
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True))
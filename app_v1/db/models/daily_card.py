@@ -0,0 +1,24 @@
+from datetime import date
+
+from sqlalchemy import Date, Text, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.models.base import Base
+
+
+#  Готовая карта дня: одна на каждый (дата, центральный аркан)
+class DailyCard(Base):
+    """Daily card cache model."""
+
+    __tablename__ = "daily_cards"
+
+    __table_args__ = (UniqueConstraint("card_date", "arcana", name="uq_daily_card"),)
+
+    #  Дата, на которую сгенерирована карта
+    card_date: Mapped[date] = mapped_column(Date())
+    #  Номер центрального аркана (1-22)
+    arcana: Mapped[int]
+    #  Текст карты от ChatGPT (уже экранирован для HTML)
+    text: Mapped[str] = mapped_column(Text)
+    #  Telegram file_id загруженного изображения
+    file_id: Mapped[str]
@@ -0,0 +1,24 @@
+from datetime import date
+
+from sqlalchemy import BigInteger, Date, String, UniqueConstraint
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.models.base import Base
+
+
+#  Дневной счётчик метрики: одна строка на каждую пару (день, метрика)
+class DailyStat(Base):
+    """Daily statistics rollup model."""
+
+    __tablename__ = "daily_stats"
+
+    __table_args__ = (UniqueConstraint("day", "metric", name="uq_daily_stat"),)
+
+    #  День, к которому относится значение
+    day: Mapped[date] = mapped_column(Date())
+    #  Название метрики: users_new, generations, generations:<job>,
+    #  payments_completed, payments_rub, users_segment:<segment> (приращения,
+    #  которые пишет триггер на users)
+    metric: Mapped[str] = mapped_column(String)
+    #  Накопленное значение за день
+    value: Mapped[int] = mapped_column(BigInteger, default=0)
@@ -0,0 +1,29 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import DateTime, String, func
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.models.base import Base
+
+
+#  Состояние FSM aiogram: одна строка на ключ (бот, чат, пользователь, ...)
+class FsmState(Base):
+    """FSM storage model."""
+
+    __tablename__ = "fsm_states"
+
+    #  Ключ StorageKey, собранный DefaultKeyBuilder
+    key: Mapped[str] = mapped_column(String, unique=True)
+    #  Текущее состояние (None - без состояния)
+    state: Mapped[str | None]
+    #  Данные FSM
+    data: Mapped[dict[str, Any]] = mapped_column(JSONB, default=dict)
+    #  Время последней записи, по нему удаляются устаревшие состояния
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+        index=True,
+    )
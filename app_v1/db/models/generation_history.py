@@ -5,6 +5,7 @@ from sqlalchemy import (
     String,
     BigInteger,
     ForeignKey,
+    Index,
     Integer,
     Enum,
 )
@@ -29,10 +30,11 @@ class GenerationHistory(Base):
     """Generation history model."""
 
     __tablename__ = "generation_history"
+    __table_args__ = (Index("ix_generation_history_created_at", "created_at"),)
 
     #  ID пользователя
     user_id: Mapped[int] = mapped_column(
-        BigInteger, ForeignKey("users.id", ondelete="CASCADE")
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), index=True
     )
     #  Модель, которая использовалась
     model: Mapped[str] = mapped_column(String)
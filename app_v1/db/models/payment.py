@@ -1,7 +1,17 @@
 from datetime import datetime
 from typing import Literal, TYPE_CHECKING
 
-from sqlalchemy import DateTime, String, Enum, BigInteger, ForeignKey
+from sqlalchemy import (
+    DateTime,
+    String,
+    Enum,
+    BigInteger,
+    ForeignKey,
+    Index,
+    Integer,
+    func,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from db.models.base import Base
@@ -16,9 +26,19 @@ if TYPE_CHECKING:
 class Payment(Base):
     """Payment model."""
 
+    __table_args__ = (
+        #  Поллер выбирает только ожидающие платежи, которым пора на проверку
+        Index(
+            "ix_payments_pending_next_check_at",
+            "next_check_at",
+            postgresql_where=text("status = 'pending'"),
+        ),
+        Index("ix_payments_created_at", "created_at"),
+    )
+
     #  ID пользователя
     user_id: Mapped[int] = mapped_column(
-        BigInteger, ForeignKey("users.id", ondelete="CASCADE")
+        BigInteger, ForeignKey("users.id", ondelete="CASCADE"), index=True
     )
     #  ID транзакции от платежной системы
     payment_id: Mapped[str] = mapped_column(String, unique=True)
@@ -33,8 +53,20 @@ class Payment(Base):
         ),
         default="pending",
     )
+    #  Ссылка на оплату: открытый платеж переиспользуется при повторном выборе тарифа
+    confirmation_url: Mapped[str | None] = mapped_column(String)
     #  Время завершения платежа
     completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    #  Когда поллеру в следующий раз проверять платеж
+    next_check_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        server_default=func.now(),
+        nullable=False,
+    )
+    #  Сколько раз платеж уже проверялся в YooKassa
+    check_attempts: Mapped[int] = mapped_column(
+        Integer, server_default="0", default=0, nullable=False
+    )
 
     #  Связь с пользователем
     user: Mapped["User"] = relationship("User", back_populates="payments")
@@ -0,0 +1,40 @@
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import DateTime, Index, String, UniqueConstraint, text
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.models.base import Base
+
+
+#  Уведомление YooKassa, принятое вебхуком: сначала сохраняется, потом
+#  обрабатывается фоновым обработчиком
+class PaymentEvent(Base):
+    """YooKassa webhook inbox model."""
+
+    __tablename__ = "payment_events"
+
+    __table_args__ = (
+        #  Повторная доставка одного уведомления не создаёт новую запись
+        UniqueConstraint("payment_id", "status", name="uq_payment_event"),
+        #  Обработчик выбирает только необработанные события
+        Index(
+            "ix_payment_events_unprocessed",
+            "id",
+            postgresql_where=text("processed_at IS NULL"),
+        ),
+    )
+
+    #  ID платежа в YooKassa
+    payment_id: Mapped[str] = mapped_column(String)
+    #  Статус платежа из уведомления (succeeded, canceled, ...)
+    status: Mapped[str] = mapped_column(String)
+    #  Уведомление целиком
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB)
+    #  Сколько раз обработка завершилась ошибкой
+    attempts: Mapped[int] = mapped_column(default=0, server_default="0")
+    #  До этого времени событие занято обработчиком (или отложено после ошибки)
+    locked_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    #  Время успешной обработки
+    processed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
@@ -0,0 +1,21 @@
+from typing import Any
+
+from sqlalchemy import BigInteger
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from db.models.base import Base
+
+
+#  Входящий апдейт Telegram, принятый вебхуком и ещё не обработанный
+class TelegramUpdate(Base):
+    """Telegram webhook inbox model."""
+
+    __tablename__ = "telegram_updates"
+
+    #  update_id от Telegram: повторная доставка того же апдейта игнорируется
+    update_id: Mapped[int] = mapped_column(BigInteger, unique=True)
+    #  Чат (или пользователь), по которому апдейты шардируются между процессами
+    chat_id: Mapped[int] = mapped_column(BigInteger)
+    #  Апдейт целиком, как его прислал Telegram
+    payload: Mapped[dict[str, Any]] = mapped_column(JSONB)
@@ -1,7 +1,7 @@
 from datetime import datetime, date
 from typing import Literal, TYPE_CHECKING
 
-from sqlalchemy import Date, DateTime, Enum, BigInteger, func, ForeignKey
+from sqlalchemy import Date, DateTime, Enum, BigInteger, func, ForeignKey, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from db.models.base import Base
@@ -20,6 +20,8 @@ if TYPE_CHECKING:
 class User(Base):
     """User model."""
 
+    __table_args__ = (Index("ix_users_created_at", "created_at"),)
+
     #  Telegram ID
     user_id: Mapped[int] = mapped_column(BigInteger, unique=True)
     #  TG Username
@@ -37,7 +39,7 @@ class User(Base):
     )
     #  ID пользователя, который пригласил этого пользователя
     referred_id: Mapped[int | None] = mapped_column(
-        ForeignKey("users.id", ondelete="SET NULL")
+        ForeignKey("users.id", ondelete="SET NULL"), index=True
     )
     #  Вводимые данные пользователя, когда он заходит в бота впервые
     #  или нажимает "/start"
@@ -54,6 +56,7 @@ class User(Base):
         server_default=func.now(),
         onupdate=func.now(),
         nullable=False,
+        index=True,
     )
 
     #  ---------------- RELATIONS ----------------
@@ -2,16 +2,33 @@
 
 import asyncio
 import logging
+from datetime import timedelta
+
 from aiogram import Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 from aiogram.types import BotCommand
 
 from db.database import engine
 from db.models import Base
 from routers import router
 from core.config import settings, bot
-from middlewares import DatabaseMiddleware
-from services import PaymentPoller, start_fastapi
+from middlewares import DatabaseMiddleware, UserMiddleware
+from services import (
+    AIClients,
+    BoundedMemoryStorage,
+    CONTENT,
+    CreditHoldSweeper,
+    DailyCardPregen,
+    GENERATIONS,
+    JobRuntime,
+    PaymentEventConsumer,
+    PaymentPoller,
+    PaymentReconciler,
+    PostgresStorage,
+    UpdateConsumer,
+    YooKassaClient,
+    start_fastapi,
+)
+from services.fastapi_webhook_server import app
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +47,35 @@ COMMANDS = [
 ]
 
 
+async def run_webhook(dp: Dispatcher) -> None:
+    """Process updates received by /webhook/telegram for this worker's shard."""
+    consumer = UpdateConsumer(
+        dp, bot, shard=settings.worker_index, shards=settings.worker_count
+    )
+    app.state.update_consumer = consumer
+
+    if settings.worker_index == 0:
+        # Without drop_pending_updates: Telegram keeps what arrived during deploy
+        await bot.set_webhook(
+            url=f"{settings.webhook_url.rstrip('/')}/webhook/telegram",
+            secret_token=settings.webhook_secret,
+            allowed_updates=dp.resolve_used_update_types(),
+        )
+
+    # Waits until the previous process of this shard (if any) lets it go
+    await consumer.start()
+    logger.info(
+        f"Webhook mode: worker {settings.worker_index}/{settings.worker_count}"
+    )
+
+    try:
+        await asyncio.Event().wait()
+    finally:
+        # Drains the chat queues and flushes FSM storage before the shard lock
+        # is released, so the next process of this shard reads fresh states
+        await consumer.stop()
+
+
 async def main() -> None:
     """Main application entry point."""
     # Configure logging
@@ -41,6 +87,8 @@ async def main() -> None:
     logging.getLogger("httpx").setLevel(logging.WARNING)
 
     # Validate required settings
+    if settings.webhook_url and not settings.webhook_secret:
+        raise ValueError("BOT_WEBHOOK_SECRET is required in webhook mode")
     if not settings.token:
         logger.error(
             "BOT_TOKEN is required but not set. "
@@ -53,32 +101,80 @@ async def main() -> None:
     await init_database()
     logger.info("Database initialized.")
 
-    # # Initialize payment poller
-    payment_poller = PaymentPoller()
-    await payment_poller.start()
-    logger.info("Payment poller started.")
+    # Shared async YooKassa client (one connection pool)
+    yk_client = YooKassaClient()
+
+    # Periodic jobs run on one replica only (advisory-lock leader election)
+    job_runtime = JobRuntime()
+    app.state.job_runtime = job_runtime
+    job_runtime.add("payment_poller", PaymentPoller(yk=yk_client))
+    job_runtime.add("payment_reconciler", PaymentReconciler(yk=yk_client))
+
+    # Settle payments from the YooKassa webhook inbox
+    payment_event_consumer = PaymentEventConsumer()
+    app.state.payment_event_consumer = payment_event_consumer
+    await payment_event_consumer.start()
+
+    # Load readings and AI-portraits content once
+    CONTENT.load()
+    if settings.content_hot_reload:
+        await CONTENT.start_watching()
+    logger.info("Content maps loaded.")
+
+    # Refund credit holds left behind by interrupted generations
+    job_runtime.add("credit_hold_sweeper", CreditHoldSweeper())
+
+    # Buffered generation history writer
+    await GENERATIONS.start()
+
+    # Initialize shared AI clients (one connection pool per provider)
+    ai_clients = AIClients()
+
+    # Initialize daily card pre-generation
+    job_runtime.add("daily_card_pregen", DailyCardPregen(ai=ai_clients))
+    await job_runtime.start()
 
     asyncio.create_task(start_fastapi())
 
     # Initialize dispatcher
-    dp = Dispatcher()
+    if settings.fsm_storage == "postgres":
+        storage = PostgresStorage(ttl=timedelta(days=settings.fsm_state_ttl_days))
+    else:
+        storage = BoundedMemoryStorage(
+            max_entries=settings.fsm_memory_max_entries,
+            ttl=settings.fsm_memory_ttl,
+        )
+    dp = Dispatcher(storage=storage)
+    dp["ai"] = ai_clients
+    dp["yk"] = yk_client
     dp.update.outer_middleware(DatabaseMiddleware())
+    dp.update.outer_middleware(UserMiddleware())
 
     # Register routers
     dp.include_router(router)
 
     logger.info("Bot started. Press Ctrl+C to stop.")
     await bot.set_my_commands(commands=COMMANDS)
-    await bot.delete_webhook(drop_pending_updates=True)
-    # Start polling
     try:
-        await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+        if settings.webhook_url:
+            await run_webhook(dp)
+        else:
+            # Start polling (updates queued while we were down are kept)
+            await bot.delete_webhook(drop_pending_updates=False)
+            await dp.start_polling(
+                bot, allowed_updates=dp.resolve_used_update_types()
+            )
     except KeyboardInterrupt:
         logger.info("Bot stopped by user.")
     finally:
-        # await payment_poller.stop()  # Останавливаем опрос при завершении
+        await job_runtime.stop()  # Останавливаем фоновые задачи лидера
+        await payment_event_consumer.stop()
+        await CONTENT.stop_watching()
+        await GENERATIONS.stop()  # Дописываем буфер истории генераций
+        await ai_clients.close()
+        await yk_client.close()
+        await dp.fsm.storage.close()  # Дописываем несохранённые состояния FSM
         await bot.session.close()
-        await dp.fsm.storage.close()
 
 
 if __name__ == "__main__":
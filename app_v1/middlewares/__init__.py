@@ -1,5 +1,6 @@
 """Middlewares package."""
 
 from middlewares.database_middleware import DatabaseMiddleware
+from middlewares.user_middleware import UserMiddleware
 
-__all__ = ["DatabaseMiddleware"]
+__all__ = ["DatabaseMiddleware", "UserMiddleware"]
@@ -12,7 +12,12 @@ logger = logging.getLogger(__name__)
 
 
 class DatabaseMiddleware(BaseMiddleware):
-    """Middleware to inject database session into context."""
+    """Middleware to inject database session into context.
+
+    The session checks out a pooled connection only on its first query.
+    Handlers that wait on AI providers call db.database.release_connection
+    first, so the connection is back in the pool during the wait.
+    """
 
     async def __call__(
         self,
@@ -0,0 +1,36 @@
+"""Request-scoped user middleware."""
+
+from typing import Callable, Awaitable, Dict, Any
+import logging
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, User as TgUser
+from db.crud import cache_user, get_user_by_telegram_id
+
+
+logger = logging.getLogger(__name__)
+
+
+class UserMiddleware(BaseMiddleware):
+    """Middleware to resolve the bot user once per update.
+
+    Must run after DatabaseMiddleware. The loaded row is injected as
+    ``user`` (None for users who have not pressed /start yet) and cached
+    on the session, so CRUD lookups by Telegram ID and balance reads
+    during the same update reuse it instead of querying again.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        """Inject user into context."""
+        tg_user: TgUser | None = data.get("event_from_user")
+        user = None
+        if tg_user is not None:
+            session = data["db_session"]
+            user = await get_user_by_telegram_id(tg_user.id, session)
+            cache_user(user, session)
+        data["user"] = user
+        return await handler(event, data)
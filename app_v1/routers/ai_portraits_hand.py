@@ -1,7 +1,5 @@
 import asyncio
 import logging
-import yaml
-from pathlib import Path
 from typing import Any
 import xml.sax.saxutils as saxutils
 
@@ -12,14 +10,18 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from google.genai.errors import ClientError
 
 from core.config import COST, GOOGLE_AI_MODEL
+from db.database import release_connection
 from db.crud import (
-    add_generation,
     get_user_by_telegram_id,
     get_user_balance,
-    decrease_user_balance,
+    reserve_credits,
+    capture_credits,
+    release_credits,
 )
 from keyboards import InlineKbd
 from schemas import (
+    CREDIT_HOLD_REJECTED_ANSWER,
+    GENERATION_ERROR_ANSWER,
     AiPortrait,
     AiPortraitGenerate,
     AiPortraitStates,
@@ -27,7 +29,9 @@ from schemas import (
     LkButton,
 )
 from services import (
-    GoogleAI,
+    GENERATIONS,
+    AIClients,
+    CONTENT,
     MessageAnimation,
     handle_google_ai_error,
     GoogleAIUnsupportedLocation,
@@ -83,22 +87,10 @@ async def handle_ai_portraits_main(
         "<b>Выбери, какой образ создадим прямо сейчас 👇</b>"
     )
 
-    ai_portraits_buttons = {
-        "🌿 Ресурс и сила": AiPortrait(button="resource_and_power").pack(),
-        "🎎 Женский магнетизм": AiPortrait(button="female_magnetism").pack(),
-        "💸 Энергия денег": AiPortrait(button="energy_of_money").pack(),
-        "🌙 Твоя тень": AiPortrait(button="your_shadow").pack(),
-        "💞 Образ любви": AiPortrait(button="love_portrait").pack(),
-        "👥 Совместимость": AiPortrait(button="compatibility").pack(),
-        "🎁 Подарок подруге": AiPortrait(button="gift_to_friend").pack(),
-    }
-
-    kbd = InlineKbd(buttons=ai_portraits_buttons, width=2)
-
     if isinstance(update, CallbackQuery):
-        await update.message.answer(msg, reply_markup=kbd.markup)
+        await update.message.answer(msg, reply_markup=CONTENT.portraits_keyboard)
     else:
-        await update.answer(msg, reply_markup=kbd.markup)
+        await update.answer(msg, reply_markup=CONTENT.portraits_keyboard)
 
 
 ai_portraits_rtr.message.register(handle_ai_portraits_main, F.text == "🎭 AI-Образы")
@@ -130,54 +122,22 @@ async def handle_buttons(
         birthday=user.birthday,
     )
 
-    # Загружаем данные из YAML файла
-    yaml_path = Path(__file__).parent.parent / "schemas" / "ai_portraits_map.yml"
-    with open(yaml_path, "r", encoding="utf-8") as f:
-        ai_portraits_data = yaml.safe_load(f)
-
-    portrait_data = ai_portraits_data[portrait]
-    try:
-        desc = portrait_data["description"]
-    except KeyError:
-        desc = (
-            portrait_data["description_male"]
-            if user.sex == "m"
-            else portrait_data["description_female"]
-        )
+    portrait_data = CONTENT.portraits[portrait]
+    desc = portrait_data.describe(user.sex)
 
     price = f"💎 Энергообмен: {COST['ai_portrait']} ⚡️ | За открытие любой темы 🔓"
 
-    desc_footer = portrait_data["description_footer"]
-
-    if portrait in (
-        "resource_and_power",
-        "female_magnetism",
-        "energy_of_money",
-        "your_shadow",
-        "love_portrait",
-    ):
-
-        await state.set_state(AiPortraitStates.aspect)
-
-        msg = f"{desc}\n{price}\n<b>{desc_footer}</b>"
-        buttons = {
-            "🪄 Создать AI-образ✨": AiPortraitGenerate(button="generate").pack(),
-            "🔙 Назад": AiPortraitGenerate(button="back").pack(),
-        }
-        kbd = InlineKbd(buttons=buttons, width=2)
-
-    elif portrait in ("compatibility", "gift_to_friend"):
+    desc_footer = portrait_data.description_footer
 
+    if portrait_data.needs_partner:
         await state.set_state(AiPortraitStates.another_birthday)
-
         msg = f"{desc}\n{price}\n{desc_footer}"
-        buttons = {
-            "🔙 Назад": AiPortraitGenerate(button="back").pack(),
-        }
-        kbd = InlineKbd(buttons=buttons, width=2)
+    else:
+        await state.set_state(AiPortraitStates.aspect)
+        msg = f"{desc}\n{price}\n<b>{desc_footer}</b>"
 
     await state.update_data(cost=COST["ai_portrait"])
-    await call.message.edit_text(msg, reply_markup=kbd.markup)
+    await call.message.edit_text(msg, reply_markup=portrait_data.keyboard)
 
 
 #  ----------- AI-PORTRAITS ANOTHER BIRTHDAY -----------
@@ -214,7 +174,7 @@ async def handle_another_birthday_message(message: Message, state: FSMContext) -
     BalanceCheck(),
 )
 async def handle_generate_portrait(
-    call: CallbackQuery, state: FSMContext, db_session: AsyncSession
+    call: CallbackQuery, state: FSMContext, db_session: AsyncSession, ai: AIClients
 ) -> None:
     logger.info(
         f"{call.from_user.id} @{call.from_user.username} - 'handle_generate_ai_portrait'"
@@ -239,6 +199,17 @@ async def handle_generate_portrait(
             "gen_type": "image",
         }
 
+        #  Резервируем энергию до вызова Gemini: повторное нажатие не пройдёт
+        hold_id = await reserve_credits(
+            user_id=user.id,
+            amount=COST["ai_portrait"],
+            purpose="ai_portraits",
+            session=db_session,
+        )
+        if hold_id is None:
+            await call.message.answer(CREDIT_HOLD_REJECTED_ANSWER)
+            return
+
         # Анимация сообщения во время генерации ответа
         animation_while_generating_picture = MessageAnimation(
             message_or_call=call,
@@ -246,10 +217,12 @@ async def handle_generate_portrait(
         )
         await animation_while_generating_picture.start()
 
+        #  Не держим соединение с БД, пока ждём Gemini
+        await release_connection(db_session)
+
         try:
             #  Получаем изображение
-            client = GoogleAI()
-            picture: BufferedInputFile | None = await client.generate_picture(
+            picture: BufferedInputFile | None = await ai.google.generate_picture(
                 feature="ai_portraits",
                 context=context,
                 #  Сразу после начала генерации сбрасываем состояние чтобы не стартанула следующая генерация
@@ -259,15 +232,14 @@ async def handle_generate_portrait(
                 gen_data["gen_status"] = "success"
             else:
                 gen_data["gen_status"] = "error"
-            generation = await add_generation(
-                session=db_session, commit=True, **gen_data
-            )
+            await GENERATIONS.record(**gen_data)
 
         except (
             GoogleAIUnsupportedLocation,
             GoogleAILimitError,
             GoogleAIUnavailable,
         ) as e:
+            await release_credits(hold_id, db_session)
             await handle_google_ai_error(
                 error=e,
                 upd=call,
@@ -275,20 +247,22 @@ async def handle_generate_portrait(
                 animation=animation_while_generating_picture,
             )
             gen_data["gen_status"] = "error"
-            generation = await add_generation(
-                session=db_session, commit=True, **gen_data
-            )
+            await GENERATIONS.record(**gen_data)
+            return
+        except Exception:
+            await release_credits(hold_id, db_session)
+            raise
+
+        if not picture:
+            await release_credits(hold_id, db_session)
+            await animation_while_generating_picture.stop()
+            await call.message.answer(GENERATION_ERROR_ANSWER)
             return
 
         await call.message.delete()
         await asyncio.sleep(0.2)
 
-        # Подгружаем фразочки
-        yaml_path = Path(__file__).parent.parent / "schemas" / "ai_portraits_map.yml"
-        with open(yaml_path, "r", encoding="utf-8") as f:
-            ai_portraits_data = yaml.safe_load(f)
-
-        caption_title = ai_portraits_data[context["domain"]]["caption_title"]
+        caption_title = CONTENT.portraits[context["domain"]].caption_title
         msg = (
             f"✨ Готово, {saxutils.escape(context['name'])}. Это образ {caption_title}\n"
             # "**ПОДСТАВЛЯЕТСЯ ТЕКСТ: КОРОТКАЯ ТРАКТОВКА КАРТОЧКИ**\n"
@@ -301,15 +275,14 @@ async def handle_generate_portrait(
         }
         kbd = InlineKbd(buttons=buttons, width=1)
 
-        user = await get_user_by_telegram_id(call.from_user.id, db_session)
-
         await animation_while_generating_picture.stop()
 
         await call.message.answer_photo(
             photo=picture, caption=msg, reply_markup=kbd.markup
         )
         # await call.message.answer(msg, reply_markup=kbd.markup)
-        await decrease_user_balance(user.id, COST["ai_portrait"], db_session)
+        #  Списание энергии: подтверждаем резерв
+        await capture_credits(hold_id, db_session)
     else:
         await state.clear()
         return
@@ -364,4 +337,4 @@ async def handle_no_ai_portraits_for_poor(
         "cost": COST["ai_portrait"],
         "gen_status": "not_enough_balance",
     }
-    generation = await add_generation(session=db_session, commit=True, **gen_data)
+    await GENERATIONS.record(**gen_data)
@@ -1,4 +1,3 @@
-from datetime import date
 import logging
 import xml.sax.saxutils as saxutils
 
@@ -6,23 +5,33 @@ from aiogram import Router, F
 from aiogram.types import Message, CallbackQuery, BufferedInputFile
 from aiogram.fsm.context import FSMContext
 from sqlalchemy.ext.asyncio import AsyncSession
-from google.genai.errors import ClientError
 
-from core.config import COST, GOOGLE_AI_MODEL, OPENAI_MODEL
+from core.config import COST, GOOGLE_AI_MODEL, OPENAI_MODEL, today
+from db.database import release_connection
 from db.crud import (
     get_user_by_telegram_id,
     update_user_info,
-    decrease_user_balance,
-    add_generation,
+    reserve_credits,
+    capture_credits,
+    release_credits,
+    get_daily_card,
+    save_daily_card,
 )
 from keyboards import InlineKbd
-from schemas import LkButton
+from schemas import CREDIT_HOLD_REJECTED_ANSWER, GENERATION_ERROR_ANSWER, LkButton
 from services import (
-    GoogleAI,
-    OpenAIClient,
+    GENERATIONS,
+    AIClients,
     MessageAnimation,
+    answer_photo_with_caption,
+    calculate_arcana,
+    generate_daily_card,
     handle_google_ai_error,
+    GoogleAIUnsupportedLocation,
+    GoogleAILimitError,
+    GoogleAIUnavailable,
     OpenAIUnsupportedLocation,
+    OpenAIIncompleteResponse,
     handle_openai_error,
 )
 
@@ -35,7 +44,10 @@ dc_rtr = Router()
 
 
 async def handle_daily_card_main(
-    update: Message | CallbackQuery, state: FSMContext, db_session: AsyncSession
+    update: Message | CallbackQuery,
+    state: FSMContext,
+    db_session: AsyncSession,
+    ai: AIClients,
 ) -> None:
     await state.clear()
 
@@ -57,7 +69,6 @@ async def handle_daily_card_main(
         "cost": COST["daily_card"],
         "gen_type": "image, text",
     }
-    generation = None
 
     if user.balance < cost:
 
@@ -83,95 +94,129 @@ async def handle_daily_card_main(
         )
 
         gen_data["gen_status"] = "not_enough_balance"
-        generation = await add_generation(session=db_session, commit=True, **gen_data)
+        await GENERATIONS.record(**gen_data)
         return
 
-    elif latest_daily_card is None or latest_daily_card != date.today():
+    elif latest_daily_card is None or latest_daily_card != today():
 
-        context = {
-            "name": user.name,
-            "sex": user.sex,
-            "birthday": user.birthday,
-            "current_date": date.today(),
-        }
-
-        # Анимация сообщения во время генерации ответа
-        animation_while_generating_image = MessageAnimation(
-            message_or_call=update,
-            base_text="✨ Настраиваюсь на поток",
+        #  Резервируем энергию сразу: повторное нажатие не откроет вторую карту
+        hold_id = await reserve_credits(
+            user_id=user.id, amount=cost, purpose="daily_card", session=db_session
         )
-        await animation_while_generating_image.start()
+        if hold_id is None:
+            await update.answer(CREDIT_HOLD_REJECTED_ANSWER)
+            return
 
-        try:
-            #  Получаем текст
-            client = OpenAIClient(auto_create_conv=True)
-            answer, conversation_id = await client.chatgpt_response(
-                feature="daily_card", context=context, max_length=1020
+        card_date = today()
+        main_arcana = calculate_arcana(user.birthday)["main_arcana"]
+
+        #  Карта дня одна на (дату, аркан) и обычно уже сгенерирована заранее
+        card = await get_daily_card(card_date, main_arcana, db_session)
+
+        if card is not None:
+            answer = card.text
+            picture: BufferedInputFile | str | None = card.file_id
+            animation_while_generating_image = None
+        else:
+            # Анимация сообщения во время генерации ответа
+            animation_while_generating_image = MessageAnimation(
+                message_or_call=update,
+                base_text="✨ Настраиваюсь на поток",
             )
-        except OpenAIUnsupportedLocation as e:
+            await animation_while_generating_image.start()
+
+            #  Не держим соединение с БД, пока ждём OpenAI и Gemini
+            await release_connection(db_session)
+
+            try:
+                #  Получаем текст и изображение
+                answer, picture = await generate_daily_card(
+                    ai, main_arcana, card_date
+                )
+            except (OpenAIUnsupportedLocation, OpenAIIncompleteResponse) as e:
+                await release_credits(hold_id, db_session)
+                gen_data["gen_status"] = "error"
+                await GENERATIONS.record(**gen_data)
+                await handle_openai_error(
+                    error=e,
+                    upd=update,
+                    job="daily_card",
+                    animation=animation_while_generating_image,
+                )
+                return
+            except (
+                GoogleAIUnsupportedLocation,
+                GoogleAILimitError,
+                GoogleAIUnavailable,
+            ) as e:
+                await release_credits(hold_id, db_session)
+                #  Сохранение записи о генерации в базу данных
+                gen_data["gen_status"] = "error"
+                await GENERATIONS.record(**gen_data)
+                await handle_google_ai_error(
+                    error=e,
+                    upd=update,
+                    job="daily_card",
+                    animation=animation_while_generating_image,
+                )
+                return
+            except Exception:
+                await release_credits(hold_id, db_session)
+                raise
+
+        if animation_while_generating_image:
+            await animation_while_generating_image.stop()
+
+        if picture is None:
+            #  Gemini так и не вернул изображение: возвращаем энергию
+            await release_credits(hold_id, db_session)
             gen_data["gen_status"] = "error"
-            generation = await add_generation(
-                session=db_session, commit=True, **gen_data
-            )
-            await handle_openai_error(
-                error=e,
-                upd=update,
-                job="daily_card",
-                animation=animation_while_generating_image,
-            )
+            await GENERATIONS.record(**gen_data)
+            if isinstance(update, CallbackQuery):
+                await update.message.answer(GENERATION_ERROR_ANSWER)
+            elif isinstance(update, Message):
+                await update.answer(GENERATION_ERROR_ANSWER)
             return
 
-        context["chatGPT_answer"] = answer
-
+        sent = None
         try:
-            #  Получаем изображение
-            client = GoogleAI()
-            picture: BufferedInputFile | None = await client.generate_picture(
-                feature="daily_card",
-                context=context,
-                #  Сразу после начала генерации сбрасываем состояние чтобы не стартанула следующая генерация
-                state=state,
-            )
-            # picture = FSInputFile(
-            #     "app_v1/src/assets/owl_pic_620_6b3d4bb80adc24b34ad43895d6d7ae8e.jpg"
-            # )
+            if isinstance(update, CallbackQuery):
+                await update.message.edit_text("Вы еще не получили карту дня")
+            elif isinstance(update, Message):
+                sent = await answer_photo_with_caption(update, picture, answer)
+        except Exception:
+            #  Карта не доставлена: не списываем энергию и не закрываем день
+            await release_credits(hold_id, db_session)
+            gen_data["gen_status"] = "error"
+            await GENERATIONS.record(**gen_data)
+            raise
 
-            gen_data["gen_status"] = "success"
-            generation = await add_generation(
-                session=db_session, commit=True, **gen_data
-            )
+        #  Списание энергии: подтверждаем резерв
+        await capture_credits(hold_id, db_session)
 
-        except ClientError as e:
-            #  Сохранение записи о генерации в базу данных
-            gen_data["gen_status"] = "error"
-            generation = await add_generation(
-                session=db_session, commit=True, **gen_data
-            )
-            await handle_google_ai_error(
-                error=e,
-                upd=update,
-                job="daily_card",
-                animation=animation_while_generating_image,
-            )
-            return
+        gen_data["gen_status"] = "success"
+        await GENERATIONS.record(**gen_data)
 
         await update_user_info(
             user_id=update.from_user.id,
-            data={"latest_daily_card": date.today()},
+            data={"latest_daily_card": card_date},
             session=db_session,
         )
 
-        await animation_while_generating_image.stop()
-
-        if isinstance(update, CallbackQuery):
-            await update.message.edit_text("Вы еще не получили карту дня")
-        elif isinstance(update, Message):
-            await update.answer_photo(photo=picture, caption=answer)
-
-        await decrease_user_balance(user.id, COST["daily_card"], db_session)
+        #  Сохраняем file_id, чтобы остальные пользователи с этим арканом
+        #  получили карту без генерации
+        if card is None and sent is not None and sent.photo:
+            await save_daily_card(
+                card_date=card_date,
+                arcana=main_arcana,
+                text=answer,
+                file_id=sent.photo[-1].file_id,
+                session=db_session,
+            )
 
         logger.info(
-            f"{update.from_user.id} @{update.from_user.username} - 'daily card generation'"
+            f"{update.from_user.id} @{update.from_user.username} - "
+            f"'daily card {'generation' if card is None else 'from cache'}'"
         )
     else:
 
@@ -193,7 +238,7 @@ async def handle_daily_card_main(
         )
 
         gen_data["gen_status"] = "already_generated_today"
-        generation = await add_generation(session=db_session, commit=True, **gen_data)
+        await GENERATIONS.record(**gen_data)
         return
 
 
@@ -8,13 +8,19 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from db.crud import (
     get_user_by_telegram_id,
-    create_payment,
     get_payment_by_payment_id,
     update_user_info,
 )
+from db.database import release_connection
 from keyboards import InlineKbd
-from schemas import LkTopUp, YKOperations, EmailStates, TARIFFS
-from services import PaymentService, TopupRoutine
+from schemas import LkButton, LkTopUp, YKOperations, EmailStates, TARIFFS
+from services import (
+    PAYMENT_STATUSES,
+    PaymentService,
+    TopupRoutine,
+    YooKassaClient,
+    YooKassaError,
+)
 from core.config import settings
 
 logger = logging.getLogger(__name__)
@@ -62,6 +68,7 @@ async def top_up(
     callback_data: LkTopUp,
     state: FSMContext,
     db_session: AsyncSession,
+    yk: YooKassaClient,
 ) -> None:
 
     # Проверяем, указан ли у пользователя email
@@ -72,42 +79,39 @@ async def top_up(
         await call.message.answer("🧾 На какой email отправить чек?")
         return
 
-    payment_service = PaymentService()
     rub_amount = callback_data.rub
     kreds = TARIFFS.get(rub_amount, {}).get("kreds")
-
-    #  Создаем платеж в YooKassa
-    payment_data = payment_service.create_payment(
-        kreds=kreds,
-        amount_rub=rub_amount,
-        customer_email=user.mail,
-        chat_id=call.message.chat.id,
-        user_id=user.user_id,
-    )
-
-    #  Сохраняем данные платежа в state
-    await state.update_data(
-        payment_link=str(payment_data["confirmation_url"]),
-        payment_amount=payment_data["amount"],
-    )
-
-    # Сохраняем платеж в БД (amount - кредиты, rub_amount - рубли)
     if kreds is None:
         logger.error(f"Kreds is None for amount {rub_amount}")
         kreds = rub_amount
 
-    await create_payment(
-        user_id=user.id,
-        payment_id=payment_data["payment_id"],
-        amount=kreds,
-        rub_amount=rub_amount,
-        status="pending",
-        session=db_session,
+    #  Открытый платеж на этот тариф переиспользуется, новый создается идемпотентно
+    try:
+        payment = await PaymentService(yk).checkout(
+            user=user,
+            kreds=kreds,
+            amount_rub=rub_amount,
+            chat_id=call.message.chat.id,
+            session=db_session,
+        )
+    except YooKassaError as e:
+        #  Сетевые ошибки httpx клиент тоже оборачивает в YooKassaError
+        logger.error(f"Error creating payment for user {user.user_id}: {e}")
+        await call.answer(
+            "Не удалось создать платеж. Попробуйте ещё раз через минуту",
+            show_alert=True,
+        )
+        return
+
+    #  Сохраняем данные платежа в state
+    await state.update_data(
+        payment_link=payment.confirmation_url,
+        payment_amount=payment.rub_amount,
     )
 
     buttons = {
         "🔄 Проверить платеж": YKOperations(
-            operation="check", payment_id=payment_data["payment_id"]
+            operation="check", payment_id=payment.payment_id
         ).pack(),
     }
     kbd = InlineKbd(buttons=buttons, width=2)
@@ -115,9 +119,9 @@ async def top_up(
     await call.message.edit_text(
         (
             f"<b>Пополнение баланса</b>\n\n"
-            f"<b>ID платежа:</b> {payment_data['payment_id']}\n"
-            f"<b>Сумма:</b> {payment_data['amount']} ₽\n\n"
-            f"<b>Ссылка для оплаты:</b> {payment_data['confirmation_url']}"
+            f"<b>ID платежа:</b> {payment.payment_id}\n"
+            f"<b>Сумма:</b> {payment.rub_amount} ₽\n\n"
+            f"<b>Ссылка для оплаты:</b> {payment.confirmation_url}"
         ),
         reply_markup=kbd.markup,
     )
@@ -132,17 +136,64 @@ async def payment_status(
     callback_data: YKOperations,
     state: FSMContext,
     db_session: AsyncSession,
+    yk: YooKassaClient,
 ) -> None:
-    payment_service = PaymentService(payment_id=callback_data.payment_id)
-    payment_status_data: dict | None = payment_service.get_status_success()
-    #  payment_status_data: {'status': 'succeeded', 'metadata': {'cms_name': 'yookassa_sdk_python', 'chat_id': '...'}, 'amount': Decimal('699.00')}
+    payment = await get_payment_by_payment_id(
+        payment_id=callback_data.payment_id,
+        session=db_session,
+    )
+    if payment is None:
+        logger.error(f"Payment {callback_data.payment_id} not found")
+        await call.answer()
+        return
+
+    #  Сначала локальное состояние: БД, затем кэш статусов (вебхук, поллер).
+    #  В YooKassa идём, только если кэш устарел, и одним запросом на всех.
+    #  Отменённый у нас по TTL платеж тоже проверяем: его могли оплатить позже
+    status = payment.status
+    if status in ("pending", "canceled"):
+        await release_connection(db_session)
+        status = await PAYMENT_STATUSES.get(payment.payment_id, yk)
+
+    if status is None:
+        #  YooKassa не ответила: сообщение со ссылкой и кнопкой проверки оставляем
+        await call.answer(
+            "Не удалось проверить платеж. Попробуйте ещё раз через минуту",
+            show_alert=True,
+        )
+        return
 
-    if payment_status_data is None:
+    if status == "canceled":
 
         await call.message.delete()
 
-        payment_link = await state.get_value("payment_link")
-        payment_amount = await state.get_value("payment_amount")
+        #  Старая ссылка уже не работает: предлагаем новый платеж
+        buttons = {
+            "💳 Оплатить заново": LkTopUp(rub=payment.rub_amount).pack(),
+            "🪙 Выбрать другой пакет": LkButton(button="top_up").pack(),
+        }
+        kbd = InlineKbd(buttons=buttons, width=1)
+
+        await call.message.answer(
+            (
+                f"<b>Пополнение баланса</b>\n\n"
+                f"<b>ID платежа:</b> {callback_data.payment_id}\n"
+                f"<b>Сумма:</b> {payment.rub_amount} ₽\n"
+                "🔴 <b>Платеж отменён</b>\n\n"
+                "Деньги не списаны. Создайте новый платеж, чтобы пополнить баланс.\n"
+            ),
+            reply_markup=kbd.markup,
+        )
+        await state.clear()
+        return
+
+    if status not in ("succeeded", "completed"):
+
+        await call.message.delete()
+
+        payment_link = payment.confirmation_url or await state.get_value(
+            "payment_link"
+        )
 
         buttons = {
             "🔄 Проверить платеж": YKOperations(
@@ -155,7 +206,7 @@ async def payment_status(
             (
                 f"<b>Пополнение баланса</b>\n\n"
                 f"<b>ID платежа:</b> {callback_data.payment_id}\n"
-                f"<b>Сумма:</b> {payment_amount} ₽\n"
+                f"<b>Сумма:</b> {payment.rub_amount} ₽\n"
                 "⚫️ <b>Платеж ещё не прошёл</b>\n\n"
                 f"<b>Ссылка для оплаты:</b> {payment_link}\n"
             ),
@@ -163,26 +214,11 @@ async def payment_status(
         )
         return
 
-    elif payment_status_data["status"] == "succeeded":
-
-        payment = await get_payment_by_payment_id(
-            payment_id=callback_data.payment_id,
-            session=db_session,
-        )
-        if payment.status == "completed":
-            pass
-
-        else:
-
-            user = await get_user_by_telegram_id(
-                tg_id=call.from_user.id, session=db_session
-            )
-            if user is None:
-                logger.error(f"User with tg_id {call.from_user.id} not found")
-                return
+    else:
 
+        if payment.status != "completed":
             #  Запускаем рутину пополнения баланса
-            topup_routine = TopupRoutine(session=db_session, user_id=user.id)
+            topup_routine = TopupRoutine(session=db_session, user_id=payment.user_id)
             await topup_routine.process_successful_payment(payment=payment)
 
         await call.message.edit_text(
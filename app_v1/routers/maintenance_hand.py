@@ -21,7 +21,7 @@ from db.crud import (
 )
 from keyboards import InlineKbd, InlineKeyboard
 from prompts import PROMPT_TEMPLATES
-from services import calculate_arcana, GoogleAI, OpenAIClient
+from services import calculate_arcana, AIClients
 from schemas import CalculateArcana, DeleteFunc
 from services.message_animation import MessageAnimation
 
@@ -111,10 +111,11 @@ async def handle_arcana_message(message: Message, state: FSMContext) -> None:
 
 
 @mnt_rtr.message(Command("models_openai"), OwnerCheck())
-async def models(update: Message | CallbackQuery, state: FSMContext) -> None:
+async def models(
+    update: Message | CallbackQuery, state: FSMContext, ai: AIClients
+) -> None:
 
-    client = OpenAIClient()
-    models = await client.get_models()
+    models = await ai.openai.get_models()
     msg = "Модели OpenAI:\n"
     for model in models:
         msg += f"{model}\n"
@@ -138,9 +139,10 @@ async def templates(update: Message | CallbackQuery, state: FSMContext) -> None:
 
 
 @mnt_rtr.message(Command("image"), OwnerCheck())
-async def image(update: Message | CallbackQuery, state: FSMContext) -> None:
-    client = OpenAIClient()
-    image_bytes = await client.chatgpt_image(
+async def image(
+    update: Message | CallbackQuery, state: FSMContext, ai: AIClients
+) -> None:
+    image_bytes = await ai.openai.chatgpt_image(
         prompt="Make image in the same style but for arcana 13 (Death)",
     )
     await update.answer_photo(photo=image_bytes)
@@ -150,11 +152,12 @@ async def image(update: Message | CallbackQuery, state: FSMContext) -> None:
 
 
 @mnt_rtr.message(Command("models_google"), OwnerCheck())
-async def google_image(update: Message | CallbackQuery, state: FSMContext) -> None:
-    client = GoogleAI()
-    models = client.google_models()
+async def google_image(
+    update: Message | CallbackQuery, state: FSMContext, ai: AIClients
+) -> None:
+    models = await ai.google.google_models()
     msg = "Модели Gemini:\n"
-    for model in models:
+    async for model in models:
         msg += f"{model.name}\n"
     await update.answer(msg)
 
@@ -1,10 +1,7 @@
 import logging
-import yaml
-from pathlib import Path
 import xml.sax.saxutils as saxutils
 
 from aiogram import Router, F
-from aiogram.exceptions import TelegramBadRequest
 from aiogram.filters import StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery
@@ -12,26 +9,32 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import COST, OPENAI_MODEL
 from services import (
-    OpenAIClient,
-    MessageAnimation,
+    GENERATIONS,
+    AIClients,
+    CONTENT,
+    Conversation,
+    StreamingReply,
     handle_openai_error,
     OpenAIUnsupportedLocation,
+    OpenAIIncompleteResponse,
 )
 from schemas import (
+    CREDIT_HOLD_REJECTED_ANSWER,
     ReadingsDomain,
     ReadingsSub,
     ReadingsStates,
     BalanceCheck,
     LkButton,
-    GENERATION_ERROR_ANSWER,
 )
 from keyboards import InlineKbd
+from db.database import release_connection
 from db.crud import (
     get_user_by_telegram_id,
     update_user_info,
     get_user_balance,
-    decrease_user_balance,
-    add_generation,
+    reserve_credits,
+    capture_credits,
+    release_credits,
 )
 
 logger = logging.getLogger(__name__)
@@ -122,42 +125,18 @@ async def handle_buttons(
     context = await state.get_data()
     if context:
 
-        domain = callback_data.button
-
-        # Загружаем данные из YAML файла
-        yaml_path = Path(__file__).parent.parent / "schemas" / "readings_map.yml"
-        with open(yaml_path, "r", encoding="utf-8") as f:
-            readings_data = yaml.safe_load(f)
-
-        domain_data = readings_data[domain]
-        desc_header = domain_data["description_header"]
-        desc = domain_data["description"]
-        desc_footer = domain_data["description_footer"]
-
-        # Преобразуем кнопки из YAML формата в CallbackData
-        buttons = {}
-        for aspect_value, button_data in domain_data["buttons"].items():
-            # Обрабатываем как строку (простой формат) или как объект (с полем label)
-            button_text = button_data["label"]
-
-            if aspect_value == "back":
-                buttons[button_text] = ReadingsDomain(button="back").pack()
-            else:
-                buttons[button_text] = ReadingsSub(
-                    domain=domain, aspect=aspect_value
-                ).pack()
-
-        price = f"💎 Энергообмен: {COST['reading']} ⚡️ | За открытие любой темы 🔓"
-
-        msg = f"<b>{desc_header}</b>\n{desc}\n{price}\n<b>{desc_footer}</b>"
-
-        kbd = InlineKbd(buttons=buttons, width=1)
+        #  Текст и клавиатура сферы собраны заранее в реестре контента
+        domain_data = CONTENT.readings[callback_data.button]
 
         current_state = await state.get_state()
         if current_state == ReadingsStates.witch:
-            await call.message.answer(msg, reply_markup=kbd.markup)
+            await call.message.answer(
+                domain_data.text, reply_markup=domain_data.keyboard
+            )
         else:
-            await call.message.edit_text(msg, reply_markup=kbd.markup)
+            await call.message.edit_text(
+                domain_data.text, reply_markup=domain_data.keyboard
+            )
 
         await state.update_data(cost=COST["reading"])
         await state.set_state(ReadingsStates.aspect)
@@ -176,6 +155,7 @@ async def handle_response(
     callback_data: ReadingsSub,
     state: FSMContext,
     db_session: AsyncSession,
+    ai: AIClients,
 ) -> None:
     logger.info(
         f"{call.from_user.id} @{call.from_user.username} - 'readings_generation'"
@@ -184,10 +164,6 @@ async def handle_response(
     await call.answer()
     data = await state.get_data()
 
-    yaml_path = Path(__file__).parent.parent / "schemas" / "readings_map.yml"
-    with open(yaml_path, "r", encoding="utf-8") as f:
-        readings_data = yaml.safe_load(f)
-
     if data:
         #  Collecting context for prompt
         context = {}
@@ -197,13 +173,6 @@ async def handle_response(
         context["domain"] = callback_data.domain
         context["aspect"] = callback_data.aspect
 
-        # Анимация сообщения во время генерации ответа
-        animation_while_generating_answer = MessageAnimation(
-            message_or_call=call,
-            base_text="✨ Настраиваюсь на поток",
-        )
-        await animation_while_generating_answer.start()
-
         request = {
             "job": "readings",
             **context,
@@ -217,64 +186,62 @@ async def handle_response(
             "gen_type": "text",
         }
 
+        #  Резервируем энергию до вызова OpenAI: повторное нажатие не пройдёт
+        hold_id = await reserve_credits(
+            user_id=user.id,
+            amount=COST["reading"],
+            purpose="readings",
+            session=db_session,
+        )
+        if hold_id is None:
+            await call.message.answer(CREDIT_HOLD_REJECTED_ANSWER)
+            return
+
+        #  Убираем клавиатуру и выводим ответ в это же сообщение по мере генерации
+        await call.message.edit_text("✨ Настраиваюсь на поток...")
+        reply = StreamingReply(call.message)
+        conversation = Conversation()
+
+        #  Не держим соединение с БД, пока ждём OpenAI
+        await release_connection(db_session)
+
         try:
             #  Getting response from OpenAI
-            client = OpenAIClient(auto_create_conv=False)
-            answer, conversation_id = await client.chatgpt_response(
-                feature="readings", context=context
-            )
-        except OpenAIUnsupportedLocation as e:
-            await handle_openai_error(
-                error=e,
-                upd=call,
-                job="readings",
-                animation=animation_while_generating_answer,
+            answer = await reply.run(
+                ai.openai.stream_response(
+                    feature="readings", context=context, conversation=conversation
+                )
             )
+        except (OpenAIUnsupportedLocation, OpenAIIncompleteResponse) as e:
+            await release_credits(hold_id, db_session)
+            await handle_openai_error(error=e, upd=call, job="readings")
             #  Сохранение записи о генерации в базу данных
             gen_data["gen_status"] = "error"
-            generation = await add_generation(
-                session=db_session, commit=True, **gen_data
-            )
+            await GENERATIONS.record(**gen_data)
             return
         except Exception as e:
-            #  Аварийная остановка анимации
-            await animation_while_generating_answer.stop()
+            await release_credits(hold_id, db_session)
             gen_data["gen_status"] = "error"
-            generation = await add_generation(
-                session=db_session, commit=True, **gen_data
-            )
+            await GENERATIONS.record(**gen_data)
             raise e
 
-        await animation_while_generating_answer.stop()
+        if not answer:
+            await release_credits(hold_id, db_session)
+            return
 
         #  saving conversation to database
+        conversation_id = conversation.id
         await update_user_info(
             call.from_user.id, {"latest_conversation": conversation_id}, db_session
         )
         await state.update_data(conversation_id=conversation_id)
 
-        user = await get_user_by_telegram_id(call.from_user.id, db_session)
-
-        #  Отправка ответа
-        try:
-            await call.message.edit_text(answer)
-        except TelegramBadRequest as e:
-            if e.message == "Bad Request: message text is empty":
-                await call.message.answer(GENERATION_ERROR_ANSWER)
-                return
-            else:
-                await call.message.answer(answer)
-
-        #  Списание энергии
-        new_balance = await decrease_user_balance(
-            user.id,
-            COST["reading"],
-            db_session,
-        )
+        #  Списание энергии: подтверждаем резерв
+        await capture_credits(hold_id, db_session)
 
         #  Сохранение записи о генерации в базу данных
         gen_data["gen_status"] = "success"
-        generation = await add_generation(session=db_session, commit=True, **gen_data)
+        await GENERATIONS.record(**gen_data)
 
         #  Обновляем стоимость следующего разбора
         await state.update_data(cost=COST["follow_up"])
@@ -332,7 +299,7 @@ async def handle_no_readings_for_poor(
         "cost": COST["reading"],
         "gen_status": "not_enough_balance",
     }
-    generation = await add_generation(session=db_session, commit=True, **gen_data)
+    await GENERATIONS.record(**gen_data)
 
     logger.info(
         f"{call.from_user.id} @{call.from_user.username} - 'no_readings_for_poor (ub:{user_balance} cost:{cost})'"
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import xml.sax.saxutils as saxutils
 
@@ -8,15 +9,21 @@ from aiogram.types import Message, CallbackQuery, BufferedInputFile, FSInputFile
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from core.config import COST, GOOGLE_AI_MODEL, OPENAI_MODEL
+from db.database import release_connection
 from db.crud import (
     # get_or_create_user,
     update_user_info,
     get_user_by_telegram_id,
-    decrease_user_balance,
-    add_generation,
+    reserve_credits,
+    capture_credits,
+    release_credits,
 )
 from keyboards import InlineKbd
 from schemas import (
+    CREDIT_HOLD_REJECTED_ANSWER,
+    GENERATION_ERROR_ANSWER,
+    PARTIAL_IMAGE_ANSWER,
+    PARTIAL_TEXT_ANSWER,
     main_reply_kbd,
     BioStates,
     BioCorrect,
@@ -25,15 +32,20 @@ from schemas import (
     ReadingsStates,
 )
 from services import (
+    GENERATIONS,
     handle_google_ai_error,
-    GoogleAI,
-    OpenAIClient,
+    AIClients,
+    Conversation,
     MessageAnimation,
+    StreamingReply,
+    answer_long,
+    answer_photo_with_caption,
     GoogleAIUnsupportedLocation,
     GoogleAILimitError,
     GoogleAIUnavailable,
     handle_openai_error,
     OpenAIUnsupportedLocation,
+    OpenAIIncompleteResponse,
 )
 
 logger = logging.getLogger(__name__)
@@ -47,17 +59,17 @@ witch_rtr = Router()
     BioCorrect.filter(F.button == "yes"), BioStates.edit_or_confirm
 )
 async def stir_the_cauldron(
-    call: CallbackQuery, state: FSMContext, db_session: AsyncSession
+    call: CallbackQuery, state: FSMContext, db_session: AsyncSession, ai: AIClients
 ) -> None:
     # Отвечаем на callback query, чтобы разблокировать бота
     await call.answer()
 
-    # Анимация сообщения во время генерации изображения
-    animation_while_generating_image = MessageAnimation(
+    # Одна анимация на обе генерации
+    animation = MessageAnimation(
         message_or_call=call,
         base_text="🌀 Соединяюсь с полем твоей Матрицы",
     )
-    await animation_while_generating_image.start()
+    await animation.start()
 
     #  getting fsm data
     fsm_data = await state.get_data()
@@ -78,92 +90,74 @@ async def stir_the_cauldron(
         "sex": fsm_data["sex"],
         "birthday": fsm_data["birthday"],
     }
-    gen_data = {
-        "user_id": user.id,
-        "model": f"{GOOGLE_AI_MODEL}, {OPENAI_MODEL}",
-        "request": request,
-        "cost": COST["witchcraft"],
-        "gen_type": "image, text",
-    }
-    generation = None
-    #  Генерируем изображение
-    try:
-        client = GoogleAI()
-        photo: BufferedInputFile | None = await client.generate_picture(
-            feature="first",
-            context=data,
-            state=state,
-        )
-        # photo = FSInputFile(
-        #     "app_v1/src/assets/owl_pic_620_6b3d4bb80adc24b34ad43895d6d7ae8e.jpg"
-        # )
-        # await asyncio.sleep(5)
-        gen_data["gen_status"] = "success"
-        generation = await add_generation(session=db_session, commit=False, **gen_data)
-    except (
-        GoogleAIUnsupportedLocation,
-        GoogleAILimitError,
-        GoogleAIUnavailable,
-    ) as e:
-        gen_data["gen_status"] = "error"
-        generation = await add_generation(session=db_session, commit=True, **gen_data)
-        await handle_google_ai_error(
-            error=e,
-            upd=call,
-            job="starter_generation",
-            animation=animation_while_generating_image,
-        )
-        return
 
-    await animation_while_generating_image.stop()
+    #  Не держим соединение с БД, пока ждём OpenAI и Gemini
+    await release_connection(db_session)
 
-    animation_while_generating_text = MessageAnimation(
-        message_or_call=call,
-        base_text="🔢 Рассчитываю центральный аркан",
+    #  Изображение и текст не зависят друг от друга — генерируем параллельно
+    photo_result, text_result = await asyncio.gather(
+        ai.google.generate_picture(feature="first", context=data),
+        ai.openai.chatgpt_response(feature="first", context=data, max_length=1020),
+        return_exceptions=True,
     )
-    await animation_while_generating_text.start()
+    #  Gemini может вернуть None, если в ответе нет изображения
+    photo_failed = photo_result is None or isinstance(photo_result, BaseException)
+    text_failed = isinstance(text_result, BaseException)
 
-    # getting message
-    try:
-        client = OpenAIClient(auto_create_conv=False)
-        answer, conversation_id = await client.chatgpt_response(
-            feature="first", context=data, max_length=1020
-        )
-        if generation:
-            generation.gen_status = "success"
-            await db_session.commit()
-        else:
-            gen_data["gen_status"] = "success"
-            generation = await add_generation(
-                session=db_session, commit=True, **gen_data
+    #  Одна запись на генерацию, как и до распараллеливания: аналитика
+    #  считает генерации по строкам GENERATIONS. Успех — если пользователь
+    #  получил хотя бы изображение или текст
+    await GENERATIONS.record(
+        user_id=user.id,
+        model=f"{GOOGLE_AI_MODEL}, {OPENAI_MODEL}",
+        request=request,
+        cost=COST["witchcraft"],
+        gen_type="image, text",
+        gen_status="error" if photo_failed and text_failed else "success",
+    )
+
+    await animation.stop()
+
+    #  Ошибки каждой ветки обрабатываем отдельно
+    unexpected = None
+    if photo_failed:
+        if isinstance(
+            photo_result,
+            (GoogleAIUnsupportedLocation, GoogleAILimitError, GoogleAIUnavailable),
+        ):
+            await handle_google_ai_error(
+                error=photo_result,
+                upd=call,
+                job="starter_generation",
+                user_answer=(
+                    GENERATION_ERROR_ANSWER if text_failed else PARTIAL_IMAGE_ANSWER
+                ),
             )
-    except OpenAIUnsupportedLocation as e:
-        await handle_openai_error(
-            error=e,
-            upd=call,
-            job="starter_generation",
-            animation=animation_while_generating_text,
-        )
-        #  Сохранение записи о генерации в базу данных
-        if generation:
-            generation.gen_status = "error"
-            await db_session.commit()
+        elif photo_result is None:
+            logger.error("Gemini returned no image for starter_generation")
+            if not text_failed:
+                await call.message.answer(PARTIAL_IMAGE_ANSWER)
         else:
-            gen_data["gen_status"] = "error"
-            generation = await add_generation(
-                session=db_session, commit=True, **gen_data
+            unexpected = photo_result
+    if text_failed:
+        if isinstance(
+            text_result, (OpenAIUnsupportedLocation, OpenAIIncompleteResponse)
+        ):
+            await handle_openai_error(
+                error=text_result,
+                upd=call,
+                job="starter_generation",
+                user_answer=(
+                    GENERATION_ERROR_ANSWER if photo_failed else PARTIAL_TEXT_ANSWER
+                ),
             )
-        return
-    except Exception as e:
-        if generation:
-            generation.gen_status = "error"
-            await db_session.commit()
         else:
-            gen_data["gen_status"] = "error"
-            generation = await add_generation(
-                session=db_session, commit=True, **gen_data
-            )
-        raise e
+            unexpected = unexpected or text_result
+
+    if photo_failed and text_failed:
+        if unexpected:
+            raise unexpected
+        return
 
     #  updating user input info in database
     user_id = call.from_user.id
@@ -179,14 +173,22 @@ async def stir_the_cauldron(
     }
     kbd = InlineKbd(buttons=readings_main_buttons, width=2)
 
-    await animation_while_generating_text.stop()
-
     try:
-        await call.message.answer_photo(
-            photo=photo,
-            caption=answer,
-            reply_markup=main_reply_kbd.markup,
-        )
+        if text_failed:
+            await call.message.answer_photo(
+                photo=photo_result, reply_markup=main_reply_kbd.markup
+            )
+        elif photo_failed:
+            await answer_long(
+                call.message, text_result[0], reply_markup=main_reply_kbd.markup
+            )
+        else:
+            await answer_photo_with_caption(
+                call.message,
+                photo=photo_result,
+                caption=text_result[0],
+                reply_markup=main_reply_kbd.markup,
+            )
     except TelegramBadRequest as e:
         logger.error(f"Error sending photo: {e}")
         pass
@@ -195,13 +197,16 @@ async def stir_the_cauldron(
     await state.set_state(ReadingsStates.witch)
     await state.update_data(name=user.name, birthday=user.birthday, sex=user.sex)
 
+    if unexpected:
+        raise unexpected
+
 
 #  ----------- FOLLOW UP RESPONSE -----------
 
 
 @witch_rtr.message(BalanceCheck())
 async def follow_up_response(
-    message: Message, state: FSMContext, db_session: AsyncSession
+    message: Message, state: FSMContext, db_session: AsyncSession, ai: AIClients
 ) -> None:
     context = await state.get_data()
     if context:
@@ -211,20 +216,41 @@ async def follow_up_response(
         )
         #  Getting conversation id from database
         conversation_id = context.get("conversation_id")
-        #  Getting response from OpenAI
-        client = OpenAIClient(conv=conversation_id)
-        answer = await client.chatgpt_response_follow_up(prompt=message.text)
 
         user = await get_user_by_telegram_id(message.from_user.id, db_session)
 
-        if answer:
-            new_balance = await decrease_user_balance(
-                user.id,
-                COST["follow_up"],
-                db_session,
+        #  Резервируем энергию до вызова OpenAI (коммит заодно освобождает
+        #  соединение с БД на время генерации)
+        hold_id = await reserve_credits(
+            user_id=user.id,
+            amount=COST["follow_up"],
+            purpose="follow_up",
+            session=db_session,
+        )
+        if hold_id is None:
+            await message.answer(CREDIT_HOLD_REJECTED_ANSWER)
+            return
+
+        #  Getting response from OpenAI (ответ выводится по мере генерации)
+        placeholder = await message.answer("✨ Настраиваюсь на поток...")
+        try:
+            answer = await StreamingReply(placeholder).run(
+                ai.openai.stream_follow_up(
+                    prompt=message.text, conversation=Conversation(id=conversation_id)
+                )
             )
+        except (OpenAIUnsupportedLocation, OpenAIIncompleteResponse) as e:
+            await release_credits(hold_id, db_session)
+            await handle_openai_error(error=e, upd=message, job="follow_up")
+            return
+        except Exception:
+            await release_credits(hold_id, db_session)
+            raise
 
-        await message.answer(answer)
+        if answer:
+            await capture_credits(hold_id, db_session)
+        else:
+            await release_credits(hold_id, db_session)
 
     else:
         return
@@ -11,6 +11,9 @@ __all__ = (
     "EmailStates",
     "GENERATION_ERROR_ANSWER",
     "ERROR_ANSWER",
+    "PARTIAL_IMAGE_ANSWER",
+    "PARTIAL_TEXT_ANSWER",
+    "CREDIT_HOLD_REJECTED_ANSWER",
     "LkButton",
     "LkTopUp",
     "TARIFFS",
@@ -32,7 +35,13 @@ from .bio_sch import BioEdit, BioCorrect, BioSex, BioStates
 from .bonuses_sch import BONUSES
 from .daily_card_sch import DailyCardStates
 from .email_sch import EmailStates
-from .error_answer import GENERATION_ERROR_ANSWER, ERROR_ANSWER
+from .error_answer import (
+    GENERATION_ERROR_ANSWER,
+    ERROR_ANSWER,
+    PARTIAL_IMAGE_ANSWER,
+    PARTIAL_TEXT_ANSWER,
+    CREDIT_HOLD_REJECTED_ANSWER,
+)
 from .lk_sch import LkButton, LkTopUp, TARIFFS, REFERRAL_BONUS_PERCENT
 from .master_sch import main_reply_kbd, BalanceCheck, StartCallback, Sub2Callback
 from .maintenance_sch import CalculateArcana, DeleteFunc
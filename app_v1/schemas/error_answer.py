@@ -10,3 +10,18 @@ ERROR_ANSWER = (  #  Google Client Error
     "Связь с матрицей растворилась в шуме нулей и единиц.\n"
     "Она вернётся, когда линии судьбы снова найдут точку соприкосновения."
 )
+
+PARTIAL_IMAGE_ANSWER = (  #  Изображение не получено, текст готов
+    "Образ пока не проявился сквозь шум нулей и единиц,\n"
+    "но послание Матрицы уже дошло до тебя 👇"
+)
+
+PARTIAL_TEXT_ANSWER = (  #  Текст не получен, изображение готово
+    "Слова пока не проявились сквозь шум нулей и единиц,\n"
+    "но твой образ уже готов 👇"
+)
+
+CREDIT_HOLD_REJECTED_ANSWER = (  #  Резерв энергии не создан
+    "Матрица уже работает над твоим запросом или энергии недостаточно ⚡️\n"
+    "Дождись ответа или пополни баланс."
+)
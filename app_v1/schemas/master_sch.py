@@ -2,9 +2,8 @@ from aiogram.fsm.state import State, StatesGroup
 from aiogram.filters import Filter
 from aiogram.filters.callback_data import CallbackData
 from aiogram.types import Message, CallbackQuery
-from sqlalchemy.ext.asyncio import AsyncSession
 from aiogram.fsm.context import FSMContext
-from db.crud.users_crud import get_user_balance
+from db.models import User
 
 
 from keyboards import ReplyKbd
@@ -19,15 +18,14 @@ class BalanceCheck(Filter):
     async def __call__(
         self,
         update: Message | CallbackQuery,
-        db_session: AsyncSession,
+        user: User | None,
         state: FSMContext,
     ) -> bool:
-        if not update.from_user:
+        if not update.from_user or user is None:
             return False
 
-        user_balance = (
-            await get_user_balance(user_id=update.from_user.id, session=db_session) or 0
-        )
+        #  Пользователь уже загружен UserMiddleware, повторный запрос не нужен
+        user_balance = user.balance or 0
 
         data = await state.get_data()
         cost = data.get("cost")
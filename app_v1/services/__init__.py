@@ -1,30 +1,58 @@
 __all__ = [
+    "AIClients",
     "get_admin_stats",
     "calculate_arcana",
     "ARCANA_MAP",
+    "CONTENT",
+    "ContentRegistry",
+    "CreditHoldSweeper",
     "start_fastapi",
+    "DailyCardPregen",
+    "generate_daily_card",
     "first_start_routine",
+    "BoundedMemoryStorage",
+    "PostgresStorage",
+    "GENERATIONS",
+    "GenerationHistorySink",
     "handle_google_ai_error",
     "GoogleAI",
     "GoogleAILimitError",
     "GoogleAIUnavailable",
     "GoogleAIUnsupportedLocation",
+    "JobRuntime",
     "MessageAnimation",
+    "StreamingReply",
+    "answer_long",
+    "answer_photo_with_caption",
     "OpenAIClient",
+    "Conversation",
     "handle_openai_error",
     "OpenAIUnsupportedLocation",
+    "OpenAIIncompleteResponse",
+    "PaymentEventConsumer",
+    "PAYMENT_STATUSES",
+    "PaymentStatusCache",
     "PaymentPoller",
+    "PaymentReconciler",
     "sub_2_check",
     "apply_sub_2_bonus",
     "TopupRoutine",
+    "UpdateConsumer",
     "WebhookServer",
     "PaymentService",
+    "YooKassaClient",
+    "YooKassaError",
+    "YKPaymentInfo",
 ]
 
 from .admin_stats import get_admin_stats
 from .arcana_serv import calculate_arcana, ARCANA_MAP
+from .content_registry import CONTENT, ContentRegistry
+from .credit_hold_sweeper import CreditHoldSweeper
 from .fastapi_webhook_server import start_fastapi
 from .first_start import first_start_routine
+from .fsm_storage import BoundedMemoryStorage, PostgresStorage
+from .generation_sink import GENERATIONS, GenerationHistorySink
 from .google_ai import (
     handle_google_ai_error,
     GoogleAI,
@@ -32,11 +60,26 @@ from .google_ai import (
     GoogleAIUnavailable,
     GoogleAIUnsupportedLocation,
 )
+from .job_runtime import JobRuntime
 from .message_animation import MessageAnimation
-from .openai import OpenAIClient, handle_openai_error, OpenAIUnsupportedLocation
+from .message_delivery import StreamingReply, answer_long, answer_photo_with_caption
+from .openai import (
+    OpenAIClient,
+    Conversation,
+    handle_openai_error,
+    OpenAIUnsupportedLocation,
+    OpenAIIncompleteResponse,
+)
+from .ai_clients import AIClients
+from .daily_card_serv import DailyCardPregen, generate_daily_card
+from .yk_client import YooKassaClient, YooKassaError, YKPaymentInfo
 from .payment_poller import PaymentPoller
+from .payment_reconciler import PaymentReconciler
+from .payment_events import PaymentEventConsumer
+from .payment_status import PAYMENT_STATUSES, PaymentStatusCache
 from .sub_2_check import sub_2_check, apply_sub_2_bonus
 from .topup_routine import TopupRoutine
+from .update_consumer import UpdateConsumer
 from .webhook_payment_poller import WebhookServer
 from .yk_payments import PaymentService
 
@@ -1,63 +1,71 @@
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import func, select
-from datetime import datetime, timedelta
-from db.models import User, GenerationHistory, Payment
+from datetime import timedelta
+from db.models import User, DailyStat
 
+#  Сегмент -> поле результата; счётчики users_segment:<segment> ведёт
+#  триггер на таблице users
+SEGMENTS = {"lead": "leads", "qual": "quals", "client": "clients", "banned": "banned"}
 
-async def get_admin_stats(db_session: AsyncSession) -> dict:
 
-    total_users = await db_session.scalar(select(func.count(User.id)))
-    active_users = await db_session.scalar(
-        select(func.count(User.id)).where(
-            User.last_updated >= datetime.now() - timedelta(days=1)
-        )
-    )
-    new_users_today = await db_session.scalar(
-        select(func.count(User.id)).where(
-            func.date(User.created_at) == func.current_date()
-        )
-    )
-    new_users_yesterday = await db_session.scalar(
-        select(func.count(User.id)).where(
-            func.date(User.created_at) == func.current_date() - 1
-        )
-    )
-    total_generations = await db_session.scalar(
-        select(func.count(GenerationHistory.id))
-    )
-    total_payments = await db_session.scalar(
-        select(func.count(Payment.id)).where(Payment.status == "completed")
-    )
-    payments_today = await db_session.scalar(
-        select(func.count(Payment.id)).where(
-            func.date(Payment.created_at) == func.current_date(),
-            Payment.status == "completed",
-        )
-    )
-    payments_yesterday = await db_session.scalar(
-        select(func.count(Payment.id)).where(
-            func.date(Payment.created_at) == func.current_date() - 1,
-            Payment.status == "completed",
-        )
-    )
+def _percent(part: int, total: int) -> float:
+    return (part / total) * 100 if total else 0.0
 
-    leads = await db_session.scalar(
-        select(func.count(User.id)).where(User.segment == "lead")
-    )
-    quals = await db_session.scalar(
-        select(func.count(User.id)).where(User.segment == "qual")
-    )
-    clients = await db_session.scalar(
-        select(func.count(User.id)).where(User.segment == "client")
-    )
-    banned = await db_session.scalar(
-        select(func.count(User.id)).where(User.segment == "banned")
+
+def _day_sum(metric: str, day=None):
+    """SUM(value) FILTER (...) по дневной сводке; без дня — за всю историю."""
+    condition = DailyStat.metric == metric
+    if day is not None:
+        condition = condition & (DailyStat.day == day)
+    return func.coalesce(func.sum(DailyStat.value).filter(condition), 0)
+
+
+async def get_admin_stats(db_session: AsyncSession) -> dict:
+    #  Активные — диапазон по индексу ix_users_last_updated, без прохода
+    #  по всей таблице
+    active = (
+        select(func.count().label("active_users"))
+        .where(User.last_updated >= func.now() - timedelta(days=1))
+        .subquery()
     )
 
-    leads_percentage = (leads / total_users) * 100
-    quals_percentage = (quals / total_users) * 100
-    clients_percentage = (clients / total_users) * 100
-    banned_percentage = (banned / total_users) * 100
+    #  События и размеры сегментов берём из дневной сводки daily_stats,
+    #  а не из сырых таблиц
+    today = func.current_date()
+    yesterday = func.current_date() - 1
+    events = select(
+        _day_sum("users_new", today).label("new_users_today"),
+        _day_sum("users_new", yesterday).label("new_users_yesterday"),
+        _day_sum("generations").label("total_generations"),
+        _day_sum("payments_completed").label("total_payments"),
+        _day_sum("payments_completed", today).label("payments_today"),
+        _day_sum("payments_completed", yesterday).label("payments_yesterday"),
+        *(
+            _day_sum(f"users_segment:{segment}").label(label)
+            for segment, label in SEGMENTS.items()
+        ),
+    ).subquery()
+
+    row = (await db_session.execute(select(active, events))).one()
+
+    leads = row.leads
+    quals = row.quals
+    clients = row.clients
+    banned = row.banned
+
+    total_users = leads + quals + clients + banned
+    active_users = row.active_users
+    new_users_today = row.new_users_today
+    new_users_yesterday = row.new_users_yesterday
+    total_generations = row.total_generations
+    total_payments = row.total_payments
+    payments_today = row.payments_today
+    payments_yesterday = row.payments_yesterday
+
+    leads_percentage = _percent(leads, total_users)
+    quals_percentage = _percent(quals, total_users)
+    clients_percentage = _percent(clients, total_users)
+    banned_percentage = _percent(banned, total_users)
 
     text = f"""
 <b>✨ MatrikaSoulBot ✨</b> статистика
@@ -0,0 +1,46 @@
+import logging
+
+import httpx
+from google.genai import Client
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+from core.config import settings
+from services.google_ai import GoogleAI
+from services.openai import OpenAIClient
+
+logger = logging.getLogger(__name__)
+
+
+#  Пул keep-alive соединений: TLS-рукопожатие делается один раз, а не на каждую генерацию
+HTTP_LIMITS = httpx.Limits(
+    max_connections=100,
+    max_keepalive_connections=20,
+    keepalive_expiry=60,
+)
+
+
+class AIClients:
+    """
+    Реестр клиентов OpenAI и Gemini, общих для всего процесса.
+
+    Создаётся один раз в main.py и передаётся в хендлеры через workflow data
+    диспетчера под ключом "ai".
+    """
+
+    def __init__(self):
+        self.openai = OpenAIClient(
+            AsyncOpenAI(
+                api_key=settings.openai_api_key,
+                timeout=settings.openai_timeout,
+                http_client=DefaultAsyncHttpxClient(limits=HTTP_LIMITS),
+            )
+        )
+        self.google = GoogleAI(Client(api_key=settings.google_api_key))
+
+    async def close(self) -> None:
+        """Закрывает все HTTP-соединения клиентов."""
+        for client in (self.openai, self.google):
+            try:
+                await client.close()
+            except Exception as e:
+                logger.error(f"Error closing {type(client).__name__}: {e}")
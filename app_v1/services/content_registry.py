@@ -0,0 +1,260 @@
+"""Реестр текстов разборов и AI-образов из YAML-карт."""
+
+import asyncio
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+from types import MappingProxyType
+from typing import Mapping, Optional
+
+import yaml
+from aiogram.types import InlineKeyboardMarkup
+
+from core.config import COST
+from keyboards import InlineKbd
+from schemas import AiPortrait, AiPortraitGenerate, ReadingsDomain, ReadingsSub
+
+logger = logging.getLogger(__name__)
+
+SCHEMAS_DIR = Path(__file__).parent.parent / "schemas"
+
+
+#  ----------- READINGS -----------
+
+
+@dataclass(frozen=True, slots=True)
+class ReadingAspect:
+    """Кнопка-аспект внутри сферы разбора."""
+
+    key: str
+    label: str
+    #  Специальная часть промпта для этого аспекта
+    special: str
+    #  Упакованная callback data кнопки
+    callback: str
+
+
+@dataclass(frozen=True, slots=True)
+class ReadingDomainContent:
+    """Сфера разбора: описание, аспекты и готовая клавиатура."""
+
+    key: str
+    title: str
+    description_header: str
+    description: str
+    description_footer: str
+    aspects: Mapping[str, ReadingAspect]
+    #  Готовый текст сообщения с описанием сферы
+    text: str
+    keyboard: InlineKeyboardMarkup
+
+
+#  ----------- AI-PORTRAITS -----------
+
+
+#  Образы по двум датам рождения: сначала спрашиваем дату второго человека
+PARTNER_PORTRAITS = ("compatibility", "gift_to_friend")
+
+
+@dataclass(frozen=True, slots=True)
+class PortraitContent:
+    """AI-образ: тексты для пользователя, фокус промпта и готовая клавиатура."""
+
+    key: str
+    title: str
+    caption_title: str
+    description: str | None
+    description_male: str | None
+    description_female: str | None
+    description_footer: str
+    prompt_focus: str
+    keyboard: InlineKeyboardMarkup
+
+    @property
+    def needs_partner(self) -> bool:
+        return self.key in PARTNER_PORTRAITS
+
+    def describe(self, sex: str | None) -> str:
+        """Описание образа с учётом пола пользователя."""
+        if self.description is not None:
+            return self.description
+        return self.description_male if sex == "m" else self.description_female
+
+
+@dataclass(frozen=True, slots=True)
+class Content:
+    readings: Mapping[str, ReadingDomainContent]
+    portraits: Mapping[str, PortraitContent]
+    #  Меню выбора AI-образа
+    portraits_keyboard: InlineKeyboardMarkup
+
+
+def _build_readings(data: dict) -> Mapping[str, ReadingDomainContent]:
+    price = f"💎 Энергообмен: {COST['reading']} ⚡️ | За открытие любой темы 🔓"
+    domains = {}
+    for domain, domain_data in data.items():
+        aspects = {}
+        for aspect, button_data in domain_data["buttons"].items():
+            if aspect == "back":
+                callback = ReadingsDomain(button="back").pack()
+            else:
+                callback = ReadingsSub(domain=domain, aspect=aspect).pack()
+            aspects[aspect] = ReadingAspect(
+                key=aspect,
+                label=button_data["label"],
+                special=button_data.get("special") or "",
+                callback=callback,
+            )
+
+        header = domain_data["description_header"]
+        desc = domain_data["description"]
+        footer = domain_data["description_footer"]
+        buttons = {aspect.label: aspect.callback for aspect in aspects.values()}
+
+        domains[domain] = ReadingDomainContent(
+            key=domain,
+            title=domain_data["title"],
+            description_header=header,
+            description=desc,
+            description_footer=footer,
+            aspects=MappingProxyType(aspects),
+            text=f"<b>{header}</b>\n{desc}\n{price}\n<b>{footer}</b>",
+            keyboard=InlineKbd(buttons=buttons, width=1).markup,
+        )
+    return MappingProxyType(domains)
+
+
+def _portrait_keyboard(key: str) -> InlineKeyboardMarkup:
+    back = AiPortraitGenerate(button="back").pack()
+    if key in PARTNER_PORTRAITS:
+        buttons = {"🔙 Назад": back}
+    else:
+        buttons = {
+            "🪄 Создать AI-образ✨": AiPortraitGenerate(button="generate").pack(),
+            "🔙 Назад": back,
+        }
+    return InlineKbd(buttons=buttons, width=2).markup
+
+
+def _build_portraits_keyboard(
+    portraits: Mapping[str, PortraitContent],
+) -> InlineKeyboardMarkup:
+    buttons = {
+        portrait.title: AiPortrait(button=key).pack()
+        for key, portrait in portraits.items()
+    }
+    return InlineKbd(buttons=buttons, width=2).markup
+
+
+def _build_portraits(data: dict) -> Mapping[str, PortraitContent]:
+    portraits = {
+        key: PortraitContent(
+            key=key,
+            title=portrait["title"],
+            caption_title=portrait["caption_title"],
+            description=portrait.get("description"),
+            description_male=portrait.get("description_male"),
+            description_female=portrait.get("description_female"),
+            description_footer=portrait["description_footer"],
+            prompt_focus=portrait["prompt_focus"],
+            keyboard=_portrait_keyboard(key),
+        )
+        for key, portrait in data.items()
+    }
+    return MappingProxyType(portraits)
+
+
+class ContentRegistry:
+    """
+    Держит в памяти разобранные readings_map.yml и ai_portraits_map.yml.
+
+    Карты читаются один раз при старте. Если включено наблюдение за файлами,
+    изменённые карты перечитываются без перезапуска бота; при ошибке в YAML
+    остаётся предыдущая версия.
+    """
+
+    def __init__(
+        self,
+        readings_path: Path = SCHEMAS_DIR / "readings_map.yml",
+        portraits_path: Path = SCHEMAS_DIR / "ai_portraits_map.yml",
+    ):
+        self.readings_path = readings_path
+        self.portraits_path = portraits_path
+        self._content: Content | None = None
+        self._mtimes: tuple[float, float] | None = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _current_mtimes(self) -> tuple[float, float]:
+        return (
+            self.readings_path.stat().st_mtime,
+            self.portraits_path.stat().st_mtime,
+        )
+
+    def load(self) -> None:
+        """Читает обе карты и атомарно подменяет текущее содержимое."""
+        mtimes = self._current_mtimes()
+        with open(self.readings_path, "r", encoding="utf-8") as f:
+            readings = _build_readings(yaml.safe_load(f))
+        with open(self.portraits_path, "r", encoding="utf-8") as f:
+            portraits = _build_portraits(yaml.safe_load(f))
+
+        self._content = Content(
+            readings=readings,
+            portraits=portraits,
+            portraits_keyboard=_build_portraits_keyboard(portraits),
+        )
+        self._mtimes = mtimes
+
+    @property
+    def content(self) -> Content:
+        if self._content is None:
+            self.load()
+        return self._content
+
+    @property
+    def readings(self) -> Mapping[str, ReadingDomainContent]:
+        return self.content.readings
+
+    @property
+    def portraits(self) -> Mapping[str, PortraitContent]:
+        return self.content.portraits
+
+    @property
+    def portraits_keyboard(self) -> InlineKeyboardMarkup:
+        return self.content.portraits_keyboard
+
+    async def start_watching(self, interval: float = 2.0) -> None:
+        """Запускает фоновую проверку изменений в YAML-картах."""
+        if self._task and not self._task.done():
+            return
+
+        async def watch_loop():
+            mtimes = self._mtimes
+            while True:
+                await asyncio.sleep(interval)
+                try:
+                    mtimes = self._current_mtimes()
+                    if mtimes == self._mtimes:
+                        continue
+                    self.load()
+                    logger.info("Content maps reloaded")
+                except Exception as e:
+                    #  Не пытаемся перечитать тот же сломанный файл снова
+                    self._mtimes = mtimes
+                    logger.error(f"Error reloading content maps: {e}")
+
+        self._task = asyncio.create_task(watch_loop())
+        logger.info("Watching content maps for changes")
+
+    async def stop_watching(self) -> None:
+        """Останавливает проверку изменений."""
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+
+CONTENT = ContentRegistry()
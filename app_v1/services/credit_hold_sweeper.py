@@ -0,0 +1,65 @@
+import logging
+from typing import Optional
+
+import asyncio
+
+from db.database import AsyncSessionLocal
+from db.crud import release_expired_holds
+
+logger = logging.getLogger(__name__)
+
+
+class CreditHoldSweeper:
+    """Сервис, возвращающий на баланс просроченные резервы энергии."""
+
+    def __init__(self, interval: int = 60):
+        """
+        Инициализация сборщика резервов.
+
+        Резерв просрочен, если генерация не подтвердила и не вернула его
+        за settings.credit_hold_ttl (например, процесс упал посреди генерации).
+
+        Args:
+            interval: Интервал проверки в секундах (по умолчанию 60)
+        """
+        self.interval = interval
+        self.is_running = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def sweep(self) -> None:
+        """Возвращает все просроченные резервы одним запросом."""
+        async with AsyncSessionLocal() as session:
+            refunded = await release_expired_holds(session)
+        if refunded:
+            logger.warning(f"Released expired credit holds for {refunded} users")
+
+    async def start(self) -> None:
+        """Запускает фоновую задачу."""
+        if self.is_running:
+            return
+
+        self.is_running = True
+
+        async def sweep_loop():
+            while self.is_running:
+                try:
+                    await self.sweep()
+                except Exception as e:
+                    logger.error(f"Error sweeping credit holds: {e}", exc_info=True)
+
+                await asyncio.sleep(self.interval)
+
+        self._task = asyncio.create_task(sweep_loop())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу."""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import Optional
+
+from aiogram.types import BufferedInputFile
+
+from core.config import TZ, bot, devs, settings, today
+from db.crud import get_daily_card_arcanas, save_daily_card
+from db.database import AsyncSessionLocal
+from services.ai_clients import AIClients
+from services.arcana_serv import ARCANA_MAP
+
+logger = logging.getLogger(__name__)
+
+
+async def generate_daily_card(
+    ai: AIClients, arcana: int, card_date: date
+) -> tuple[str, BufferedInputFile | None]:
+    """
+    Генерирует текст и изображение карты дня.
+
+    Карта зависит только от даты и центрального аркана, поэтому
+    результат подходит всем пользователям с этим арканом.
+
+    Args:
+        ai: Реестр AI-клиентов.
+        arcana: Номер центрального аркана.
+        card_date: Дата, на которую генерируется карта.
+
+    Returns:
+        Кортеж из (текст, изображение).
+    """
+    context = {"main_arcana": arcana, "current_date": card_date}
+
+    answer, _ = await ai.openai.chatgpt_response(
+        feature="daily_card", context=context, max_length=1020
+    )
+    context["chatGPT_answer"] = answer
+
+    picture = await ai.google.generate_picture(feature="daily_card", context=context)
+    return answer, picture
+
+
+class DailyCardPregen:
+    """Фоновая задача, которая к полуночи заполняет кэш карт дня для всех арканов."""
+
+    def __init__(self, ai: AIClients, concurrency: int = 4):
+        """
+        Инициализация предгенерации карт дня.
+
+        Args:
+            ai: Реестр AI-клиентов.
+            concurrency: Сколько карт генерируется одновременно.
+        """
+        self.ai = ai
+        self.concurrency = concurrency
+        #  Без чата для загрузки file_id получить нельзя: предгенерация выключена
+        self.chat_id: int | None = settings.daily_card_chat_id or (
+            int(devs[0]) if devs else None
+        )
+        self.is_running = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def _upload(self, picture: BufferedInputFile) -> str:
+        """Загружает изображение в Telegram и возвращает его file_id."""
+        message = await bot.send_photo(
+            chat_id=self.chat_id, photo=picture, disable_notification=True
+        )
+        await message.delete()
+        return message.photo[-1].file_id
+
+    async def _fill_arcana(self, arcana: int, card_date: date) -> None:
+        answer, picture = await generate_daily_card(self.ai, arcana, card_date)
+        if picture is None:
+            logger.warning(f"Daily card {card_date} arcana {arcana}: no picture")
+            return
+
+        file_id = await self._upload(picture)
+        async with AsyncSessionLocal() as session:
+            await save_daily_card(
+                card_date=card_date,
+                arcana=arcana,
+                text=answer,
+                file_id=file_id,
+                session=session,
+            )
+
+    async def fill_day(self, card_date: date) -> None:
+        """Генерирует карты дня для всех арканов, которых ещё нет в кэше."""
+        async with AsyncSessionLocal() as session:
+            ready = await get_daily_card_arcanas(card_date, session)
+
+        missing = [arcana for arcana in ARCANA_MAP if arcana not in ready]
+        if not missing:
+            return
+
+        logger.info(f"Pre-generating {len(missing)} daily cards for {card_date}...")
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fill(arcana: int) -> None:
+            async with semaphore:
+                try:
+                    await self._fill_arcana(arcana, card_date)
+                except Exception as e:
+                    logger.error(
+                        f"Error pre-generating daily card {card_date} arcana {arcana}: {e}",
+                        exc_info=True,
+                    )
+
+        await asyncio.gather(*(fill(arcana) for arcana in missing))
+        logger.info(f"Daily cards for {card_date} are ready")
+
+    async def start(self) -> None:
+        """Запускает фоновую задачу предгенерации."""
+        if self.is_running:
+            logger.warning("Daily card pregen is already running")
+            return
+        if self.chat_id is None:
+            logger.warning(
+                "Daily card pregen disabled: set BOT_DAILY_CARD_CHAT_ID "
+                "or add a dev to roles.json"
+            )
+            return
+
+        self.is_running = True
+        logger.info("Starting daily card pregen")
+
+        async def pregen_loop():
+            while self.is_running:
+                try:
+                    await self.fill_day(today())
+                except Exception as e:
+                    logger.error(f"Error in daily card pregen: {e}", exc_info=True)
+
+                #  Спим до ближайшей полуночи по часовому поясу бота
+                now = datetime.now(TZ)
+                midnight = datetime.combine(
+                    now.date() + timedelta(days=1), time.min, tzinfo=TZ
+                )
+                await asyncio.sleep((midnight - now).total_seconds())
+
+        self._task = asyncio.create_task(pregen_loop())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую задачу предгенерации."""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        logger.info("Daily card pregen stopped")
@@ -1,16 +1,16 @@
-import asyncio
+import hmac
 import uvicorn
 from fastapi import FastAPI
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 # from yookassa import Payment as YKPayment, Webhook
 
-from core.config import bot, YK_TRUSTED_NETWORKS
-from db.crud import get_payment_by_payment_id, get_user
+from core.config import settings, YK_TRUSTED_NETWORKS
+from db.crud import add_payment_event, add_telegram_update
 from db.database import AsyncSessionLocal
-from services.topup_routine import TopupRoutine
-from db.models.payment import Payment
+from services.payment_status import PAYMENT_STATUSES
+from services.update_consumer import update_chat_id
 
 
 # --- FastAPI app ---
@@ -37,33 +37,64 @@ async def webhook(request: Request):
         return JSONResponse({"message": "Forbidden"}, status_code=403)
 
     payload = await request.json()
-    print(payload)
-
     status = payload.get("object", {}).get("status")
     id = payload.get("object", {}).get("id")
-    chat_id = payload.get("object", {}).get("metadata", {}).get("chat_id")
+    if not status or not id:
+        return JSONResponse({"message": "Bad request"}, status_code=400)
 
-    if status == "succeeded":
-        async with AsyncSessionLocal() as session:
+    # Только сохраняем уведомление: начисление делает PaymentEventConsumer
+    async with AsyncSessionLocal() as session:
+        await add_payment_event(
+            payment_id=id, status=status, payload=payload, session=session
+        )
+    #  Кэш статусов — только после того, как событие записано
+    PAYMENT_STATUSES.set(id, status)
 
-            payment: Payment = await get_payment_by_payment_id(id, session=session)
-            if payment and payment.status == "pending":
+    consumer = getattr(app.state, "payment_event_consumer", None)
+    if consumer is not None:
+        consumer.wake()
 
-                user = await get_user(payment.user_id, session=session)
+    return JSONResponse({"message": "Webhook received successfully"}, status_code=200)
 
-                topup_routine = TopupRoutine(session=session, user_id=user.id)
-                await topup_routine.process_successful_payment(payment=payment)
 
-        # Не блокируем ответ телеграм-запросом, запускаем отправку в фоне
-        if chat_id and payment and payment.status == "completed":
-            asyncio.create_task(
-                bot.send_message(
-                    chat_id=chat_id,
-                    text=(f"+ {payment.amount} энергии ⚡️"),
-                )
-            )
+@app.post("/webhook/telegram")
+async def telegram_webhook(request: Request):
+    """
+    Принимает апдейт Telegram и кладёт его в telegram_updates.
 
-    return JSONResponse({"message": "Webhook received successfully"}, status_code=200)
+    Обработка идёт в процессе, владеющем шардом чата (UpdateConsumer),
+    поэтому принять апдейт может любой процесс за балансировщиком.
+    """
+    secret = request.headers.get("X-Telegram-Bot-Api-Secret-Token", "")
+    if not settings.webhook_secret or not hmac.compare_digest(
+        secret, settings.webhook_secret
+    ):
+        return JSONResponse({"message": "Forbidden"}, status_code=403)
+
+    payload = await request.json()
+    chat_id = update_chat_id(payload)
+    async with AsyncSessionLocal() as session:
+        await add_telegram_update(
+            update_id=payload["update_id"],
+            chat_id=chat_id,
+            payload=payload,
+            session=session,
+        )
+
+    #  Если шард этого чата наш — не ждём следующего опроса таблицы
+    consumer = getattr(app.state, "update_consumer", None)
+    if consumer is not None and consumer.owns(chat_id):
+        consumer.wake()
+
+    return JSONResponse({"ok": True}, status_code=200)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Лидерство и heartbeat фоновых задач этой реплики (формат Prometheus)."""
+    job_runtime = getattr(app.state, "job_runtime", None)
+    body = job_runtime.metrics() if job_runtime is not None else ""
+    return PlainTextResponse(body)
 
 
 # --- Function to run FastAPI in background ---
@@ -73,7 +104,7 @@ async def start_fastapi():
     config = uvicorn.Config(
         app,
         host="0.0.0.0",
-        port=8000,
+        port=settings.http_port + settings.worker_index,
         log_level="info",  # debug, info, warning, error, critical
         ssl_keyfile="certs/key.pem",
         ssl_certfile="certs/cert.pem",
@@ -0,0 +1,300 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from copy import copy
+from dataclasses import dataclass, field
+from datetime import timedelta
+from time import monotonic
+from typing import Any, Mapping
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import (
+    BaseStorage,
+    DefaultKeyBuilder,
+    KeyBuilder,
+    StateType,
+    StorageKey,
+)
+from sqlalchemy import delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+
+from db.database import AsyncSessionLocal
+from db.models import FsmState
+
+logger = logging.getLogger(__name__)
+
+
+def _state_name(state: StateType) -> str | None:
+    return state.state if isinstance(state, State) else state
+
+
+@dataclass(slots=True)
+class _Record:
+    state: str | None = None
+    data: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def empty(self) -> bool:
+        return self.state is None and not self.data
+
+
+class PostgresStorage(BaseStorage):
+    """
+    FSM-хранилище aiogram в Postgres с LRU-кэшем в памяти процесса.
+
+    Чтения обслуживаются из кэша (промах — один SELECT по ключу). Записи
+    сразу попадают в кэш и в очередь «грязных» ключей, которую фоновая
+    задача раз в `flush_interval` секунд пишет одним многострочным upsert
+    (пустое состояние удаляет строку). `close()` дописывает очередь.
+    Раз в `cleanup_interval` удаляются состояния, не менявшиеся `ttl`.
+
+    Запись отложенная (write-behind), а не сквозная: при аварийном
+    завершении процесса (SIGKILL, OOM) теряются изменения последних
+    `flush_interval` секунд, а при недоступной БД — всё, что накопилось
+    с последней успешной записи. При штатной остановке ничего не теряется:
+    `close()` дописывает очередь. Для FSM это допустимо — пользователь
+    в худшем случае повторит последний шаг диалога, зато запись не ждёт БД.
+
+    Кэш принадлежит процессу: несколько процессов бота должны получать
+    апдейты одного чата в один и тот же процесс.
+    """
+
+    def __init__(
+        self,
+        cache_size: int = 10_000,
+        flush_interval: float = 0.2,
+        ttl: timedelta = timedelta(days=30),
+        cleanup_interval: float = 3600,
+        key_builder: KeyBuilder | None = None,
+    ):
+        """
+        Инициализация хранилища.
+
+        Args:
+            cache_size: Максимум ключей в LRU-кэше.
+            flush_interval: Период пакетной записи в БД в секундах.
+            ttl: Через сколько без изменений состояние удаляется из БД.
+            cleanup_interval: Период удаления устаревших состояний в секундах.
+            key_builder: Построитель строкового ключа из StorageKey.
+        """
+        self.cache_size = cache_size
+        self.flush_interval = flush_interval
+        self.ttl = ttl
+        self.cleanup_interval = cleanup_interval
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self._cache: OrderedDict[str, _Record] = OrderedDict()
+        #  Ещё не записанные изменения: ключ -> снимок записи
+        self._dirty: dict[str, _Record] = {}
+        self._task: asyncio.Task | None = None
+        self._closing = False
+
+    #  ----------- CACHE -----------
+
+    def _remember(self, key: str, record: _Record) -> None:
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    async def _load(self, key: str) -> _Record:
+        if key in self._dirty:
+            return self._dirty[key]
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        async with AsyncSessionLocal() as session:
+            row = (
+                await session.execute(
+                    select(FsmState.state, FsmState.data).where(FsmState.key == key)
+                )
+            ).one_or_none()
+        record = _Record(row.state, row.data or {}) if row else _Record()
+        #  Пока шёл SELECT, ключ могли записать — не затираем свежие данные
+        if key in self._dirty:
+            return self._dirty[key]
+        self._remember(key, record)
+        return record
+
+    def _store(self, key: str, record: _Record) -> None:
+        self._remember(key, record)
+        self._dirty[key] = record
+        if self._task is None or self._task.done():
+            if not self._closing:
+                self._task = asyncio.create_task(self._flush_loop())
+
+    #  ----------- BaseStorage -----------
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        skey = self.key_builder.build(key)
+        current = await self._load(skey)
+        self._store(skey, _Record(_state_name(state), current.data))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return (await self._load(self.key_builder.build(key))).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise ValueError(f"Data must be a dict, got {type(data).__name__}")
+        skey = self.key_builder.build(key)
+        current = await self._load(skey)
+        self._store(skey, _Record(current.state, copy(data)))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return copy((await self._load(self.key_builder.build(key))).data)
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
+
+    #  ----------- PERSISTENCE -----------
+
+    async def flush(self) -> None:
+        """Пишет все накопленные изменения: upsert непустых, delete пустых."""
+        if not self._dirty:
+            return
+
+        batch, self._dirty = self._dirty, {}
+        upserts = [
+            {"key": key, "state": record.state, "data": record.data}
+            for key, record in batch.items()
+            if not record.empty
+        ]
+        deletes = [key for key, record in batch.items() if record.empty]
+
+        try:
+            async with AsyncSessionLocal() as session:
+                if upserts:
+                    stmt = insert(FsmState).values(upserts)
+                    stmt = stmt.on_conflict_do_update(
+                        index_elements=[FsmState.key],
+                        set_={
+                            "state": stmt.excluded.state,
+                            "data": stmt.excluded.data,
+                            "updated_at": func.now(),
+                        },
+                    )
+                    await session.execute(stmt)
+                if deletes:
+                    await session.execute(
+                        delete(FsmState).where(FsmState.key.in_(deletes))
+                    )
+                await session.commit()
+        except BaseException:
+            #  Возвращаем в очередь то, что не перезаписано за время запроса
+            #  (в том числе при отмене задачи посреди записи)
+            for key, record in batch.items():
+                self._dirty.setdefault(key, record)
+            raise
+
+    async def delete_expired(self) -> int:
+        """Удаляет состояния, не менявшиеся дольше ttl."""
+        async with AsyncSessionLocal() as session:
+            result = await session.execute(
+                delete(FsmState).where(FsmState.updated_at < func.now() - self.ttl)
+            )
+            await session.commit()
+        return result.rowcount
+
+    async def _flush_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        next_cleanup = loop.time()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if loop.time() >= next_cleanup:
+                    next_cleanup = loop.time() + self.cleanup_interval
+                    deleted = await self.delete_expired()
+                    if deleted:
+                        logger.info(f"Deleted {deleted} expired FSM states")
+            except Exception as e:
+                logger.error(f"Error flushing FSM storage: {e}", exc_info=True)
+
+
+class BoundedMemoryStorage(BaseStorage):
+    """
+    FSM-хранилище в памяти процесса с ограничением по размеру и времени.
+
+    В отличие от aiogram MemoryStorage, пустая запись (после `state.clear()`)
+    сразу удаляется, а непустая живёт `ttl` секунд с последнего обращения
+    и вытесняется по LRU, когда ключей больше `max_entries`. Порядок
+    OrderedDict совпадает с порядком обращений, поэтому и просроченные,
+    и самые старые ключи снимаются с его начала за O(1).
+    """
+
+    def __init__(self, max_entries: int = 100_000, ttl: float = 86400):
+        """
+        Инициализация хранилища.
+
+        Args:
+            max_entries: Максимум ключей в памяти.
+            ttl: Через сколько секунд без обращений запись удаляется.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        #  Ключ -> (запись, время последнего обращения)
+        self._storage: OrderedDict[StorageKey, tuple[_Record, float]] = OrderedDict()
+        self.evicted_lru = 0
+        self.evicted_ttl = 0
+
+    @property
+    def stats(self) -> dict[str, int]:
+        """Метрики хранилища: размер и число вытесненных записей."""
+        return {
+            "entries": len(self._storage),
+            "evicted_lru": self.evicted_lru,
+            "evicted_ttl": self.evicted_ttl,
+        }
+
+    def _expire(self, now: float) -> None:
+        while self._storage:
+            _, (_, touched_at) = next(iter(self._storage.items()))
+            if now - touched_at < self.ttl:
+                break
+            self._storage.popitem(last=False)
+            self.evicted_ttl += 1
+
+    def _get(self, key: StorageKey) -> _Record:
+        now = monotonic()
+        self._expire(now)
+        entry = self._storage.get(key)
+        if entry is None:
+            return _Record()
+        self._storage[key] = (entry[0], now)
+        self._storage.move_to_end(key)
+        return entry[0]
+
+    def _put(self, key: StorageKey, record: _Record) -> None:
+        if record.empty:
+            self._storage.pop(key, None)
+            return
+        self._storage[key] = (record, monotonic())
+        self._storage.move_to_end(key)
+        while len(self._storage) > self.max_entries:
+            self._storage.popitem(last=False)
+            self.evicted_lru += 1
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        self._put(key, _Record(_state_name(state), self._get(key).data))
+
+    async def get_state(self, key: StorageKey) -> str | None:
+        return self._get(key).state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        if not isinstance(data, dict):
+            raise ValueError(f"Data must be a dict, got {type(data).__name__}")
+        self._put(key, _Record(self._get(key).state, copy(data)))
+
+    async def get_data(self, key: StorageKey) -> dict[str, Any]:
+        return copy(self._get(key).data)
+
+    async def close(self) -> None:
+        logger.info(f"In-memory FSM storage closed: {self.stats}")
+        self._storage.clear()
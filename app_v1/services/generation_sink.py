@@ -0,0 +1,162 @@
+import asyncio
+import logging
+from collections import Counter
+from typing import Any
+
+from sqlalchemy import insert
+
+from db.crud import bump_daily_stats
+from db.database import AsyncSessionLocal
+from db.models import GenerationHistory
+
+logger = logging.getLogger(__name__)
+
+#  Маркер остановки в очереди: всё, что стоит перед ним, будет записано
+_STOP = object()
+
+
+class GenerationHistorySink:
+    """
+    Буферизованная запись GenerationHistory.
+
+    Хендлеры кладут записи в очередь и сразу продолжают работу, а фоновая
+    задача пишет их пачками одним многострочным INSERT: каждые `batch_size`
+    записей или раз в `flush_interval` секунд. Очередь ограничена — при её
+    заполнении `record()` ждёт (back-pressure). `stop()` дописывает всё,
+    что осталось в буфере.
+
+    Если id записи нужен сразу, используйте db.crud.add_generation.
+    """
+
+    def __init__(
+        self,
+        batch_size: int = 100,
+        flush_interval: float = 0.5,
+        max_buffer: int = 5000,
+        retries: int = 3,
+    ):
+        """
+        Инициализация буфера.
+
+        Args:
+            batch_size: Сколько записей пишется за один INSERT.
+            flush_interval: Максимальная задержка записи в секундах.
+            max_buffer: Размер очереди, после которого record() начинает ждать.
+            retries: Сколько раз повторять запись пачки при ошибке БД.
+        """
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.is_running = False
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        self._task: asyncio.Task | None = None
+
+    async def record(self, **kwargs) -> None:
+        """
+        Ставит запись о генерации в очередь.
+
+        Args:
+            **kwargs: Поля GenerationHistory (user_id, model, request, cost, ...).
+        """
+        if not self.is_running:
+            await self.start()
+        await self._queue.put(kwargs)
+
+    async def _write(self, rows: list[dict[str, Any]]) -> None:
+        """Пишет пачку и дневные счётчики в одной транзакции."""
+        metrics = Counter(generations=len(rows))
+        for row in rows:
+            job = (row.get("request") or {}).get("job")
+            if job:
+                metrics[f"generations:{job}"] += 1
+
+        for attempt in range(1, self.retries + 1):
+            try:
+                async with AsyncSessionLocal() as session:
+                    await session.execute(insert(GenerationHistory), rows)
+                    await bump_daily_stats(dict(metrics), session)
+                    await session.commit()
+                return
+            except Exception as e:
+                logger.error(
+                    f"Error writing {len(rows)} generations "
+                    f"(attempt {attempt}/{self.retries}): {e}",
+                    exc_info=True,
+                )
+                if attempt < self.retries:
+                    await asyncio.sleep(attempt)
+
+        logger.error(f"Dropped {len(rows)} generation records: {rows}")
+
+    async def _next_batch(self) -> tuple[list[dict[str, Any]], bool]:
+        """
+        Ждёт первую запись, затем добирает пачку не дольше flush_interval.
+
+        Returns:
+            Пачка записей и флаг, что встретился маркер остановки.
+        """
+        item = await self._queue.get()
+        if item is _STOP:
+            return [], True
+
+        rows = [item]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.flush_interval
+        while len(rows) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout)
+            except TimeoutError:
+                break
+            if item is _STOP:
+                return rows, True
+            rows.append(item)
+        return rows, False
+
+    def _drain(self) -> list[dict[str, Any]]:
+        rows = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                rows.append(item)
+        return rows
+
+    async def start(self) -> None:
+        """Запускает фоновую запись."""
+        if self.is_running:
+            return
+
+        self.is_running = True
+
+        async def flush_loop():
+            stopped = False
+            while not stopped:
+                rows, stopped = await self._next_batch()
+                if rows:
+                    await self._write(rows)
+
+        self._task = asyncio.create_task(flush_loop())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую запись и дописывает остаток буфера."""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        #  Не отменяем задачу посреди INSERT: она сама допишет всё до маркера
+        await self._queue.put(_STOP)
+        if self._task:
+            await self._task
+
+        #  Записи, поставленные в очередь уже после маркера
+        rows = self._drain()
+        for i in range(0, len(rows), self.batch_size):
+            await self._write(rows[i : i + self.batch_size])
+
+        logger.info("Generation history sink stopped")
+
+
+#  Общий буфер на весь процесс
+GENERATIONS = GenerationHistorySink()
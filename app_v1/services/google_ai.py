@@ -1,7 +1,6 @@
+import asyncio
 import logging
-import yaml
 from io import BytesIO
-from pathlib import Path
 
 from aiogram.fsm.context import FSMContext
 from aiogram.types import BufferedInputFile, CallbackQuery, Message
@@ -13,6 +12,7 @@ from core.config import settings, devs, bot, GOOGLE_AI_MODEL
 from schemas import GENERATION_ERROR_ANSWER
 from prompts import PROMPT_TEMPLATES
 from services import ARCANA_MAP, calculate_arcana
+from services.content_registry import CONTENT
 
 logger = logging.getLogger(__name__)
 
@@ -102,14 +102,54 @@ async def handle_google_ai_error(
 class GoogleAI:
     """Сервис для работы с Google Gemini API."""
 
-    def __init__(self, api_key: str | None = None):
-        self.client: Client = Client(api_key=settings.google_api_key)
+    #  Общий для всего процесса лимит одновременных генераций
+    _semaphore = asyncio.Semaphore(settings.google_ai_concurrency)
+
+    def __init__(self, client: Client | None = None):
+        """
+        Инициализация сервиса Gemini.
+
+        Args:
+            client: Общий genai.Client с пулом соединений. Если не передан,
+                    создаётся собственный.
+        """
+        self.client: Client = client or Client(api_key=settings.google_api_key)
+
+    async def close(self) -> None:
+        """Закрывает пулы HTTP-соединений."""
+        await self.client.aio.aclose()
+        self.client.close()
+
+    async def _generate_content(
+        self, *, model: str, prompt: str, config: GenerateContentConfig
+    ):
+        """
+        Асинхронный запрос к Gemini через `client.aio` с лимитом и таймаутом.
+
+        Не блокирует event loop: пока ждем ответ, бот продолжает
+        обслуживать остальных пользователей.
+
+        Raises:
+            GoogleAIUnavailable: Если запрос не уложился в таймаут.
+        """
+        async with self._semaphore:
+            try:
+                async with asyncio.timeout(settings.google_ai_timeout):
+                    return await self.client.aio.models.generate_content(
+                        model=model,
+                        contents=prompt,
+                        config=config,
+                    )
+            except TimeoutError as e:
+                raise GoogleAIUnavailable(
+                    f"Gemini did not respond in {settings.google_ai_timeout}s"
+                ) from e
 
     async def generate_picture(
         self,
         feature: str,
         context: dict,
-        state: FSMContext,
+        state: FSMContext | None = None,
         *,
         model: str = GOOGLE_AI_MODEL,
     ) -> BufferedInputFile | None:
@@ -119,6 +159,7 @@ class GoogleAI:
         Args:
             feature: Тип генерации (first - первое изображение, ...
             context: Контекст для генерации.
+            state: FSM пользователя, сбрасывается после сборки промпта.
             model: Название модели для использования.
 
         Returns:
@@ -131,11 +172,12 @@ class GoogleAI:
         domain = context.get("domain", "")
         another_birthday = context.get("another_birthday", None)
 
-        arcanas: dict = calculate_arcana(birthday)
-        main_arcana = arcanas["main_arcana"]
+        #  Карта дня зависит только от аркана, поэтому его можно передать напрямую
+        arcanas: dict = calculate_arcana(birthday) if birthday else {}
+        main_arcana = context.get("main_arcana") or arcanas["main_arcana"]
         main_arcana_name = ARCANA_MAP[main_arcana]
-        day_arcana = arcanas["day_arcana"]
-        day_arcana_name = ARCANA_MAP[day_arcana]
+        day_arcana = arcanas.get("day_arcana")
+        day_arcana_name = ARCANA_MAP.get(day_arcana)
 
         if sex == "male":
             gender_guide = "Male archetype, age 30-60, calm stability, grounded confidence, no aggression, no dominance."
@@ -156,14 +198,8 @@ class GoogleAI:
             )
 
         elif feature == "ai_portraits":
-            #  Подгружаем специфику портрета по домену
-            yaml_path = (
-                Path(__file__).parent.parent / "schemas" / "ai_portraits_map.yml"
-            )
-            with open(yaml_path, "r", encoding="utf-8") as f:
-                ai_portraits_data = yaml.safe_load(f)
-
-            prompt_focus = ai_portraits_data[domain]["prompt_focus"]
+            #  Специфика портрета по домену
+            prompt_focus = CONTENT.portraits[domain].prompt_focus
 
             #  Собираем промпт
             context = PROMPT_TEMPLATES["ai_portraits_image_context"].render(
@@ -182,7 +218,8 @@ class GoogleAI:
                 gender_guide=gender_guide,
                 prompt_focus=prompt_focus,
             )
-            await state.clear()
+            if state:
+                await state.clear()
 
         elif feature == "daily_card":
 
@@ -193,7 +230,8 @@ class GoogleAI:
                 arcana_name=main_arcana_name,
             )
 
-            await state.clear()
+            if state:
+                await state.clear()
 
         config = GenerateContentConfig(
             response_modalities=["IMAGE"],
@@ -202,24 +240,30 @@ class GoogleAI:
             ),
         )
         try:
-            for attempt in range(5):
-                response = self.client.models.generate_content(
-                    model=model,
-                    contents=prompt,
-                    config=config,
-                )
-                if response.parts is not None:
-                    for part in response.parts:
-                        # Получаем байты изображения напрямую из inline_data
-                        img_bytes: BytesIO = BytesIO(part.inline_data.data)
-                        img_bytes.seek(0)
-
-                        photo: BufferedInputFile = BufferedInputFile(
-                            img_bytes.getvalue(), filename="portrait.jpg"
-                        )
-                        return photo
-                else:
-                    continue
+            #  Все попытки вместе (и ожидание семафора) не дольше дедлайна
+            async with asyncio.timeout(settings.google_ai_deadline):
+                for attempt in range(5):
+                    response = await self._generate_content(
+                        model=model,
+                        prompt=prompt,
+                        config=config,
+                    )
+                    if response.parts is not None:
+                        for part in response.parts:
+                            # Получаем байты изображения напрямую из inline_data
+                            img_bytes: BytesIO = BytesIO(part.inline_data.data)
+                            img_bytes.seek(0)
+
+                            photo: BufferedInputFile = BufferedInputFile(
+                                img_bytes.getvalue(), filename="portrait.jpg"
+                            )
+                            return photo
+                    else:
+                        continue
+        except TimeoutError as e:
+            raise GoogleAIUnavailable(
+                f"Gemini did not return an image in {settings.google_ai_deadline}s"
+            ) from e
         except ClientError as e:
             if e.code == 400:
                 raise GoogleAIUnsupportedLocation(
@@ -239,6 +283,5 @@ class GoogleAI:
         Returns:
             Список доступных моделей Gemini.
         """
-        models = self.client.models.list()
-        # return [model.name for model in models]
-        return models
+        pager = await self.client.aio.models.list()
+        return [model.name async for model in pager]
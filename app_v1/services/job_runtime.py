@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+from typing import Optional, Protocol
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from db.database import engine
+
+logger = logging.getLogger(__name__)
+
+#  Ключ advisory lock лидера фоновых задач
+LEADER_LOCK_NAMESPACE = 20_002
+LEADER_LOCK_KEY = 0
+
+
+class BackgroundJob(Protocol):
+    """Фоновая задача в стиле PaymentPoller: start/stop и флаг is_running."""
+
+    is_running: bool
+
+    async def start(self) -> None: ...
+
+    async def stop(self) -> None: ...
+
+
+class JobRuntime:
+    """
+    Запускает фоновые задачи ровно на одной реплике бота.
+
+    Лидер выбирается через session-level advisory lock на отдельном
+    соединении: реплика, захватившая блокировку, запускает все задачи.
+    Раз в `heartbeat_interval` лидер проверяет своё соединение (heartbeat),
+    а остальные реплики пытаются захватить блокировку. Если соединение
+    лидера оборвалось, Postgres снимает блокировку, лидер останавливает
+    задачи, и их подхватывает другая реплика.
+    """
+
+    def __init__(self, heartbeat_interval: float = 5):
+        """
+        Инициализация.
+
+        Args:
+            heartbeat_interval: Период heartbeat и попыток стать лидером (секунды).
+        """
+        self.heartbeat_interval = heartbeat_interval
+        self.jobs: dict[str, BackgroundJob] = {}
+        self.is_leader = False
+        self.is_running = False
+        #  Время последнего успешного heartbeat (unix time), 0 — ещё не было
+        self.last_heartbeat = 0.0
+        self._conn: Optional[AsyncConnection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def add(self, name: str, job: BackgroundJob) -> None:
+        """Регистрирует задачу, которая должна работать только у лидера."""
+        self.jobs[name] = job
+
+    #  ----------- LEADERSHIP -----------
+
+    async def _try_acquire(self) -> bool:
+        if self._conn is None:
+            self._conn = await engine.connect()
+        acquired = await self._conn.scalar(
+            text("SELECT pg_try_advisory_lock(:ns, :key)"),
+            {"ns": LEADER_LOCK_NAMESPACE, "key": LEADER_LOCK_KEY},
+        )
+        #  Сессионная блокировка переживает commit; не держим транзакцию
+        await self._conn.commit()
+        return bool(acquired)
+
+    async def _heartbeat(self) -> None:
+        await self._conn.scalar(text("SELECT 1"))
+        await self._conn.commit()
+
+    async def _drop_connection(self, invalidate: bool = False) -> None:
+        """
+        Забывает соединение лидера.
+
+        Args:
+            invalidate: Закрыть DBAPI-соединение, а не вернуть его в пул.
+                        Сессионная блокировка живёт вместе с соединением,
+                        поэтому соединение, которое может её держать,
+                        в пул возвращать нельзя.
+        """
+        if self._conn is None:
+            return
+        try:
+            if invalidate:
+                await self._conn.invalidate()
+            await self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    async def _release_lock(self) -> None:
+        """Снимает блокировку лидера и возвращает соединение в пул."""
+        if self._conn is None:
+            return
+        try:
+            await self._conn.execute(
+                text("SELECT pg_advisory_unlock(:ns, :key)"),
+                {"ns": LEADER_LOCK_NAMESPACE, "key": LEADER_LOCK_KEY},
+            )
+            await self._conn.commit()
+        except Exception as e:
+            logger.error(f"Error releasing jobs leader lock: {e}")
+            await self._drop_connection(invalidate=True)
+            return
+        await self._drop_connection()
+
+    async def _start_jobs(self) -> None:
+        for name, job in self.jobs.items():
+            try:
+                await job.start()
+            except Exception as e:
+                logger.error(f"Error starting job {name}: {e}", exc_info=True)
+
+    async def _stop_jobs(self) -> None:
+        for name, job in self.jobs.items():
+            try:
+                await job.stop()
+            except Exception as e:
+                logger.error(f"Error stopping job {name}: {e}", exc_info=True)
+
+    async def tick(self) -> None:
+        """Один шаг: heartbeat лидера или попытка стать лидером."""
+        try:
+            if self.is_leader:
+                await self._heartbeat()
+            elif await self._try_acquire():
+                self.is_leader = True
+                logger.info(f"Became jobs leader, starting {list(self.jobs)}")
+                await self._start_jobs()
+            self.last_heartbeat = time.time()
+        except Exception as e:
+            logger.error(f"Job runtime heartbeat failed: {e}")
+            #  Соединение могло остаться живым и с блокировкой: закрываем его
+            #  совсем, чтобы Postgres отпустил лидерство
+            await self._drop_connection(invalidate=True)
+            if self.is_leader:
+                #  Блокировка ушла вместе с соединением
+                self.is_leader = False
+                logger.warning("Lost jobs leadership, stopping jobs")
+                await self._stop_jobs()
+
+    async def start(self) -> None:
+        """Запускает выборы лидера."""
+        if self.is_running:
+            return
+
+        self.is_running = True
+
+        async def leader_loop():
+            while self.is_running:
+                await self.tick()
+                await asyncio.sleep(self.heartbeat_interval)
+
+        self._task = asyncio.create_task(leader_loop())
+
+    async def stop(self) -> None:
+        """Останавливает задачи и отпускает лидерство."""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        if self.is_leader:
+            await self._stop_jobs()
+            self.is_leader = False
+            #  close() вернёт соединение в пул вместе с сессионной блокировкой,
+            #  поэтому снимаем её явно: следующая реплика станет лидером на
+            #  своём ближайшем heartbeat
+            await self._release_lock()
+        else:
+            await self._drop_connection()
+        logger.info("Job runtime stopped")
+
+    def metrics(self) -> str:
+        """Состояние в текстовом формате Prometheus."""
+        lines = [
+            "# TYPE bot_jobs_leader gauge",
+            f"bot_jobs_leader {int(self.is_leader)}",
+            "# TYPE bot_jobs_heartbeat_timestamp_seconds gauge",
+            f"bot_jobs_heartbeat_timestamp_seconds {self.last_heartbeat:.3f}",
+            "# TYPE bot_job_running gauge",
+        ]
+        lines += [
+            f'bot_job_running{{job="{name}"}} {int(job.is_running)}'
+            for name, job in self.jobs.items()
+        ]
+        return "\n".join(lines) + "\n"
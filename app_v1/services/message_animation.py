@@ -1,14 +1,145 @@
 import asyncio
 import logging
-from time import time
+from time import monotonic
 
-from aiogram.exceptions import TelegramBadRequest
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
 from aiogram.types import Message, CallbackQuery
 
-from core.config import bot
+from core.config import bot, settings
 
 logger = logging.getLogger(__name__)
 
+#  Анимация не должна пережить генерацию, которую она сопровождает: худший
+#  случай — изображение Gemini со всеми повторами и запрос OpenAI с повторами
+#  SDK (max_retries=2)
+ANIMATION_TIMEOUT = settings.google_ai_deadline + 3 * settings.openai_timeout
+
+
+class AnimationTicker:
+    """
+    Общий планировщик всех анимаций процесса.
+
+    Вместо отдельной задачи на каждую анимацию один тикер раз в `tick` секунд
+    обходит активные анимации и правит те, у которых подошло время кадра.
+    Правки ограничены общим бюджетом (правок в секунду): когда анимаций много,
+    интервал между кадрами каждой из них растёт. Кроме того, в один чат
+    правки идут не чаще раза в `chat_interval` секунд (лимит Telegram на чат),
+    сколько бы анимаций в нём ни было. На TelegramRetryAfter анимация
+    откладывается на указанное время, а бюджет уменьшается вдвое и затем
+    постепенно восстанавливается.
+    """
+
+    def __init__(
+        self,
+        edits_per_second: float,
+        tick: float = 0.1,
+        min_edits_per_second: float = 1.0,
+        chat_interval: float = 1.0,
+    ):
+        """
+        Инициализация тикера.
+
+        Args:
+            edits_per_second: Максимальный общий бюджет правок в секунду.
+            tick: Период обхода анимаций в секундах.
+            min_edits_per_second: Нижняя граница бюджета после флуд-контроля.
+            chat_interval: Минимальный интервал между правками в одном чате.
+        """
+        self.max_rate = edits_per_second
+        self.min_rate = min_edits_per_second
+        self.rate = edits_per_second
+        self.tick = tick
+        self.chat_interval = chat_interval
+        self._animations: set["MessageAnimation"] = set()
+        self._pending: set[asyncio.Task] = set()
+        self._task: asyncio.Task | None = None
+        self._tokens = edits_per_second
+        self._last_refill = monotonic()
+        #  chat_id -> время, раньше которого в этот чат не пишем
+        self._chat_ready_at: dict[int, float] = {}
+
+    @property
+    def active(self) -> int:
+        return len(self._animations)
+
+    def frame_interval(self, animation: "MessageAnimation") -> float:
+        """Интервал кадра с учётом числа активных анимаций и текущего бюджета."""
+        return max(animation.interval, len(self._animations) / self.rate)
+
+    def register(self, animation: "MessageAnimation") -> None:
+        self._animations.add(animation)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._loop())
+
+    def unregister(self, animation: "MessageAnimation") -> None:
+        self._animations.discard(animation)
+        if not any(a.chat_id == animation.chat_id for a in self._animations):
+            self._chat_ready_at.pop(animation.chat_id, None)
+
+    def backoff(self, animation: "MessageAnimation", retry_after: float) -> None:
+        """Откладывает анимацию и урезает общий бюджет после флуд-контроля."""
+        animation.next_frame_at = monotonic() + retry_after
+        self.rate = max(self.min_rate, self.rate / 2)
+        logger.warning(
+            f"Animation flood control: retry after {retry_after}s, "
+            f"budget lowered to {self.rate:.1f} edits/s"
+        )
+
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        #  Бюджет восстанавливается на 1 правку/с за каждую спокойную секунду
+        self.rate = min(self.max_rate, self.rate + elapsed)
+        self._tokens = min(self.rate, self._tokens + elapsed * self.rate)
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _run_due(self, now: float) -> None:
+        """Один обход: запускает кадры анимаций, которым подошло время."""
+        self._refill(now)
+
+        due = sorted(
+            (a for a in self._animations if not a.busy and a.next_frame_at <= now),
+            key=lambda a: a.next_frame_at,
+        )
+        for animation in due:
+            if animation.timed_out(now):
+                self.unregister(animation)
+                self._spawn(animation.expire())
+                continue
+            if self._chat_ready_at.get(animation.chat_id, 0.0) > now:
+                continue
+            #  Первое сообщение отправляем вне бюджета правок
+            if animation.message is not None:
+                if self._tokens < 1:
+                    break
+                self._tokens -= 1
+            animation.begin_frame()
+            animation.next_frame_at = now + self.frame_interval(animation)
+            self._chat_ready_at[animation.chat_id] = now + self.chat_interval
+            self._spawn(animation.render())
+
+    async def _loop(self) -> None:
+        while self._animations:
+            self._run_due(monotonic())
+            await asyncio.sleep(self.tick)
+
+
+_ticker: AnimationTicker | None = None
+
+
+def get_ticker() -> AnimationTicker:
+    """Тикер создаётся лениво, внутри работающего event loop."""
+    global _ticker
+    if _ticker is None:
+        _ticker = AnimationTicker(
+            edits_per_second=settings.animation_edits_per_second
+        )
+    return _ticker
+
 
 class MessageAnimation:
     """Класс для анимации сообщений с меняющимися точками."""
@@ -19,7 +150,7 @@ class MessageAnimation:
         base_text: str,
         dots: list[str] | None = None,
         interval: float = 0.4,
-        timeout: float | None = 60.0,
+        timeout: float | None = ANIMATION_TIMEOUT,
     ):
         """
         Инициализация анимации сообщения.
@@ -28,8 +159,11 @@ class MessageAnimation:
             message_or_call: Сообщение для анимации или CallbackQuery для создания нового сообщения.
             base_text: Базовый текст сообщения (без точек).
             dots: Список вариантов точек. По умолчанию [".", "..", "..."].
-            interval: Интервал обновления в секундах. По умолчанию 0.4.
-            timeout: Максимальное время работы анимации в секундах. По умолчанию 30.0. None отключает таймаут.
+            interval: Минимальный интервал обновления в секундах. По умолчанию 0.4.
+                      При большом числе анимаций тикер увеличивает его сам.
+            timeout: Максимальное время работы анимации в секундах. По умолчанию
+                     ANIMATION_TIMEOUT (из таймаутов провайдеров).
+                     None отключает таймаут.
         """
         self.message_or_call = message_or_call
         self.message: Message | None = None
@@ -37,61 +171,78 @@ class MessageAnimation:
         self.dots = dots or [".", "..", "..."]
         self.interval = interval
         self.timeout = timeout
-        self.animation_stop = asyncio.Event()
-        self.animation_task: asyncio.Task | None = None
+        self.dot_index = 0
+        self.next_frame_at = 0.0
+        self.started_at = 0.0
+        self.busy = False
+        self.stopped = True
+        self._render_done = asyncio.Event()
+        self._render_done.set()
 
-    async def _animate(
-        self,
-    ) -> None:
-        """Внутренний метод для анимации сообщения."""
-        dot_index = 0
-        first_update = True
-        start_time = time()
+    @property
+    def chat_id(self) -> int:
+        return self.message_or_call.from_user.id
 
-        while not self.animation_stop.is_set():
-            try:
-                elapsed_time = time() - start_time
-                if elapsed_time >= self.timeout:
-                    logger.warning(
-                        f"Animation timeout reached ({self.timeout}s), stopping animation"
-                    )
-                    await self.message.delete()
-                    await bot.send_message(
-                        chat_id=self.message_or_call.from_user.id,
-                        text="Операция заняла слишком много времени",  # Тут надо прервать выполнение основной задачи
-                    )
-                    raise TimeoutError
-
-                text = f"{self.base_text}{self.dots[dot_index]}"
-
-                if first_update:
-                    # Создаем сообщение при первом обновлении
-                    try:
-                        self.message = await bot.send_message(
-                            chat_id=self.message_or_call.from_user.id, text=text
-                        )
-                    except TelegramBadRequest as e:
-                        logger.error(f"Error sending first animation message: {e}")
-                        break
-                    first_update = False
-
-                dot_index = (dot_index + 1) % len(self.dots)
-                await asyncio.sleep(self.interval)
+    def begin_frame(self) -> None:
+        """Помечает кадр как запланированный до фактического запуска задачи."""
+        self.busy = True
+        self._render_done.clear()
 
+    def timed_out(self, now: float) -> bool:
+        return self.timeout is not None and now - self.started_at >= self.timeout
+
+    async def render(self) -> None:
+        """Один кадр анимации. Вызывается тикером."""
+        text = f"{self.base_text}{self.dots[self.dot_index]}"
+        self.dot_index = (self.dot_index + 1) % len(self.dots)
+        try:
+            if self.stopped:
+                return
+            if self.message is None:
+                # Создаем сообщение при первом обновлении
+                self.message = await bot.send_message(chat_id=self.chat_id, text=text)
+            else:
                 # Обновляем существующее сообщение
-                try:
-                    await self.message.edit_text(text)
-                except TelegramBadRequest:
-                    continue
-            except Exception as e:
-                logger.error(f"Error animating message: {e}")
-                break
+                await self.message.edit_text(text)
+        except TelegramRetryAfter as e:
+            get_ticker().backoff(self, e.retry_after)
+        except TelegramBadRequest as e:
+            if self.message is None:
+                logger.error(f"Error sending first animation message: {e}")
+                get_ticker().unregister(self)
+        except Exception as e:
+            logger.error(f"Error animating message: {e}")
+            get_ticker().unregister(self)
+        finally:
+            self.busy = False
+            self._render_done.set()
+
+    async def expire(self) -> None:
+        """Анимация превысила таймаут."""
+        logger.warning(
+            f"Animation timeout reached ({self.timeout}s), stopping animation"
+        )
+        self.stopped = True
+        await self._render_done.wait()
+        try:
+            if self.message:
+                await self.message.delete()
+                self.message = None
+            await bot.send_message(
+                chat_id=self.chat_id,
+                text="Операция заняла слишком много времени",  # Тут надо прервать выполнение основной задачи
+            )
+        except Exception as e:
+            logger.error(f"Error animating message: {e}")
 
     async def start(self) -> None:
         """Запускает анимацию сообщения."""
-        if self.animation_task is None or self.animation_task.done():
-            self.animation_stop.clear()
-            self.animation_task = asyncio.create_task(self._animate())
+        if not self.stopped:
+            return
+        self.stopped = False
+        self.started_at = monotonic()
+        self.next_frame_at = 0.0
+        get_ticker().register(self)
 
     async def stop(self, delete_message: bool = True) -> None:
         """
@@ -100,13 +251,10 @@ class MessageAnimation:
         Args:
             delete_message: Если True, удаляет сообщение после остановки анимации.
         """
-        self.animation_stop.set()
-        if self.animation_task and not self.animation_task.done():
-            self.animation_task.cancel()
-            try:
-                await self.animation_task
-            except asyncio.CancelledError:
-                pass
+        get_ticker().unregister(self)
+        self.stopped = True
+        #  Дожидаемся кадра в полёте, чтобы не потерять только что созданное сообщение
+        await self._render_done.wait()
 
         if delete_message and self.message:
             try:
@@ -119,7 +267,7 @@ class MessageAnimation:
 
     async def __aenter__(self):
         """Поддержка контекстного менеджера - вход."""
-        self.start()
+        await self.start()
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import xml.sax.saxutils as saxutils
+from time import monotonic
+from typing import AsyncIterator
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.types import Message
+
+from schemas import GENERATION_ERROR_ANSWER
+
+logger = logging.getLogger(__name__)
+
+#  Максимальная длина текста сообщения в Telegram
+MESSAGE_LIMIT = 4096
+
+
+#  Максимальная длина подписи к фото в Telegram
+CAPTION_LIMIT = 1024
+
+
+def _hard_split(text: str, limit: int) -> list[str]:
+    """Режет текст по длине, не разрывая HTML-сущности вида &amp;."""
+    chunks = []
+    while len(text) > limit:
+        cut = limit
+        amp = text.rfind("&", max(cut - 5, 0), cut)
+        if amp > 0 and text.find(";", amp, cut) == -1:
+            cut = amp
+        chunks.append(text[:cut])
+        text = text[cut:]
+    chunks.append(text)
+    return chunks
+
+
+def _split(text: str, limit: int, separators: tuple[str, ...]) -> list[str]:
+    if len(text) <= limit:
+        return [text]
+    if not separators:
+        return _hard_split(text, limit)
+
+    sep, *rest = separators
+    chunks, current = [], ""
+    for part in text.split(sep):
+        candidate = f"{current}{sep}{part}" if current else part
+        if len(candidate) <= limit:
+            current = candidate
+            continue
+        if current:
+            chunks.append(current)
+        if len(part) <= limit:
+            current = part
+        else:
+            *head, current = _split(part, limit, tuple(rest))
+            chunks.extend(head)
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def split_text(text: str, limit: int = MESSAGE_LIMIT) -> list[str]:
+    """
+    Делит HTML-экранированный текст на части не длиннее limit.
+
+    Сначала режет по абзацам, затем по строкам и словам, чтобы длинный
+    разбор ушёл несколькими сообщениями, а не обрезался.
+
+    Args:
+        text: Текст, уже экранированный для HTML.
+        limit: Максимальная длина одной части.
+
+    Returns:
+        Список непустых частей.
+    """
+    chunks = _split(text, limit, ("\n\n", "\n", " "))
+    return [chunk.strip() for chunk in chunks if chunk.strip()]
+
+
+async def answer_long(message: Message, text: str, reply_markup=None) -> Message | None:
+    """
+    Отправляет длинный текст несколькими сообщениями.
+
+    Args:
+        message: Сообщение, в чат которого отправляется ответ.
+        text: Текст, уже экранированный для HTML.
+        reply_markup: Клавиатура, прикрепляется к последнему сообщению.
+
+    Returns:
+        Последнее отправленное сообщение.
+    """
+    chunks = split_text(text)
+    sent = None
+    for i, chunk in enumerate(chunks):
+        is_last = i == len(chunks) - 1
+        sent = await message.answer(
+            chunk, reply_markup=reply_markup if is_last else None
+        )
+    return sent
+
+
+async def answer_photo_with_caption(
+    message: Message, photo, caption: str, reply_markup=None
+) -> Message:
+    """
+    Отправляет фото с подписью. Если подпись не влезает в лимит Telegram,
+    фото уходит без подписи, а текст следом отдельными сообщениями.
+
+    Args:
+        message: Сообщение, в чат которого отправляется ответ.
+        photo: Изображение или file_id.
+        caption: Подпись, уже экранированная для HTML.
+        reply_markup: Клавиатура, прикрепляется к последнему сообщению.
+
+    Returns:
+        Отправленное сообщение с фото.
+    """
+    if len(caption) <= CAPTION_LIMIT:
+        return await message.answer_photo(
+            photo=photo, caption=caption, reply_markup=reply_markup
+        )
+
+    sent = await message.answer_photo(photo=photo)
+    await answer_long(message, caption, reply_markup=reply_markup)
+    return sent
+
+
+class StreamingReply:
+    """Постепенно выводит ответ ChatGPT в одно сообщение Telegram."""
+
+    def __init__(
+        self,
+        message: Message,
+        interval: float = 1.5,
+        cursor: str = " ▌",
+    ):
+        """
+        Инициализация потокового ответа.
+
+        Args:
+            message: Сообщение бота, которое будет редактироваться.
+            interval: Минимальный интервал между правками в секундах.
+                      Telegram ограничивает частоту правок в одном чате.
+            cursor: Символ в конце текста, пока ответ ещё пишется.
+        """
+        self.message = message
+        self.interval = interval
+        self.cursor = cursor
+        self._next_edit_at = 0.0
+
+    async def _preview(self, text: str) -> None:
+        """Промежуточная правка: без HTML, чтобы незакрытые символы не ломали разметку."""
+        preview = text[: MESSAGE_LIMIT - len(self.cursor)] + self.cursor
+        try:
+            await self.message.edit_text(preview, parse_mode=None)
+        except TelegramRetryAfter as e:
+            self._next_edit_at = monotonic() + e.retry_after
+            return
+        except TelegramBadRequest:
+            pass
+        self._next_edit_at = monotonic() + self.interval
+
+    async def _edit_final(self, text: str) -> None:
+        """Финальная правка. При флуд-контроле ждём и повторяем."""
+        while True:
+            try:
+                await self.message.edit_text(text)
+                return
+            except TelegramRetryAfter as e:
+                await asyncio.sleep(e.retry_after)
+            except TelegramBadRequest as e:
+                if "message is not modified" in e.message:
+                    return
+                raise
+
+    async def run(self, chunks: AsyncIterator[str]) -> str:
+        """
+        Выводит ответ по мере поступления фрагментов.
+
+        Args:
+            chunks: Фрагменты ответа (не экранированные).
+
+        Returns:
+            Итоговый ответ, экранированный для HTML. Пустая строка, если
+            модель ничего не вернула.
+        """
+        text = ""
+        try:
+            async for delta in chunks:
+                text += delta
+                if text.strip() and monotonic() >= self._next_edit_at:
+                    await self._preview(text)
+        except Exception:
+            #  Убираем недописанный ответ, об ошибке сообщит вызывающий код
+            try:
+                await self.message.delete()
+            except TelegramBadRequest:
+                pass
+            raise
+
+        if not text.strip():
+            await self._edit_final(GENERATION_ERROR_ANSWER)
+            return ""
+
+        answer = saxutils.escape(text)
+        first, *rest = split_text(answer)
+        await self._edit_final(first)
+        for chunk in rest:
+            await self.message.answer(chunk)
+
+        return answer
@@ -1,7 +1,8 @@
 import base64
 import logging
-import yaml
-from pathlib import Path
+from math import ceil
+from dataclasses import dataclass
+from typing import AsyncIterator
 import xml.sax.saxutils as saxutils
 
 from aiogram.types import CallbackQuery, Message
@@ -11,14 +12,50 @@ from core.config import settings, OPENAI_MODEL, devs, bot
 from prompts import PROMPT_TEMPLATES
 from schemas import GENERATION_ERROR_ANSWER
 from services import calculate_arcana, ARCANA_MAP
+from services.content_registry import CONTENT
 
 logger = logging.getLogger(__name__)
 
 
+#  Грубая оценка для русского текста: сколько символов приходится на один токен
+CHARS_PER_TOKEN = 2
+
+def length_limits(max_length: int) -> dict:
+    """
+    Параметры запроса, ограничивающие длину ответа заранее.
+
+    Модель получает целевую длину в инструкции, а max_output_tokens не даёт
+    ей уйти далеко за пределы (с запасом settings.openai_reasoning_tokens на
+    рассуждения). Остаток, если он есть, разбивается на несколько сообщений
+    при отправке.
+
+    Args:
+        max_length: Желаемая длина ответа в символах.
+    """
+    limits = {
+        "instructions": f"Уложи ответ в {max_length} символов.",
+        "max_output_tokens": (
+            ceil(max_length / CHARS_PER_TOKEN) + settings.openai_reasoning_tokens
+        ),
+    }
+    if settings.openai_reasoning_effort:
+        limits["reasoning"] = {"effort": settings.openai_reasoning_effort}
+    return limits
+
+
 class OpenAIUnsupportedLocation(Exception):
     """Exception raised by OpenAI API when client location is unsupported."""
 
 
+class OpenAIIncompleteResponse(Exception):
+    """Exception raised when OpenAI stops a response before it is finished."""
+
+
+def _incomplete_reason(response) -> str:
+    details = getattr(response, "incomplete_details", None)
+    return getattr(details, "reason", None) or "unknown"
+
+
 async def handle_openai_error(
     error: Exception,
     upd: CallbackQuery | Message,
@@ -50,52 +87,75 @@ async def handle_openai_error(
             await upd.answer(user_answer)
         return
 
+    if isinstance(error, OpenAIIncompleteResponse):
+        logger.error(f"OpenAI response is incomplete: {error}")
+        if isinstance(upd, CallbackQuery):
+            await upd.message.answer(user_answer)
+        elif isinstance(upd, Message):
+            await upd.answer(user_answer)
+        return
+
+
+@dataclass(slots=True)
+class Conversation:
+    """
+    Состояние одного диалога с ChatGPT.
+
+    Живёт в рамках одного запроса пользователя, тогда как сам OpenAIClient
+    общий на весь процесс.
+
+    Args:
+        id: ID существующего разговора.
+        auto_create: Если True и id не передан, разговор будет создан при первом
+                     вызове chatgpt_response.
+    """
+
+    id: str | None = None
+    auto_create: bool = False
+
 
 class OpenAIClient:
     """Класс для работы с OpenAI API."""
 
-    def __init__(
-        self,
-        api_key: str | None = None,
-        conv: str | None = None,
-        auto_create_conv: bool = False,
-    ):
+    def __init__(self, client: AsyncOpenAI | None = None):
         """
         Инициализация клиента OpenAI.
 
         Args:
-            api_key: API ключ OpenAI.
-            conv: ID существующего разговора. Если не передан и auto_create_conv=True,
-                  будет создан новый при первом вызове chatgpt_response.
-            auto_create_conv: Если True, автоматически создавать conversation при первом
-                             вызове chatgpt_response (если conv не передан).
-                             Если False, conversation нужно передать явно.
+            client: Общий AsyncOpenAI с пулом соединений. Если не передан,
+                    создаётся собственный.
         """
-        self.client: AsyncOpenAI = AsyncOpenAI(
+        self.client: AsyncOpenAI = client or AsyncOpenAI(
             api_key=settings.openai_api_key,
+            timeout=settings.openai_timeout,
         )
-        self._conversation_id: str | None = conv
-        self._auto_create_conv: bool = auto_create_conv
+
+    async def close(self) -> None:
+        """Закрывает пул HTTP-соединений."""
+        await self.client.close()
 
     async def get_models(self) -> list[str]:
         models = await self.client.models.list()
         return [model.id for model in models.data]
 
-    async def _ensure_conversation(self) -> str:
+    async def _ensure_conversation(self, conversation: Conversation) -> str:
         """
         Убедиться, что conversation существует. Если нет - создать новый.
 
+        Args:
+            conversation: Состояние диалога.
+
         Returns:
             ID разговора.
         """
         try:
-            if self._conversation_id is None:
-                conversation = await self.client.conversations.create()
-                self._conversation_id = conversation.id
-            return self._conversation_id
+            if conversation.id is None:
+                created = await self.client.conversations.create()
+                conversation.id = created.id
+            return conversation.id
         except PermissionDeniedError as e:
             if e.status_code == 403:
-                print(e.body["message"])
+                logger.error(f"OpenAI unsupported location: {e.body['message']}")
                 raise OpenAIUnsupportedLocation(
                     f"{e.response}\n{e.body['message']}".replace("<", "").replace(
                         ">", ""
@@ -104,86 +164,50 @@ class OpenAIClient:
             else:
                 raise e
 
-    # async def chatgpt_response(
-    #     self,
-    #     prompt: str,
-    #     *,
-    #     model: str = "gpt-5.1-chat-latest",
-    # ) -> tuple[str, str]:
-    #     """
-    #     Получить ответ от ChatGPT.
-
-    #     Args:
-    #         prompt: Текст запроса.
-    #         model: Модель для использования. По умолчанию "gpt-5.1-chat-latest".
-
-    #     Returns:
-    #         Кортеж из (output_text, conversation_id).
-    #     """
-    #     # Используем сохраненный conversation_id или создаем новый, если разрешено
-    #     if self._conversation_id:
-    #         conversation_id = self._conversation_id
-    #     elif self._auto_create_conv:
-    #         conversation_id = await self._ensure_conversation()
-    #     else:
-    #         conversation_id = None
-
-    #     response = await self.client.responses.create(
-    #         model=model, input=prompt, conversation=conversation_id
-    #     )
-    #     return response.output_text, conversation_id
-
-    async def chatgpt_response(
-        self,
-        feature: str,
-        context: dict,
-        *,
-        model: str = OPENAI_MODEL,
-        max_length: int = 4090,
-        max_attempts: int = 5,
-    ) -> tuple[str, str]:
+    async def _resolve_conversation(
+        self, conversation: Conversation | None
+    ) -> str | None:
+        """Возвращает ID разговора, создавая его, если это разрешено."""
+        if conversation is None:
+            return None
+        if conversation.id:
+            return conversation.id
+        if conversation.auto_create:
+            return await self._ensure_conversation(conversation)
+        return None
+
+    def _build_prompt(self, feature: str, context: dict) -> str:
         """
-        Получить ответ от ChatGPT.
+        Собирает промпт для ChatGPT из шаблонов.
 
         Args:
             feature: Тип генерации (first - первый ответ, readings - разборы, ...
             context: Контекст для генерации.
-            model: Название модели для использования.
 
         Returns:
-            Ответ от API с сгенерированным текстом.
+            Готовый промпт.
         """
-        # Используем сохраненный conversation_id или создаем новый, если разрешено
-        if self._conversation_id:
-            conversation_id = self._conversation_id
-        elif self._auto_create_conv:
-            conversation_id = await self._ensure_conversation()
-        else:
-            conversation_id = None
-
         #  Получаем данные из контекста
         name = context.get("name", "")
         sex = "male" if context.get("sex", "") == "m" else "female"
         birthday = context.get("birthday", "")
 
-        arcanas: dict = calculate_arcana(birthday)
-        main_arcana = arcanas["main_arcana"]
+        #  Карта дня зависит только от аркана, поэтому его можно передать напрямую
+        arcanas: dict = calculate_arcana(birthday) if birthday else {}
+        main_arcana = context.get("main_arcana") or arcanas["main_arcana"]
         main_arcana_name = ARCANA_MAP[main_arcana]
-        day_arcana = arcanas["day_arcana"]
-        day_arcana_name = ARCANA_MAP[day_arcana]
+        day_arcana = arcanas.get("day_arcana")
+        day_arcana_name = ARCANA_MAP.get(day_arcana)
 
         domain = context.get("domain", "")
         aspect = context.get("aspect", "")
 
         #  Собираем промпт для "readings" (или "witch")
         if feature == "readings":
-            #  Специально для reading-ов подгружаем данные из YAML файла
-            yaml_path = Path(__file__).parent.parent / "schemas" / "readings_map.yml"
-            with open(yaml_path, "r", encoding="utf-8") as f:
-                readings_data = yaml.safe_load(f)
             #  Получаем специальную часть prompt-а для reading-ов
-            special = readings_data[domain]["buttons"][aspect]["special"]
-            aspect_name = readings_data[domain]["buttons"][aspect]["label"]
+            reading_aspect = CONTENT.readings[domain].aspects[aspect]
+            special = reading_aspect.special
+            aspect_name = reading_aspect.label
             #  Собираем промпт для reading-ов
             bio = PROMPT_TEMPLATES["readings_context"].render(
                 name=name,
@@ -230,23 +254,87 @@ class OpenAIClient:
                 arcana_name=main_arcana_name,
             )
 
+        return prompt
+
+    # async def chatgpt_response(
+    #     self,
+    #     prompt: str,
+    #     *,
+    #     model: str = "gpt-5.1-chat-latest",
+    # ) -> tuple[str, str]:
+    #     """
+    #     Получить ответ от ChatGPT.
+
+    #     Args:
+    #         prompt: Текст запроса.
+    #         model: Модель для использования. По умолчанию "gpt-5.1-chat-latest".
+
+    #     Returns:
+    #         Кортеж из (output_text, conversation_id).
+    #     """
+    #     # Используем сохраненный conversation_id или создаем новый, если разрешено
+    #     if self._conversation_id:
+    #         conversation_id = self._conversation_id
+    #     elif self._auto_create_conv:
+    #         conversation_id = await self._ensure_conversation()
+    #     else:
+    #         conversation_id = None
+
+    #     response = await self.client.responses.create(
+    #         model=model, input=prompt, conversation=conversation_id
+    #     )
+    #     return response.output_text, conversation_id
+
+    async def chatgpt_response(
+        self,
+        feature: str,
+        context: dict,
+        *,
+        conversation: Conversation | None = None,
+        model: str = OPENAI_MODEL,
+        max_length: int = 4090,
+    ) -> tuple[str, str | None]:
+        """
+        Получить ответ от ChatGPT.
+
+        Args:
+            feature: Тип генерации (first - первый ответ, readings - разборы, ...
+            context: Контекст для генерации.
+            conversation: Состояние диалога. Если не передан, ответ генерируется
+                          без сохранения контекста.
+            model: Название модели для использования.
+            max_length: Целевая длина ответа в символах.
+
+        Returns:
+            Ответ от API с сгенерированным текстом.
+
+        Raises:
+            OpenAIIncompleteResponse: Если ответ оборвался или пуст.
+        """
+        conversation_id = await self._resolve_conversation(conversation)
+        prompt = self._build_prompt(feature, context)
+
         try:
-            attempts = 0
-            answer = ""
-            while answer == "" or len(answer) > max_length:
-                attempts += 1
-                if attempts > max_attempts:
-                    break  #  Здесь нужно выводить сообщение об ошибке
-                response = await self.client.responses.create(
-                    model=model, input=prompt, conversation=conversation_id
-                )
-                answer = response.output_text
-                answer = saxutils.escape(answer)
+            #  Длина ограничена заранее. Оборванный ответ не повторяем: это
+            #  вторая платная генерация, а в conversation уже остался обрывок
+            response = await self.client.responses.create(
+                model=model,
+                input=prompt,
+                conversation=conversation_id,
+                **length_limits(max_length),
+            )
+            if response.status == "incomplete":
+                reason = _incomplete_reason(response)
+                raise OpenAIIncompleteResponse(f"{feature}: {reason}")
+
+            if not response.output_text.strip():
+                raise OpenAIIncompleteResponse(f"{feature}: empty response")
+            answer = saxutils.escape(response.output_text)
             return answer, conversation_id
 
         except PermissionDeniedError as e:
             if e.status_code == 403:
-                print(e.body["message"])
+                logger.error(f"OpenAI unsupported location: {e.body['message']}")
                 raise OpenAIUnsupportedLocation(
                     f"{e.response}\n{e.body['message']}".replace("<", "").replace(
                         ">", ""
@@ -260,13 +348,94 @@ class OpenAIClient:
         self,
         prompt: str,
         *,
+        conversation: Conversation,
         model: str = OPENAI_MODEL,
     ):
         response = await self.client.responses.create(
-            model=model, input=prompt, conversation=self._conversation_id
+            model=model, input=prompt, conversation=conversation.id
         )
         return response.output_text
 
+    async def _stream(
+        self,
+        prompt: str,
+        *,
+        conversation_id: str | None,
+        model: str,
+        max_length: int,
+    ) -> AsyncIterator[str]:
+        """Отдаёт фрагменты ответа по мере генерации (Responses streaming API)."""
+        try:
+            stream = await self.client.responses.create(
+                model=model,
+                input=prompt,
+                conversation=conversation_id,
+                stream=True,
+                **length_limits(max_length),
+            )
+            async for event in stream:
+                if event.type == "response.output_text.delta":
+                    yield event.delta
+                elif event.type == "response.incomplete":
+                    #  Оборванный ответ не доставляем и не списываем
+                    raise OpenAIIncompleteResponse(
+                        _incomplete_reason(event.response)
+                    )
+        except PermissionDeniedError as e:
+            if e.status_code == 403:
+                raise OpenAIUnsupportedLocation(
+                    f"{e.response}\n{e.body['message']}".replace("<", "").replace(
+                        ">", ""
+                    )
+                ) from e
+            raise e
+
+    async def stream_response(
+        self,
+        feature: str,
+        context: dict,
+        *,
+        conversation: Conversation | None = None,
+        model: str = OPENAI_MODEL,
+        max_length: int = 4090,
+    ) -> AsyncIterator[str]:
+        """
+        Получить ответ от ChatGPT потоком.
+
+        Текст не экранируется: это делает получатель после сборки ответа.
+
+        Args:
+            feature: Тип генерации (first - первый ответ, readings - разборы, ...
+            context: Контекст для генерации.
+            conversation: Состояние диалога. После первого фрагмента в нём
+                          лежит ID созданного разговора.
+            model: Название модели для использования.
+            max_length: Целевая длина ответа в символах.
+
+        Yields:
+            Фрагменты текста ответа.
+        """
+        conversation_id = await self._resolve_conversation(conversation)
+        prompt = self._build_prompt(feature, context)
+        async for delta in self._stream(
+            prompt, conversation_id=conversation_id, model=model, max_length=max_length
+        ):
+            yield delta
+
+    async def stream_follow_up(
+        self,
+        prompt: str,
+        *,
+        conversation: Conversation,
+        model: str = OPENAI_MODEL,
+        max_length: int = 4090,
+    ) -> AsyncIterator[str]:
+        """Уточняющий вопрос в рамках разговора, ответ приходит потоком."""
+        async for delta in self._stream(
+            prompt, conversation_id=conversation.id, model=model, max_length=max_length
+        ):
+            yield delta
+
     async def chatgpt_image(
         self,
         prompt: str,
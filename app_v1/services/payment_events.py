@@ -0,0 +1,146 @@
+import asyncio
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from db.crud import (
+    claim_payment_events,
+    get_payment_by_payment_id,
+    mark_payment_event_processed,
+    retry_payment_event,
+    update_payment_status,
+)
+from db.database import AsyncSessionLocal
+from db.models import PaymentEvent
+from services.payment_poller import next_check_delay
+from services.payment_status import PAYMENT_STATUSES
+from services.topup_routine import TopupRoutine
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentEventConsumer:
+    """
+    Фоновая обработка уведомлений YooKassa из таблицы payment_events.
+
+    Вебхук только сохраняет уведомление и сразу отвечает, а начисление
+    делается здесь. События берутся пачками через FOR UPDATE SKIP LOCKED
+    с арендой на `lease`, поэтому несколько процессов не мешают друг другу,
+    а события упавшего процесса подхватываются после окончания аренды.
+    """
+
+    def __init__(
+        self,
+        poll_interval: float = 5,
+        batch_size: int = 50,
+        lease: timedelta = timedelta(minutes=2),
+    ):
+        """
+        Инициализация обработчика.
+
+        Args:
+            poll_interval: Интервал опроса таблицы в секундах, если не было wake().
+            batch_size: Максимум событий за один цикл.
+            lease: На сколько событие закрепляется за этим процессом.
+        """
+        self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.lease = lease
+        self.is_running = False
+        self._task: Optional[asyncio.Task] = None
+        self._wakeup = asyncio.Event()
+
+    def wake(self) -> None:
+        """Сигнал, что вебхук сохранил новое событие."""
+        self._wakeup.set()
+
+    async def _handle(self, event: PaymentEvent) -> None:
+        async with AsyncSessionLocal() as session:
+            payment = await get_payment_by_payment_id(event.payment_id, session)
+            if payment is None:
+                logger.warning(f"Payment event for unknown payment {event.payment_id}")
+            elif payment.status != "completed" and event.status == "succeeded":
+                #  В том числе платеж, который поллер уже отменил по TTL:
+                #  деньги пришли, значит энергию начисляем
+                topup_routine = TopupRoutine(session=session, user_id=payment.user_id)
+                await topup_routine.process_successful_payment(
+                    payment=payment, notify=True
+                )
+            elif payment.status == "pending" and event.status == "canceled":
+                await update_payment_status(
+                    payment_id=payment.payment_id,
+                    status="canceled",
+                    session=session,
+                )
+
+            await mark_payment_event_processed(event.id, session=session)
+
+        #  Кэш обновляем только после успешной записи в БД
+        PAYMENT_STATUSES.set(event.payment_id, event.status)
+
+    async def process_batch(self) -> int:
+        """
+        Обрабатывает одну пачку событий.
+
+        Returns:
+            Сколько событий было взято в работу.
+        """
+        async with AsyncSessionLocal() as session:
+            events = await claim_payment_events(
+                session, limit=self.batch_size, lease=self.lease
+            )
+
+        for event in events:
+            try:
+                await self._handle(event)
+            except Exception as e:
+                logger.error(
+                    f"Error processing payment event {event.id} "
+                    f"({event.payment_id}, {event.status}): {e}",
+                    exc_info=True,
+                )
+                async with AsyncSessionLocal() as session:
+                    await retry_payment_event(
+                        event.id, next_check_delay(event.attempts), session=session
+                    )
+
+        return len(events)
+
+    async def start(self) -> None:
+        """Запускает фоновую обработку событий."""
+        if self.is_running:
+            return
+
+        self.is_running = True
+
+        async def consume_loop():
+            while self.is_running:
+                self._wakeup.clear()
+                try:
+                    #  Полная пачка — сразу за следующей
+                    if await self.process_batch() == self.batch_size:
+                        continue
+                except Exception as e:
+                    logger.error(f"Error in payment event loop: {e}", exc_info=True)
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except TimeoutError:
+                    pass
+
+        self._task = asyncio.create_task(consume_loop())
+
+    async def stop(self) -> None:
+        """Останавливает обработку (взятые события вернутся после аренды)."""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+        logger.info("Payment event consumer stopped")
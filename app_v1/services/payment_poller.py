@@ -1,87 +1,163 @@
 import logging
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 import asyncio
 
+from core.config import settings
+
 from db.database import AsyncSessionLocal
 from db.crud import (
     get_pending_payments,
+    reschedule_payment_checks,
     update_payment_status,
 )
-from services.yk_payments import PaymentService
+from db.models import Payment
+from services.payment_status import PAYMENT_STATUSES
+from services.yk_client import YKPaymentInfo, YooKassaClient, YooKassaError
 from services.topup_routine import TopupRoutine
 
 logger = logging.getLogger(__name__)
 
 
+def next_check_delay(attempts: int) -> timedelta:
+    """
+    Задержка до следующей проверки платежа: экспоненциальный рост с потолком.
+
+    Сразу после создания платеж проверяется часто (пользователь как раз
+    оплачивает), брошенные платежи — всё реже.
+
+    Args:
+        attempts: Сколько раз платеж уже проверялся.
+
+    Returns:
+        Задержка до следующей проверки.
+    """
+    delay = settings.payment_check_base_delay * 2 ** min(attempts, 20)
+    return timedelta(seconds=min(delay, settings.payment_check_max_delay))
+
+
 class PaymentPoller:
     """Сервис для автоматической проверки статусов платежей."""
 
-    def __init__(self, poll_interval: int = 40):
+    def __init__(
+        self, yk: YooKassaClient, poll_interval: int = 5, batch_size: int = 100
+    ):
         """
         Инициализация опроса платежей.
 
+        У каждого платежа своё время следующей проверки (next_check_at),
+        поэтому цикл выбирает только «созревшие» платежи и его стоимость
+        не растёт вместе с историей платежей.
+
         Args:
-            poll_interval: Интервал проверки в секундах (по умолчанию 30)
+            yk: Общий асинхронный клиент YooKassa.
+            poll_interval: Интервал между циклами в секундах (по умолчанию 5)
+            batch_size: Максимум платежей, проверяемых за один цикл
         """
+        self.yk = yk
         self.poll_interval = poll_interval
+        self.batch_size = batch_size
+        self.ttl = timedelta(hours=settings.payment_ttl_hours)
         self.is_running = False
         self._task: Optional[asyncio.Task] = None
 
-    async def check_pending_payments(self) -> None:
-        """Проверяет все незавершенные платежи и обновляет их статусы."""
+    @staticmethod
+    def _next_check(payment: Payment, now: datetime) -> tuple[int, datetime]:
+        return payment.id, now + next_check_delay(payment.check_attempts)
+
+    async def _process(
+        self, payment: Payment, yk_payment: YKPaymentInfo, now: datetime
+    ) -> bool:
+        """
+        Применяет статус из YooKassa к одному платежу в собственной сессии.
+
+        Ошибка или откат по одному платежу не затрагивает остальные: у них
+        свои сессии и свои транзакции.
+
+        Returns:
+            True, если платеж по-прежнему ожидает оплаты.
+        """
         async with AsyncSessionLocal() as session:
-            try:
-                pending_payments = await get_pending_payments(session=session)
-
-                if not pending_payments:
-                    return
-
-                logger.info(f"Checking {len(pending_payments)} pending payments...")
-
-                for payment in pending_payments:
-                    try:
-                        payment_service = PaymentService(payment_id=payment.payment_id)
-                        status_success_data = payment_service.get_status_success()
-
-                        if status_success_data:
-
-                            topup_routine = TopupRoutine(
-                                session=session, user_id=payment.user_id
-                            )
-                            await topup_routine.process_successful_payment(
-                                payment=payment
-                            )
-
-                            logger.info(
-                                f"Payment {payment.payment_id} completed. \n"
-                                f"Balance increased for user {payment.user_id}"
-                            )
-                        else:
-                            # Проверяем, не отменен ли платеж
-                            from yookassa import Payment as YKPayment
-
-                            yk_payment = YKPayment.find_one(payment.payment_id)
-
-                            if yk_payment.status == "canceled":
-                                await update_payment_status(
-                                    payment_id=payment.payment_id,
-                                    status="canceled",
-                                    session=session,
-                                )
-                                logger.info(
-                                    f"Payment {payment.payment_id} was canceled"
-                                )
-
-                    except Exception as e:
-                        logger.error(
-                            f"Error checking payment {payment.payment_id}: {e}",
-                            exc_info=True,
-                        )
-                        continue
-
-            except Exception as e:
-                logger.error(f"Error in payment poller: {e}", exc_info=True)
+            if yk_payment.succeeded:
+                topup_routine = TopupRoutine(session=session, user_id=payment.user_id)
+                await topup_routine.process_successful_payment(
+                    payment=payment, notify=True
+                )
+                logger.info(
+                    f"Payment {payment.payment_id} completed. \n"
+                    f"Balance increased for user {payment.user_id}"
+                )
+            elif yk_payment.canceled:
+                await update_payment_status(
+                    payment_id=payment.payment_id,
+                    status="canceled",
+                    session=session,
+                )
+                logger.info(f"Payment {payment.payment_id} was canceled")
+            elif now - payment.created_at >= self.ttl:
+                #  Брошенный платеж: дальше не опрашиваем
+                await update_payment_status(
+                    payment_id=payment.payment_id,
+                    status="canceled",
+                    session=session,
+                )
+                logger.info(f"Payment {payment.payment_id} expired")
+            else:
+                return True
+        return False
+
+    async def check_pending_payments(self) -> None:
+        """Проверяет платежи, которым пора на проверку, и обновляет их статусы."""
+        try:
+            #  Соединение нужно только на выборку: пока ждём YooKassa,
+            #  оно уже в пуле
+            async with AsyncSessionLocal() as session:
+                pending_payments = await get_pending_payments(
+                    session=session, limit=self.batch_size
+                )
+
+            if not pending_payments:
+                return
+
+            logger.info(f"Checking {len(pending_payments)} pending payments...")
+
+            #  Один запрос на платёж, все запросы параллельно
+            yk_payments = await self.yk.get_payments(
+                payment.payment_id for payment in pending_payments
+            )
+            now = datetime.now(timezone.utc)
+            schedule: list[tuple[int, datetime]] = []
+
+            for payment in pending_payments:
+                yk_payment = yk_payments[payment.payment_id]
+                if isinstance(yk_payment, YooKassaError):
+                    logger.error(
+                        f"Error checking payment {payment.payment_id}: {yk_payment}"
+                    )
+                    schedule.append(self._next_check(payment, now))
+                    continue
+
+                try:
+                    still_pending = await self._process(payment, yk_payment, now)
+                except Exception as e:
+                    logger.error(
+                        f"Error checking payment {payment.payment_id}: {e}",
+                        exc_info=True,
+                    )
+                    still_pending = True
+                else:
+                    #  Кэш — только после успешной записи в БД
+                    PAYMENT_STATUSES.set(payment.payment_id, yk_payment.status)
+                if still_pending:
+                    schedule.append(self._next_check(payment, now))
+
+            #  Сохраняем новое расписание проверок
+            async with AsyncSessionLocal() as session:
+                await reschedule_payment_checks(schedule, session)
+
+        except Exception as e:
+            logger.error(f"Error in payment poller: {e}", exc_info=True)
 
     async def start(self) -> None:
         """Запускает фоновую задачу опроса платежей."""
@@ -0,0 +1,141 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+import asyncio
+
+from db.database import AsyncSessionLocal
+from db.crud import get_pending_payments_by_ids, update_payment_status
+from services.payment_status import PAYMENT_STATUSES
+from services.yk_client import YooKassaClient
+from services.topup_routine import TopupRoutine
+
+logger = logging.getLogger(__name__)
+
+
+class PaymentReconciler:
+    """Сервис, сверяющий платежи YooKassa с таблицей payments пачками."""
+
+    def __init__(
+        self,
+        yk: YooKassaClient,
+        interval: int = 900,
+        window: timedelta = timedelta(days=1),
+    ):
+        """
+        Инициализация сверки.
+
+        Вместо запроса на каждый ожидающий платеж сверка листает список
+        платежей YooKassa за окно `window` (по 100 на страницу) и одним
+        запросом к БД находит платежи, которые у нас всё ещё pending (или
+        отменены по TTL), хотя в YooKassa уже завершены. Их она проводит
+        через TopupRoutine или отменяет.
+
+        Args:
+            yk: Общий асинхронный клиент YooKassa.
+            interval: Интервал между сверками в секундах (по умолчанию 900)
+            window: За какой период назад сверяются платежи (по умолчанию сутки)
+        """
+        self.yk = yk
+        self.interval = interval
+        self.window = window
+        self.is_running = False
+        self._task: Optional[asyncio.Task] = None
+
+    async def reconcile(self, now: datetime | None = None) -> tuple[int, int]:
+        """
+        Одна сверка окна [now - window, now).
+
+        Returns:
+            Сколько платежей проведено и сколько отменено.
+        """
+        now = now or datetime.now(timezone.utc)
+        statuses = {}
+        finished = {}
+        async for yk_payment in self.yk.list_payments(
+            created_gte=now - self.window, created_lt=now
+        ):
+            statuses[yk_payment.id] = yk_payment.status
+            if yk_payment.succeeded or yk_payment.canceled:
+                finished[yk_payment.id] = yk_payment
+
+        settled = canceled = 0
+        failed = set()
+        async with AsyncSessionLocal() as session:
+            #  Отменённые у нас по TTL тоже: в YooKassa они могли пройти позже
+            payments = await get_pending_payments_by_ids(
+                finished, session=session, statuses=("pending", "canceled")
+            )
+
+        for payment in payments:
+            yk_payment = finished[payment.payment_id]
+            if yk_payment.canceled and payment.status == "canceled":
+                continue
+            try:
+                #  Своя сессия на каждый платеж: откат после ошибки в одном
+                #  не затрагивает остальные
+                async with AsyncSessionLocal() as session:
+                    if yk_payment.succeeded:
+                        topup_routine = TopupRoutine(
+                            session=session, user_id=payment.user_id
+                        )
+                        await topup_routine.process_successful_payment(
+                            payment=payment, notify=True
+                        )
+                        settled += 1
+                    else:
+                        await update_payment_status(
+                            payment_id=payment.payment_id,
+                            status="canceled",
+                            session=session,
+                        )
+                        canceled += 1
+            except Exception as e:
+                failed.add(payment.payment_id)
+                logger.error(
+                    f"Error reconciling payment {payment.payment_id}: {e}",
+                    exc_info=True,
+                )
+
+        #  Кэш статусов — только для платежей, чьё состояние в БД уже верно
+        for payment_id, status in statuses.items():
+            if payment_id not in failed:
+                PAYMENT_STATUSES.set(payment_id, status)
+
+        if settled or canceled:
+            logger.warning(
+                f"Reconciliation: {settled} payments settled, {canceled} canceled "
+                f"(out of {len(finished)} finished in YooKassa)"
+            )
+        return settled, canceled
+
+    async def start(self) -> None:
+        """Запускает фоновую сверку."""
+        if self.is_running:
+            return
+
+        self.is_running = True
+
+        async def reconcile_loop():
+            while self.is_running:
+                try:
+                    await self.reconcile()
+                except Exception as e:
+                    logger.error(f"Error reconciling payments: {e}", exc_info=True)
+
+                await asyncio.sleep(self.interval)
+
+        self._task = asyncio.create_task(reconcile_loop())
+
+    async def stop(self) -> None:
+        """Останавливает фоновую сверку."""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
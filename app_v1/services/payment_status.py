@@ -0,0 +1,91 @@
+import asyncio
+import logging
+from collections import OrderedDict
+from time import monotonic
+
+from services.yk_client import YooKassaClient, YooKassaError
+
+logger = logging.getLogger(__name__)
+
+#  Статусы, после которых платеж в YooKassa уже не меняется
+FINAL_STATUSES = {"succeeded", "canceled"}
+
+
+class PaymentStatusCache:
+    """
+    Локальный кэш статусов платежей YooKassa.
+
+    Наполняется вебхуком (PaymentEventConsumer), поллером и сверкой, поэтому
+    нажатие «Проверить платеж» обычно обходится без запроса к API. Конечный
+    статус хранится, пока запись не вытеснена (LRU), а «ещё не оплачен» —
+    только `negative_ttl` секунд. Если значение устарело, обновление делает
+    один запрос: параллельные нажатия ждут тот же запрос (single-flight).
+    """
+
+    def __init__(self, negative_ttl: float = 10.0, max_entries: int = 10_000):
+        """
+        Инициализация кэша.
+
+        Args:
+            negative_ttl: Сколько секунд доверять незавершённому статусу.
+            max_entries: Максимум платежей в кэше.
+        """
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        #  payment_id -> (статус, время получения)
+        self._statuses: OrderedDict[str, tuple[str, float]] = OrderedDict()
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    def set(self, payment_id: str, status: str) -> None:
+        """Запоминает статус, полученный из вебхука или API."""
+        self._statuses[payment_id] = (status, monotonic())
+        self._statuses.move_to_end(payment_id)
+        while len(self._statuses) > self.max_entries:
+            self._statuses.popitem(last=False)
+
+    def cached(self, payment_id: str) -> str | None:
+        """Статус из кэша, если ему ещё можно доверять."""
+        entry = self._statuses.get(payment_id)
+        if entry is None:
+            return None
+        status, fetched_at = entry
+        if status in FINAL_STATUSES or monotonic() - fetched_at < self.negative_ttl:
+            return status
+        return None
+
+    async def _refresh(self, payment_id: str, yk: YooKassaClient) -> str | None:
+        try:
+            yk_payment = await yk.get_payment(payment_id)
+        except YooKassaError as e:
+            logger.error(f"Error refreshing payment {payment_id}: {e}")
+            return None
+        finally:
+            self._inflight.pop(payment_id, None)
+        self.set(payment_id, yk_payment.status)
+        return yk_payment.status
+
+    async def get(self, payment_id: str, yk: YooKassaClient) -> str | None:
+        """
+        Статус платежа: из кэша или одним общим запросом к YooKassa.
+
+        Args:
+            payment_id: ID платежа в YooKassa.
+            yk: Общий асинхронный клиент YooKassa.
+
+        Returns:
+            Статус или None, если YooKassa сейчас недоступна.
+        """
+        status = self.cached(payment_id)
+        if status is not None:
+            return status
+
+        task = self._inflight.get(payment_id)
+        if task is None:
+            task = asyncio.create_task(self._refresh(payment_id, yk))
+            self._inflight[payment_id] = task
+        #  shield: отмена одного ожидающего не отменяет запрос для остальных
+        return await asyncio.shield(task)
+
+
+#  Общий кэш на весь процесс
+PAYMENT_STATUSES = PaymentStatusCache()
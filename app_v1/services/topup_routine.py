@@ -1,19 +1,11 @@
 import logging
-from math import ceil
-from typing import Optional
 
-from aiogram import session
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm.attributes import set_committed_value
 
-from db.crud import (
-    create_referral_bonus,
-    get_payment_by_payment_id,
-    get_user,
-    increase_user_balance,
-    update_payment_status,
-    update_user_info,
-)
-from db.models import Payment, User
+from core.config import bot
+from db.crud import get_payment_by_payment_id, settle_payment
+from db.models import Payment
 from schemas import REFERRAL_BONUS_PERCENT
 
 logger = logging.getLogger(__name__)
@@ -26,14 +18,20 @@ class TopupRoutine:
         self.session = session
         self.user_id = user_id
 
-    async def process_successful_payment(self, *, payment: Payment) -> Payment:
+    async def process_successful_payment(
+        self, *, payment: Payment, notify: bool = False
+    ) -> Payment:
         """
         Отмечает платеж завершенным, начисляет энергию и реферальный бонус.
 
-        Все операции выполняются в одной транзакции без промежуточных коммитов.
+        Всё делается одним запросом (db.crud.settle_payment), идемпотентным
+        по payment_id: вебхук и поллер, обработавшие один платеж
+        одновременно, не начислят энергию дважды.
 
         Args:
             payment: Экземпляр платежа.
+            notify: Сообщить пользователю о начислении. Сообщение отправляет
+                    только тот вызов, который действительно провел платеж.
 
         Returns:
             Обновленный платеж.
@@ -41,75 +39,40 @@ class TopupRoutine:
         if payment.status == "completed":
             return payment
 
-        user = await get_user(id=self.user_id, session=self.session)
-        if not user:
-            raise ValueError(f"User with id {self.user_id} not found")
-
         try:
-            #  Отмечаем платеж завершенным
-            await update_payment_status(
+            settled = await settle_payment(
                 payment_id=payment.payment_id,
-                status="completed",
-                session=self.session,
-                commit=False,
-            )
-
-            #  Начисляем энергию на баланс пользователя
-            await increase_user_balance(
-                user_id=self.user_id,
-                amount=payment.amount,
-                session=self.session,
-                commit=False,
-            )
-
-            #  Переводим пользователя в сегмент "client"
-            await update_user_info(
-                user_id=user.user_id,
-                data={"segment": "client"},
+                bonus_percent=REFERRAL_BONUS_PERCENT,
                 session=self.session,
-                commit=False,
             )
-            await self.session.commit()
-
-            #  Начисляем реферальный бонус пригласившему пользователю
-            if user.referred_id:
-                referrer: User = await get_user(
-                    id=user.referred_id, session=self.session
-                )
-                if referrer:
-                    bonus_amount = ceil(payment.amount * REFERRAL_BONUS_PERCENT)
-                    if bonus_amount > 0:
-                        ref_bonus_data = {
-                            "ref_id": referrer.id,  # внутренний ID пригласившего
-                            "referred_user_id": referrer.user_id,  # tg-id пригласившего
-                            "referrer_user_id": user.user_id,  # tg-id приглашенного
-                            "bonus_type": "deposit",
-                            "amount": bonus_amount,
-                            "deposit_rub_amount": payment.rub_amount,
-                            "deposit_token_amount": payment.amount,
-                            "pay_id": payment.id,
-                        }
-                        await create_referral_bonus(
-                            data=ref_bonus_data,
-                            session=self.session,
-                            commit=False,
-                        )
-
-                        await increase_user_balance(
-                            user_id=referrer.id,
-                            amount=bonus_amount,
-                            session=self.session,
-                            commit=False,
-                        )
-
-            await self.session.commit()
         except Exception:
-            await self.session.rollback()
             logger.exception(
                 "Failed to process successful payment %s", payment.payment_id
             )
             raise
 
+        if settled is None:
+            logger.info("Payment %s was already settled", payment.payment_id)
+        elif settled.bonus_amount:
+            logger.info(
+                "Referral bonus %s for user %s (payment %s)",
+                settled.bonus_amount,
+                settled.referrer_id,
+                payment.payment_id,
+            )
+
+        set_committed_value(payment, "status", "completed")
+
+        if settled is not None and notify:
+            try:
+                await bot.send_message(
+                    chat_id=settled.telegram_id,
+                    text=f"+ {payment.amount} энергии ⚡️",
+                )
+            except Exception as e:
+                logger.error(
+                    "Error notifying about payment %s: %s", payment.payment_id, e
+                )
         return payment
 
     async def process_payment_by_id(self, payment_id: str) -> Payment | None:
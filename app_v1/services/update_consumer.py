@@ -0,0 +1,223 @@
+import asyncio
+import logging
+from typing import Any
+
+from aiogram import Bot, Dispatcher
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from db.crud import delete_telegram_updates, get_telegram_updates
+from db.database import AsyncSessionLocal, engine
+
+logger = logging.getLogger(__name__)
+
+#  Пространство ключей advisory lock для шардов апдейтов
+SHARD_LOCK_NAMESPACE = 20_001
+
+
+def update_chat_id(payload: dict[str, Any]) -> int:
+    """
+    Чат апдейта, по которому он шардируется.
+
+    Берётся чат события (для callback_query — чат его сообщения), иначе
+    автор события. Апдейты без чата и автора попадают в шард 0.
+    """
+    for key, event in payload.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+        author = event.get("from") or event.get("user")
+        if author:
+            return author["id"]
+    return 0
+
+
+class UpdateConsumer:
+    """
+    Обработчик апдейтов, принятых вебхуком в таблицу telegram_updates.
+
+    Апдейты делятся на `shards` шардов по abs(chat_id); процесс обрабатывает
+    только свой шард и владеет им через advisory lock, поэтому при деплое
+    новый процесс начинает работу, как только старый отпустит шард, и ни
+    один апдейт не теряется. Внутри шарда у каждого чата своя очередь:
+    апдейты одного чата обрабатываются строго по порядку, разные чаты —
+    параллельно. Обработанные апдейты удаляются пачками (at-least-once:
+    при падении процесса последние апдейты могут обработаться повторно).
+    """
+
+    def __init__(
+        self,
+        dp: Dispatcher,
+        bot: Bot,
+        shard: int = 0,
+        shards: int = 1,
+        poll_interval: float = 0.5,
+        max_inflight: int = 500,
+    ):
+        """
+        Инициализация обработчика.
+
+        Args:
+            dp: Диспетчер, в который передаются апдейты.
+            bot: Бот, от имени которого они обрабатываются.
+            shard: Номер шарда этого процесса.
+            shards: Общее число шардов (процессов).
+            poll_interval: Период опроса таблицы в секундах, если не было wake().
+            max_inflight: Максимум апдейтов, взятых в работу одновременно.
+        """
+        self.dp = dp
+        self.bot = bot
+        self.shard = shard
+        self.shards = shards
+        self.poll_interval = poll_interval
+        self.max_inflight = max_inflight
+        self.is_running = False
+        self._task: asyncio.Task | None = None
+        self._lock_conn: AsyncConnection | None = None
+        self._wakeup = asyncio.Event()
+        #  id строк, взятых в работу, и id уже обработанных (к удалению)
+        self._inflight: set[int] = set()
+        self._done: list[int] = []
+        self._chats: dict[int, asyncio.Queue] = {}
+        self._workers: set[asyncio.Task] = set()
+
+    def wake(self) -> None:
+        """Сигнал, что в таблицу добавлен апдейт — не ждать poll_interval."""
+        self._wakeup.set()
+
+    def owns(self, chat_id: int) -> bool:
+        return abs(chat_id) % self.shards == self.shard
+
+    #  ----------- SHARD LOCK -----------
+
+    async def _acquire_shard(self) -> None:
+        self._lock_conn = await engine.connect()
+        waiting_logged = False
+        while True:
+            acquired = await self._lock_conn.scalar(
+                text("SELECT pg_try_advisory_lock(:ns, :shard)"),
+                {"ns": SHARD_LOCK_NAMESPACE, "shard": self.shard},
+            )
+            #  Сессионная блокировка переживает commit; не держим транзакцию
+            await self._lock_conn.commit()
+            if acquired:
+                return
+            if not waiting_logged:
+                logger.info(f"Waiting for update shard {self.shard} to be released")
+                waiting_logged = True
+            await asyncio.sleep(1)
+
+    async def _release_shard(self) -> None:
+        if self._lock_conn is None:
+            return
+        try:
+            await self._lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:ns, :shard)"),
+                {"ns": SHARD_LOCK_NAMESPACE, "shard": self.shard},
+            )
+            await self._lock_conn.commit()
+        finally:
+            await self._lock_conn.close()
+            self._lock_conn = None
+
+    #  ----------- PROCESSING -----------
+
+    async def _chat_worker(self, chat_id: int, queue: asyncio.Queue) -> None:
+        while not queue.empty():
+            row_id, payload = queue.get_nowait()
+            try:
+                await self.dp.feed_raw_update(self.bot, payload)
+            except Exception as e:
+                logger.error(
+                    f"Error handling update {payload.get('update_id')}: {e}",
+                    exc_info=True,
+                )
+            self._done.append(row_id)
+        del self._chats[chat_id]
+
+    def _dispatch(self, row_id: int, chat_id: int, payload: dict[str, Any]) -> None:
+        self._inflight.add(row_id)
+        queue = self._chats.get(chat_id)
+        if queue is not None:
+            queue.put_nowait((row_id, payload))
+            return
+
+        queue = self._chats[chat_id] = asyncio.Queue()
+        queue.put_nowait((row_id, payload))
+        task = asyncio.create_task(self._chat_worker(chat_id, queue))
+        self._workers.add(task)
+        task.add_done_callback(self._workers.discard)
+
+    async def _cleanup(self) -> None:
+        if not self._done:
+            return
+        done, self._done = self._done, []
+        async with AsyncSessionLocal() as session:
+            await delete_telegram_updates(done, session=session)
+        self._inflight.difference_update(done)
+
+    async def poll_once(self) -> None:
+        """Удаляет обработанные апдейты и забирает новые в работу."""
+        await self._cleanup()
+
+        limit = self.max_inflight - len(self._inflight)
+        if limit <= 0:
+            return
+
+        async with AsyncSessionLocal() as session:
+            updates = await get_telegram_updates(
+                session,
+                shard=self.shard,
+                shards=self.shards,
+                exclude=self._inflight,
+                limit=limit,
+            )
+        for update in updates:
+            self._dispatch(update.id, update.chat_id, update.payload)
+
+    async def start(self) -> None:
+        """Захватывает шард и запускает обработку апдейтов."""
+        if self.is_running:
+            return
+
+        await self._acquire_shard()
+        self.is_running = True
+        logger.info(f"Consuming update shard {self.shard}/{self.shards}")
+
+        async def consume_loop():
+            while self.is_running:
+                self._wakeup.clear()
+                try:
+                    await self.poll_once()
+                except Exception as e:
+                    logger.error(f"Error in update consumer: {e}", exc_info=True)
+
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except TimeoutError:
+                    pass
+
+        self._task = asyncio.create_task(consume_loop())
+
+    async def stop(self) -> None:
+        """Дорабатывает взятые апдейты, сохраняет FSM и отпускает шард."""
+        if not self.is_running:
+            return
+
+        self.is_running = False
+        self.wake()
+        if self._task:
+            await self._task
+        if self._workers:
+            await asyncio.gather(*self._workers, return_exceptions=True)
+        try:
+            #  Состояния FSM пишутся с задержкой. Их нужно сохранить до того,
+            #  как шард заберёт новый процесс, иначе он прочитает старые
+            await self.dp.fsm.storage.close()
+            await self._cleanup()
+        finally:
+            await self._release_shard()
+
+        logger.info(f"Update shard {self.shard} released")
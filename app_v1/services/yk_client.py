@@ -0,0 +1,210 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import AsyncIterator, Iterable
+
+import httpx
+
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+#  Пул keep-alive соединений к API YooKassa
+YK_HTTP_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=10,
+    keepalive_expiry=60,
+)
+
+
+class YooKassaError(Exception):
+    """Ошибка запроса к API YooKassa."""
+
+
+@dataclass(slots=True, frozen=True)
+class YKPaymentInfo:
+    """Снимок платежа YooKassa из одного ответа API."""
+
+    id: str
+    status: str
+    paid: bool = False
+    amount: str | None = None
+    metadata: dict = field(default_factory=dict)
+    confirmation_url: str | None = None
+
+    @property
+    def succeeded(self) -> bool:
+        return self.status == "succeeded"
+
+    @property
+    def canceled(self) -> bool:
+        return self.status == "canceled"
+
+    @classmethod
+    def from_json(cls, data: dict) -> "YKPaymentInfo":
+        return cls(
+            id=data["id"],
+            status=data["status"],
+            paid=data.get("paid", False),
+            amount=(data.get("amount") or {}).get("value"),
+            metadata=data.get("metadata") or {},
+            confirmation_url=(data.get("confirmation") or {}).get("confirmation_url"),
+        )
+
+
+class YooKassaClient:
+    """
+    Асинхронный клиент API YooKassa.
+
+    Один на процесс: держит пул HTTP-соединений и ограничивает число
+    одновременных запросов, чтобы не упираться в лимиты магазина.
+    """
+
+    def __init__(
+        self,
+        base_url: str | None = None,
+        concurrency: int = 8,
+        timeout: float = 15.0,
+    ):
+        """
+        Инициализация клиента.
+
+        Args:
+            base_url: Адрес API. По умолчанию берётся из настроек.
+            concurrency: Максимум одновременных запросов к API.
+            timeout: Таймаут одного запроса в секундах.
+        """
+        self._client = httpx.AsyncClient(
+            base_url=base_url or settings.yk.api_url,
+            auth=(settings.yk.shop_id, settings.yk.key),
+            limits=YK_HTTP_LIMITS,
+            timeout=timeout,
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    async def _request(self, method: str, url: str, **kwargs) -> dict:
+        async with self._semaphore:
+            try:
+                response = await self._client.request(method, url, **kwargs)
+            except httpx.HTTPError as e:
+                raise YooKassaError(f"{method} {url}: {e}") from e
+
+        if response.is_error:
+            raise YooKassaError(
+                f"{method} {url}: {response.status_code} {response.text}"
+            )
+        return response.json()
+
+    async def get_payment(self, payment_id: str) -> YKPaymentInfo:
+        """
+        Получает платеж по ID.
+
+        Args:
+            payment_id: ID платежа в YooKassa.
+
+        Returns:
+            Снимок платежа.
+
+        Raises:
+            YooKassaError: Если API недоступно или вернуло ошибку.
+        """
+        data = await self._request("GET", f"payments/{payment_id}")
+        return YKPaymentInfo.from_json(data)
+
+    async def create_payment(
+        self, payload: dict, idempotence_key: str
+    ) -> YKPaymentInfo:
+        """
+        Создает платеж.
+
+        Повторный запрос с тем же ключом идемпотентности (в течение суток)
+        возвращает уже созданный платеж, а не создает новый.
+
+        Args:
+            payload: Тело запроса POST /payments.
+            idempotence_key: Ключ идемпотентности.
+
+        Returns:
+            Снимок созданного платежа (со ссылкой на оплату).
+
+        Raises:
+            YooKassaError: Если API недоступно или вернуло ошибку.
+        """
+        data = await self._request(
+            "POST",
+            "payments",
+            json=payload,
+            headers={"Idempotence-Key": idempotence_key},
+        )
+        return YKPaymentInfo.from_json(data)
+
+    async def get_payments(
+        self, payment_ids: Iterable[str]
+    ) -> dict[str, YKPaymentInfo | YooKassaError]:
+        """
+        Параллельно получает несколько платежей (не больше `concurrency` разом).
+
+        Args:
+            payment_ids: ID платежей в YooKassa.
+
+        Returns:
+            Словарь {payment_id: снимок платежа или ошибка запроса}.
+        """
+        payment_ids = list(payment_ids)
+        results = await asyncio.gather(
+            *(self.get_payment(pid) for pid in payment_ids),
+            return_exceptions=True,
+        )
+        for pid, result in zip(payment_ids, results):
+            if isinstance(result, BaseException) and not isinstance(
+                result, YooKassaError
+            ):
+                raise result
+        return dict(zip(payment_ids, results))
+
+    async def list_payments(
+        self,
+        *,
+        created_gte: datetime,
+        created_lt: datetime,
+        status: str | None = None,
+        page_size: int = 100,
+    ) -> AsyncIterator[YKPaymentInfo]:
+        """
+        Перебирает платежи магазина, созданные в окне, постранично по курсору.
+
+        Args:
+            created_gte: Начало окна (включительно).
+            created_lt: Конец окна (не включительно).
+            status: Только платежи с этим статусом.
+            page_size: Платежей на страницу (максимум API — 100).
+
+        Yields:
+            Снимки платежей.
+
+        Raises:
+            YooKassaError: Если API недоступно или вернуло ошибку.
+        """
+        params = {
+            "created_at.gte": created_gte.isoformat(),
+            "created_at.lt": created_lt.isoformat(),
+            "limit": page_size,
+        }
+        if status is not None:
+            params["status"] = status
+
+        while True:
+            data = await self._request("GET", "payments", params=params)
+            for item in data.get("items", []):
+                yield YKPaymentInfo.from_json(item)
+
+            cursor = data.get("next_cursor")
+            if not cursor:
+                return
+            params["cursor"] = cursor
+
+    async def close(self) -> None:
+        """Закрывает пул HTTP-соединений."""
+        await self._client.aclose()
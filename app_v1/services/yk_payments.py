@@ -1,57 +1,97 @@
 import uuid
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 from yookassa import Configuration, Payment
 
 from core.config import settings
+from db.crud import (
+    create_payment,
+    get_last_payment_id,
+    get_open_payment,
+    get_payment_by_payment_id,
+)
+from db.database import release_connection
+from db.models import Payment as PaymentModel, User
+from services.yk_client import YooKassaClient, YKPaymentInfo
+
+
+#  Пространство имён ключей идемпотентности платежей (uuid5)
+IDEMPOTENCE_NAMESPACE = uuid.UUID("6f1c7e52-3b9d-4a8e-9f20-5d4c1b7a0e93")
+
+
+def checkout_idempotence_key(
+    user_id: int, rub_amount: int, last_payment_id: int
+) -> str:
+    """
+    Детерминированный ключ идемпотентности платежа.
+
+    Ключ одинаков для повторов одного и того же выбора тарифа (двойное
+    нажатие, повтор после ошибки до сохранения платежа) и меняется, как
+    только у пользователя появился новый платеж. Переиспользование уже
+    сохранённого платежа — дело get_open_payment, а не ключа.
+
+    Args:
+        user_id: ID пользователя.
+        rub_amount: Сумма в рублях.
+        last_payment_id: id последнего платежа пользователя (0 — не было).
+    """
+    name = f"{user_id}:{rub_amount}:{last_payment_id}"
+    return str(uuid.uuid5(IDEMPOTENCE_NAMESPACE, name))
 
 
 class PaymentService:
     """Сервис для работы с платежами YooKassa."""
 
-    def __init__(self, payment_id: Optional[str] = None):
+    def __init__(
+        self, yk: YooKassaClient | None = None, payment_id: Optional[str] = None
+    ):
         """
         Инициализация сервиса для работы с платежами.
 
         Args:
+            yk: Общий асинхронный клиент YooKassa (нужен для create_payment и checkout)
             payment_id: Опциональный ID платежа для работы с существующим платежом
         """
         Configuration.account_id = settings.yk.shop_id
         Configuration.secret_key = settings.yk.key
+        self.yk = yk
         self.payment_id = payment_id
 
-    def create_payment(
+    async def create_payment(
         self,
+        *,
         kreds: int,
         amount_rub: int,
         customer_email: str,
         chat_id: int,
         user_id: int,
+        idempotence_key: str,
         return_url: str = "https://t.me/MatrikaSoulBot",
-    ) -> dict:
+    ) -> YKPaymentInfo:
         """
         Создает платеж в YooKassa.
 
         Args:
-            amount: Сумма платежа в рублях
+            kreds: Количество энергии
+            amount_rub: Сумма платежа в рублях
+            customer_email: Email для чека
             chat_id: ID чата пользователя
-            description: Описание платежа
+            user_id: Telegram ID пользователя (для описания платежа)
+            idempotence_key: Ключ идемпотентности
             return_url: URL для возврата после оплаты
 
         Returns:
-            Словарь с данными платежа:
-            {
-                "payment_id": str,
-                "confirmation_url": str,
-                "amount": int
-            }
+            Снимок созданного платежа
         """
 
         description = (
             f"Пополнение энергии Matrika Soul Bot {user_id} ({amount_rub}₽ → {kreds}⚡️)"
         )
 
-        payment = Payment.create(
+        payment = await self.yk.create_payment(
             {
                 "amount": {
                     "value": amount_rub,
@@ -81,17 +121,84 @@ class PaymentService:
                     "chat_id": chat_id,
                 },
             },
-            str(uuid.uuid4()),
+            idempotence_key,
         )
 
         # Сохраняем payment_id в экземпляр
         self.payment_id = payment.id
 
-        return {
-            "payment_id": payment.id,
-            "confirmation_url": payment.confirmation.confirmation_url,
-            "amount": amount_rub,
-        }
+        return payment
+
+    async def checkout(
+        self,
+        *,
+        user: User,
+        kreds: int,
+        amount_rub: int,
+        chat_id: int,
+        session: AsyncSession,
+    ) -> PaymentModel:
+        """
+        Выдает ссылку на оплату тарифа.
+
+        Если у пользователя уже есть неоплаченный платеж на ту же сумму
+        моложе payment_checkout_ttl_minutes, возвращается он. Иначе платеж
+        создается с детерминированным ключом идемпотентности, поэтому
+        повторы и параллельные нажатия получают один и тот же платеж.
+
+        Args:
+            user: Пользователь (с заполненным mail)
+            kreds: Количество энергии
+            amount_rub: Сумма платежа в рублях
+            chat_id: ID чата пользователя
+            session: Сессия БД
+
+        Returns:
+            Платеж из БД со ссылкой на оплату
+
+        Raises:
+            YooKassaError: Если YooKassa не ответила или отклонила запрос
+        """
+        now = datetime.now(timezone.utc)
+        ttl = timedelta(minutes=settings.payment_checkout_ttl_minutes)
+
+        payment = await get_open_payment(
+            user_id=user.id,
+            rub_amount=amount_rub,
+            created_after=now - ttl,
+            session=session,
+        )
+        if payment is not None:
+            return payment
+
+        last_payment_id = await get_last_payment_id(user.id, session=session)
+        #  Пока ждём YooKassa, соединение с БД возвращаем в пул
+        await release_connection(session)
+
+        yk_payment = await self.create_payment(
+            kreds=kreds,
+            amount_rub=amount_rub,
+            customer_email=user.mail,
+            chat_id=chat_id,
+            user_id=user.user_id,
+            idempotence_key=checkout_idempotence_key(
+                user.id, amount_rub, last_payment_id
+            ),
+        )
+
+        try:
+            return await create_payment(
+                user_id=user.id,
+                payment_id=yk_payment.id,
+                amount=kreds,
+                rub_amount=amount_rub,
+                status="pending",
+                confirmation_url=yk_payment.confirmation_url,
+                session=session,
+            )
+        except IntegrityError:
+            #  Параллельное нажатие с тем же ключом уже сохранило этот платеж
+            return await get_payment_by_payment_id(yk_payment.id, session=session)
 
     def get_status_success(self, payment_id: Optional[str] = None) -> Optional[dict]:
         """
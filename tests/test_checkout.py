@@ -0,0 +1,123 @@
+import asyncio
+from types import SimpleNamespace
+
+from db.crud import upsert_user
+from db.database import AsyncSessionLocal
+from routers import deposit_hand
+from services.yk_client import YKPaymentInfo, YooKassaError
+from services.yk_payments import PaymentService, checkout_idempotence_key
+
+
+class FakeYooKassa:
+    """Creates one payment per idempotence key, like the real API."""
+
+    def __init__(self):
+        self.keys: list[str] = []
+        self._payments: dict[str, YKPaymentInfo] = {}
+
+    async def create_payment(self, body, idempotence_key):
+        self.keys.append(idempotence_key)
+        #  Let a concurrent checkout reach the same point
+        await asyncio.sleep(0.01)
+        if idempotence_key not in self._payments:
+            payment_id = f"yk-{len(self._payments) + 1}"
+            self._payments[idempotence_key] = YKPaymentInfo(
+                id=payment_id,
+                status="pending",
+                confirmation_url=f"https://pay.test/{payment_id}",
+            )
+        return self._payments[idempotence_key]
+
+
+async def make_user():
+    async with AsyncSessionLocal() as session:
+        user = await upsert_user(
+            user_id=100, username=None, first_name=None, last_name=None, session=session
+        )
+        user.mail = "user@example.com"
+        await session.commit()
+    return user
+
+
+async def checkout(yk, user, amount_rub: int = 100):
+    async with AsyncSessionLocal() as session:
+        return await PaymentService(yk).checkout(
+            user=user, kreds=10, amount_rub=amount_rub, chat_id=1, session=session
+        )
+
+
+def test_idempotence_key_depends_on_last_payment_only():
+    key = checkout_idempotence_key(1, 100, 0)
+
+    assert checkout_idempotence_key(1, 100, 0) == key
+    assert checkout_idempotence_key(1, 100, 7) != key
+    assert checkout_idempotence_key(1, 200, 0) != key
+    assert checkout_idempotence_key(2, 100, 0) != key
+
+
+async def test_open_payment_is_reused(db):
+    user = await make_user()
+    yk = FakeYooKassa()
+
+    first = await checkout(yk, user)
+    second = await checkout(yk, user)
+
+    assert second.payment_id == first.payment_id
+    assert len(yk.keys) == 1
+
+
+async def test_new_amount_gets_new_payment(db):
+    user = await make_user()
+    yk = FakeYooKassa()
+
+    first = await checkout(yk, user, amount_rub=100)
+    second = await checkout(yk, user, amount_rub=200)
+
+    assert second.payment_id != first.payment_id
+    assert yk.keys[0] != yk.keys[1]
+
+
+async def test_concurrent_checkouts_share_one_payment(db):
+    #  Both miss get_open_payment, send the same key, and the second insert
+    #  hits the unique payment_id and falls back to the stored row
+    user = await make_user()
+    yk = FakeYooKassa()
+
+    first, second = await asyncio.gather(checkout(yk, user), checkout(yk, user))
+
+    assert first.payment_id == second.payment_id == "yk-1"
+    assert first.id == second.id
+    assert yk.keys[0] == yk.keys[1]
+
+
+async def test_top_up_reports_yookassa_errors(monkeypatch):
+    alerts = []
+    user = SimpleNamespace(user_id=100, mail="user@example.com")
+
+    async def get_user(tg_id, session):
+        return user
+
+    class BrokenPaymentService:
+        def __init__(self, yk):
+            pass
+
+        async def checkout(self, **kwargs):
+            raise YooKassaError("POST payments: timed out")
+
+    async def answer(text=None, show_alert=False):
+        alerts.append((text, show_alert))
+
+    monkeypatch.setattr(deposit_hand, "get_user_by_telegram_id", get_user)
+    monkeypatch.setattr(deposit_hand, "PaymentService", BrokenPaymentService)
+    call = SimpleNamespace(
+        from_user=SimpleNamespace(id=100),
+        message=SimpleNamespace(chat=SimpleNamespace(id=100)),
+        answer=answer,
+    )
+
+    await deposit_hand.top_up(
+        call, SimpleNamespace(rub=100), state=None, db_session=None, yk=None
+    )
+
+    assert len(alerts) == 1
+    assert alerts[0][1] is True
@@ -0,0 +1,136 @@
+import asyncio
+
+from sqlalchemy import select
+
+from db.crud import (
+    capture_credits,
+    change_user_balance,
+    release_credits,
+    release_expired_holds,
+    reserve_credits,
+    upsert_user,
+)
+from db.database import AsyncSessionLocal
+from db.models import User
+
+
+async def make_user(session, balance: int) -> User:
+    user = await upsert_user(
+        user_id=100, username=None, first_name=None, last_name=None, session=session
+    )
+    await change_user_balance(user.id, balance, session)
+    return user
+
+
+async def balance_of(user: User) -> int:
+    async with AsyncSessionLocal() as session:
+        return await session.scalar(select(User.balance).where(User.id == user.id))
+
+
+async def reserve(session, user: User, purpose: str = "reading", **kwargs):
+    return await reserve_credits(
+        user_id=user.id, amount=30, purpose=purpose, session=session, **kwargs
+    )
+
+
+async def test_reserve_debits_balance(db):
+    async with AsyncSessionLocal() as session:
+        user = await make_user(session, 100)
+        hold_id = await reserve(session, user)
+
+    assert hold_id is not None
+    assert await balance_of(user) == 70
+
+
+async def test_reserve_rejects_low_balance(db):
+    async with AsyncSessionLocal() as session:
+        user = await make_user(session, 10)
+        assert await reserve(session, user) is None
+
+    assert await balance_of(user) == 10
+
+
+async def test_second_hold_for_same_feature_is_rejected(db):
+    async with AsyncSessionLocal() as session:
+        user = await make_user(session, 100)
+        assert await reserve(session, user) is not None
+        assert await reserve(session, user) is None
+        assert await reserve(session, user, purpose="daily_card") is not None
+
+    assert await balance_of(user) == 40
+
+
+async def test_capture_settles_hold_once(db):
+    async with AsyncSessionLocal() as session:
+        user = await make_user(session, 100)
+        hold_id = await reserve(session, user)
+
+        assert await capture_credits(hold_id, session) is True
+        assert await capture_credits(hold_id, session) is False
+        assert await release_credits(hold_id, session) is None
+
+    assert await balance_of(user) == 70
+
+
+async def test_release_refunds_hold(db):
+    async with AsyncSessionLocal() as session:
+        user = await make_user(session, 100)
+        hold_id = await reserve(session, user)
+
+        assert await release_credits(hold_id, session) == 100
+        assert await release_credits(hold_id, session) is None
+        #  A released hold does not block a new one for the same feature
+        assert await reserve(session, user) is not None
+
+    assert await balance_of(user) == 70
+
+
+async def test_sweep_refunds_only_expired_holds(db):
+    async with AsyncSessionLocal() as session:
+        user = await make_user(session, 100)
+        await reserve(session, user, ttl=-1)
+        await reserve(session, user, purpose="daily_card")
+
+        assert await release_expired_holds(session) == 1
+
+    assert await balance_of(user) == 70
+
+
+async def test_capture_after_sweep_charges_again(db):
+    async with AsyncSessionLocal() as session:
+        user = await make_user(session, 100)
+        hold_id = await reserve(session, user, ttl=-1)
+        await release_expired_holds(session)
+
+        assert await capture_credits(hold_id, session) is True
+        assert user.balance == 70
+
+    assert await balance_of(user) == 70
+
+
+async def test_capture_after_sweep_never_goes_negative(db):
+    async with AsyncSessionLocal() as session:
+        user = await make_user(session, 30)
+        expired = await reserve(session, user, ttl=-1)
+        await release_expired_holds(session)
+        #  The refund is spent on the next generation before the first ends
+        assert await reserve(session, user) is not None
+
+        assert await capture_credits(expired, session) is False
+
+    assert await balance_of(user) == 0
+
+
+async def test_parallel_reserves_never_overdraw(db):
+    async with AsyncSessionLocal() as session:
+        user = await make_user(session, 100)
+
+    async def reserve_once(n: int) -> int | None:
+        #  Distinct purposes so only the balance guard limits the holds
+        async with AsyncSessionLocal() as session:
+            return await reserve(session, user, purpose=f"feature-{n}")
+
+    results = await asyncio.gather(*(reserve_once(n) for n in range(100)))
+
+    assert sum(hold_id is not None for hold_id in results) == 100 // 30
+    assert await balance_of(user) == 100 % 30
@@ -0,0 +1,22 @@
+from core.config import settings
+from services import daily_card_serv
+from services.daily_card_serv import DailyCardPregen
+
+
+async def test_pregen_is_skipped_without_upload_chat(monkeypatch):
+    monkeypatch.setattr(settings, "daily_card_chat_id", None)
+    monkeypatch.setattr(daily_card_serv, "devs", [])
+
+    pregen = DailyCardPregen(ai=None)
+    await pregen.start()
+
+    assert pregen.chat_id is None
+    assert not pregen.is_running
+    assert pregen._task is None
+
+
+async def test_configured_chat_wins_over_devs(monkeypatch):
+    monkeypatch.setattr(settings, "daily_card_chat_id", -100)
+    monkeypatch.setattr(daily_card_serv, "devs", ["42"])
+
+    assert DailyCardPregen(ai=None).chat_id == -100
@@ -0,0 +1,188 @@
+import tracemalloc
+from time import perf_counter
+from types import SimpleNamespace
+
+import pytest
+from aiogram.fsm.state import State, StatesGroup
+from aiogram.fsm.storage.base import StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+from sqlalchemy import func, select
+
+from db.database import AsyncSessionLocal
+from db.models import FsmState
+from services import fsm_storage
+from services.fsm_storage import BoundedMemoryStorage, PostgresStorage, _Record
+
+
+class Form(StatesGroup):
+    name = State()
+
+
+def key(user_id: int = 1) -> StorageKey:
+    return StorageKey(bot_id=42, chat_id=user_id, user_id=user_id)
+
+
+def test_cache_is_bounded_lru():
+    storage = PostgresStorage(cache_size=2)
+    storage._remember("a", _Record("s"))
+    storage._remember("b", _Record("s"))
+    storage._remember("a", _Record("s"))
+    storage._remember("c", _Record("s"))
+
+    assert list(storage._cache) == ["a", "c"]
+
+
+async def test_state_and_data_survive_restart(db):
+    storage = PostgresStorage(flush_interval=60)
+    await storage.set_state(key(), Form.name)
+    await storage.set_data(key(), {"name": "Анна", "counter": 1})
+    #  Unflushed writes are served from memory
+    assert await storage.get_state(key()) == Form.name.state
+    await storage.close()
+
+    restarted = PostgresStorage()
+    assert await restarted.get_state(key()) == Form.name.state
+    assert await restarted.get_data(key()) == {"name": "Анна", "counter": 1}
+    await restarted.close()
+
+
+async def test_get_data_returns_a_copy(db):
+    storage = PostgresStorage(flush_interval=60)
+    await storage.set_data(key(), {"a": 1})
+    data = await storage.get_data(key())
+    data["a"] = 2
+
+    assert await storage.get_data(key()) == {"a": 1}
+    await storage.close()
+
+
+async def test_cleared_state_deletes_row(db):
+    storage = PostgresStorage(flush_interval=60)
+    await storage.set_state(key(), Form.name)
+    await storage.flush()
+
+    await storage.set_state(key(), None)
+    await storage.set_data(key(), {})
+    await storage.flush()
+
+    async with AsyncSessionLocal() as session:
+        rows = await session.scalar(select(func.count(FsmState.id)))
+    assert rows == 0
+    await storage.close()
+
+
+async def test_flush_batches_many_keys(db):
+    storage = PostgresStorage(flush_interval=60)
+    for user_id in range(50):
+        await storage.set_data(key(user_id), {"n": user_id})
+    await storage.close()
+
+    async with AsyncSessionLocal() as session:
+        rows = await session.scalar(select(func.count(FsmState.id)))
+    assert rows == 50
+
+
+async def per_op_seconds(storage, ops: int = 10_000) -> dict[str, float]:
+    keys = [key(user_id) for user_id in range(1000)]
+    for k in keys:
+        await storage.set_data(k, {"name": "Анна"})
+
+    timings = {}
+    for name, op in (
+        ("get_data", lambda k: storage.get_data(k)),
+        ("set_state", lambda k: storage.set_state(k, Form.name)),
+    ):
+        started = perf_counter()
+        for n in range(ops):
+            await op(keys[n % len(keys)])
+        timings[name] = (perf_counter() - started) / ops
+    return timings
+
+
+@pytest.mark.slow
+async def test_cached_latency_is_close_to_memory_storage(db):
+    memory = await per_op_seconds(MemoryStorage())
+    postgres_storage = PostgresStorage(flush_interval=60)
+    postgres = await per_op_seconds(postgres_storage)
+    await postgres_storage.close()
+
+    for op in ("get_data", "set_state"):
+        print(f"{op}: memory {memory[op]:.2e}s, postgres {postgres[op]:.2e}s")
+        #  Cache hits and buffered writes never wait for the database
+        assert postgres[op] < 20 * memory[op] + 50e-6
+
+
+#  ----------- BOUNDED MEMORY -----------
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual monotonic clock for the module under test."""
+    now = SimpleNamespace(value=0.0)
+    monkeypatch.setattr(fsm_storage, "monotonic", lambda: now.value)
+    return now
+
+
+async def test_memory_round_trip():
+    storage = BoundedMemoryStorage()
+    await storage.set_state(key(), Form.name)
+    await storage.set_data(key(), {"a": 1})
+
+    assert await storage.get_state(key()) == Form.name.state
+    assert await storage.get_data(key()) == {"a": 1}
+
+
+async def test_memory_clear_drops_key():
+    storage = BoundedMemoryStorage()
+    await storage.set_state(key(), Form.name)
+    await storage.set_state(key(), None)
+
+    assert storage.stats["entries"] == 0
+
+
+async def test_memory_evicts_least_recently_used():
+    storage = BoundedMemoryStorage(max_entries=2)
+    await storage.set_data(key(1), {"n": 1})
+    await storage.set_data(key(2), {"n": 2})
+    #  Reading key 1 makes key 2 the oldest
+    await storage.get_data(key(1))
+    await storage.set_data(key(3), {"n": 3})
+
+    assert await storage.get_data(key(1)) == {"n": 1}
+    assert await storage.get_data(key(2)) == {}
+    assert storage.stats == {"entries": 2, "evicted_lru": 1, "evicted_ttl": 0}
+
+
+async def test_memory_expires_idle_keys(clock):
+    storage = BoundedMemoryStorage(ttl=10)
+    await storage.set_data(key(1), {"n": 1})
+    clock.value = 5
+    await storage.set_data(key(2), {"n": 2})
+    clock.value = 12
+
+    assert await storage.get_data(key(1)) == {}
+    assert await storage.get_data(key(2)) == {"n": 2}
+    assert storage.stats["evicted_ttl"] == 1
+
+
+@pytest.mark.slow
+async def test_memory_stays_flat_over_a_million_users():
+    cap = 10_000
+    storage = BoundedMemoryStorage(max_entries=cap)
+    tracemalloc.start()
+    try:
+        for user_id in range(1_000_000):
+            await storage.set_state(key(user_id), Form.name)
+            await storage.set_data(key(user_id), {"name": "Анна", "n": user_id})
+            if user_id % 100_000 == 0:
+                assert storage.stats["entries"] <= cap
+            if user_id == 100_000:
+                #  Past warm-up: the cache is full and evicting on every write
+                baseline, _ = tracemalloc.get_traced_memory()
+        current, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    assert storage.stats["entries"] == cap
+    assert storage.stats["evicted_lru"] == 1_000_000 - cap
+    assert current - baseline < 1024 * 1024
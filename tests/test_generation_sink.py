@@ -0,0 +1,91 @@
+import asyncio
+
+from sqlalchemy import func, select
+
+from db.crud import get_daily_stats_totals, upsert_user
+from db.database import AsyncSessionLocal
+from db.models import GenerationHistory
+from services import generation_sink
+from services.generation_sink import GenerationHistorySink
+
+
+def collecting_sink(monkeypatch, **kwargs) -> tuple[GenerationHistorySink, list]:
+    """Sink whose batches are collected in a list instead of written."""
+    sink = GenerationHistorySink(**kwargs)
+    batches = []
+
+    async def write(rows):
+        batches.append(rows)
+
+    monkeypatch.setattr(sink, "_write", write)
+    return sink, batches
+
+
+def row(i: int) -> dict:
+    return {"user_id": 1, "model": "m", "request": {"job": "daily_card", "i": i}}
+
+
+async def test_rows_are_written_in_batches(monkeypatch):
+    sink, batches = collecting_sink(monkeypatch, batch_size=3, flush_interval=10)
+    for i in range(7):
+        await sink.record(**row(i))
+    await sink.stop()
+
+    assert [len(batch) for batch in batches] == [3, 3, 1]
+    assert [r["request"]["i"] for batch in batches for r in batch] == list(range(7))
+
+
+async def test_partial_batch_is_flushed_after_interval(monkeypatch):
+    sink, batches = collecting_sink(monkeypatch, batch_size=100, flush_interval=0.05)
+    await sink.record(**row(0))
+    await asyncio.sleep(0.2)
+
+    assert batches == [[row(0)]]
+    await sink.stop()
+
+
+async def test_stop_flushes_without_waiting_for_interval(monkeypatch):
+    sink, batches = collecting_sink(monkeypatch, batch_size=100, flush_interval=10)
+    await sink.record(**row(0))
+    await sink.record(**row(1))
+
+    await asyncio.wait_for(sink.stop(), timeout=1)
+
+    assert batches == [[row(0), row(1)]]
+    assert not sink.is_running
+
+
+async def test_write_gives_up_without_raising(monkeypatch):
+    def broken_session():
+        raise ConnectionError("database is down")
+
+    monkeypatch.setattr(generation_sink, "AsyncSessionLocal", broken_session)
+    sink = GenerationHistorySink(retries=1)
+
+    await sink._write([row(0)])
+
+
+async def test_flush_writes_history_and_daily_stats(db):
+    async with AsyncSessionLocal() as session:
+        user = await upsert_user(
+            user_id=100, username=None, first_name=None, last_name=None, session=session
+        )
+
+    sink = GenerationHistorySink(flush_interval=0.01)
+    for i in range(3):
+        await sink.record(
+            user_id=user.id,
+            model="m",
+            request={"job": "daily_card", "i": i},
+            cost=1,
+            gen_type="image",
+            gen_status="success",
+        )
+    await sink.stop()
+
+    async with AsyncSessionLocal() as session:
+        count = await session.scalar(select(func.count(GenerationHistory.id)))
+        totals = await get_daily_stats_totals(session)
+    assert count == 3
+    assert totals["generations"] == 3
+    assert totals["generations:daily_card"] == 3
@@ -0,0 +1,145 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from google.genai.errors import ClientError
+
+from core.config import settings
+from services.google_ai import (
+    GoogleAI,
+    GoogleAILimitError,
+    GoogleAIUnavailable,
+    GoogleAIUnsupportedLocation,
+)
+
+
+def make_google_ai(generate_content, list_models=None) -> GoogleAI:
+    models = SimpleNamespace(generate_content=generate_content, list=list_models)
+    return GoogleAI(client=SimpleNamespace(aio=SimpleNamespace(models=models)))
+
+
+def image_response(data: bytes = b"image"):
+    part = SimpleNamespace(inline_data=SimpleNamespace(data=data))
+    return SimpleNamespace(parts=[part])
+
+
+async def test_generate_content_timeout_maps_to_unavailable(monkeypatch):
+    monkeypatch.setattr(settings, "google_ai_timeout", 0.01)
+
+    async def slow(**kwargs):
+        await asyncio.sleep(1)
+
+    google_ai = make_google_ai(slow)
+    with pytest.raises(GoogleAIUnavailable):
+        await google_ai._generate_content(model="m", prompt="p", config=None)
+
+
+async def test_semaphore_limits_concurrent_requests(monkeypatch):
+    monkeypatch.setattr(GoogleAI, "_semaphore", asyncio.Semaphore(2))
+    running = peak = 0
+
+    async def generate(**kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return image_response()
+
+    google_ai = make_google_ai(generate)
+    await asyncio.gather(
+        *(
+            google_ai._generate_content(model="m", prompt="p", config=None)
+            for _ in range(6)
+        )
+    )
+    assert peak == 2
+
+
+async def test_generate_picture_returns_first_image():
+    async def generate(**kwargs):
+        return image_response(b"png-bytes")
+
+    google_ai = make_google_ai(generate)
+    photo = await google_ai.generate_picture(
+        "daily_card", {"main_arcana": 1, "chatGPT_answer": "text"}
+    )
+    assert photo.data == b"png-bytes"
+
+
+@pytest.mark.parametrize(
+    "code, expected",
+    [
+        (400, GoogleAIUnsupportedLocation),
+        (429, GoogleAILimitError),
+        (503, GoogleAIUnavailable),
+    ],
+)
+async def test_client_errors_are_mapped(code, expected):
+    async def generate(**kwargs):
+        error = {"code": code, "message": "m", "status": "S"}
+        raise ClientError(code, {"error": error})
+
+    google_ai = make_google_ai(generate)
+    with pytest.raises(expected):
+        await google_ai.generate_picture(
+            "daily_card", {"main_arcana": 1, "chatGPT_answer": "text"}
+        )
+
+
+async def test_google_models_collects_names():
+    async def pager():
+        for name in ("models/a", "models/b"):
+            yield SimpleNamespace(name=name)
+
+    async def list_models():
+        return pager()
+
+    google_ai = make_google_ai(None, list_models)
+    assert await google_ai.google_models() == ["models/a", "models/b"]
+
+
+async def test_event_loop_stays_responsive_while_generating():
+    release = asyncio.Event()
+    ticks = 0
+
+    async def generate(**kwargs):
+        await release.wait()
+        return image_response()
+
+    async def other_user():
+        nonlocal ticks
+        for _ in range(10):
+            ticks += 1
+            await asyncio.sleep(0)
+        release.set()
+
+    google_ai = make_google_ai(generate)
+    photo, _ = await asyncio.gather(
+        google_ai.generate_picture(
+            "daily_card", {"main_arcana": 1, "chatGPT_answer": "text"}
+        ),
+        other_user(),
+    )
+    #  The other coroutine ran to completion while Gemini was pending
+    assert ticks == 10
+    assert photo.data == b"image"
+
+
+async def test_retries_share_one_deadline(monkeypatch):
+    monkeypatch.setattr(settings, "google_ai_timeout", 1)
+    monkeypatch.setattr(settings, "google_ai_deadline", 0.05)
+    calls = 0
+
+    async def empty(**kwargs):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.02)
+        return SimpleNamespace(parts=None)
+
+    google_ai = make_google_ai(empty)
+    with pytest.raises(GoogleAIUnavailable):
+        await google_ai.generate_picture(
+            "daily_card", {"main_arcana": 1, "chatGPT_answer": "text"}
+        )
+    assert calls < 5
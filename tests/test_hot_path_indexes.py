@@ -0,0 +1,76 @@
+import json
+
+import pytest
+from sqlalchemy import text
+
+from db.database import AsyncSessionLocal
+
+#  Hot-path queries of revision c3a8e6f14b72 and the index each must use
+QUERIES = {
+    "ix_payments_pending_next_check_at": """
+        SELECT * FROM payments
+        WHERE status = 'pending' AND next_check_at <= now()
+        ORDER BY next_check_at LIMIT 100
+    """,
+    "ix_users_last_updated": """
+        SELECT count(*) FROM users WHERE last_updated >= now() - interval '1 day'
+    """,
+    "ix_payments_user_id": "SELECT * FROM payments WHERE user_id = 42",
+    "ix_generation_history_user_id": (
+        "SELECT * FROM generation_history WHERE user_id = 42"
+    ),
+    "ix_users_referred_id": "SELECT * FROM users WHERE referred_id = 42",
+}
+
+SEED = [
+    """
+    INSERT INTO users (user_id, balance, segment, referred_id, last_updated)
+    SELECT g, 0, 'lead', NULL, now() - g * interval '1 minute'
+    FROM generate_series(1, 2000) AS g
+    """,
+    "UPDATE users SET referred_id = 1 + id % 100 WHERE id > 100",
+    """
+    INSERT INTO payments (user_id, payment_id, amount, rub_amount, status)
+    SELECT 1 + g % 2000, 'yk-' || g, 10, 100,
+        CASE WHEN g % 100 = 0 THEN 'pending' ELSE 'completed' END
+            ::payment_status_enum
+    FROM generate_series(1, 5000) AS g
+    """,
+    """
+    INSERT INTO generation_history
+        (user_id, model, request, cost, gen_status, gen_type)
+    SELECT 1 + g % 2000, 'm', '{}', 10, 'success', 'text'
+    FROM generate_series(1, 5000) AS g
+    """,
+    "ANALYZE users, payments, generation_history",
+]
+
+
+def index_scans(plan: dict):
+    """(node type, index name) of every node in an EXPLAIN (FORMAT JSON) plan."""
+    yield plan["Node Type"], plan.get("Index Name")
+    for child in plan.get("Plans", []):
+        yield from index_scans(child)
+
+
+@pytest.fixture
+async def seeded(db):
+    async with AsyncSessionLocal() as session:
+        for statement in SEED:
+            await session.execute(text(statement))
+        await session.commit()
+
+
+@pytest.mark.parametrize("index, query", QUERIES.items(), ids=list(QUERIES))
+async def test_hot_path_query_uses_index(seeded, index, query):
+    async with AsyncSessionLocal() as session:
+        #  Test tables are small enough for a seq scan to win on cost; with it
+        #  disabled the planner still falls back to one if no index matches
+        await session.execute(text("SET LOCAL enable_seqscan = off"))
+        await session.execute(text("SET LOCAL enable_bitmapscan = off"))
+        explain = await session.scalar(text(f"EXPLAIN (FORMAT JSON) {query}"))
+
+    if isinstance(explain, str):
+        explain = json.loads(explain)
+    scans = set(index_scans(explain[0]["Plan"]))
+    assert {("Index Scan", index), ("Index Only Scan", index)} & scans, scans
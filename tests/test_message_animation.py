@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramRetryAfter
+
+from services import message_animation
+from services.message_animation import AnimationTicker, MessageAnimation
+
+
+class FakeMessage:
+    """Animation message that records edits instead of calling Telegram."""
+
+    def __init__(self, edit_errors=()):
+        self.edits: list[str] = []
+        self._edit_errors = list(edit_errors)
+
+    async def edit_text(self, text):
+        self.edits.append(text)
+        if self._edit_errors:
+            raise self._edit_errors.pop(0)
+
+
+@pytest.fixture
+def ticker(monkeypatch):
+    """Ticker driven by hand through _run_due(now) instead of its loop."""
+    ticker = AnimationTicker(edits_per_second=20)
+    ticker._last_refill = 0.0
+    monkeypatch.setattr(message_animation, "get_ticker", lambda: ticker)
+    return ticker
+
+
+def running_animation(ticker, chat_id: int = 1, **kwargs) -> MessageAnimation:
+    call = SimpleNamespace(from_user=SimpleNamespace(id=chat_id))
+    animation = MessageAnimation(call, "Жду", **kwargs)
+    animation.stopped = False
+    animation.message = FakeMessage()
+    #  Bypass register(): it would start the real loop
+    ticker._animations.add(animation)
+    return animation
+
+
+async def run_due(ticker, now: float) -> None:
+    ticker._run_due(now)
+    await asyncio.gather(*ticker._pending)
+
+
+async def test_one_chat_gets_at_most_one_edit_per_interval(ticker):
+    first = running_animation(ticker, interval=0.1)
+    second = running_animation(ticker, interval=0.1)
+    other_chat = running_animation(ticker, chat_id=2, interval=0.1)
+
+    await run_due(ticker, 0.0)
+    edits = len(first.message.edits) + len(second.message.edits)
+    assert edits == 1
+    assert len(other_chat.message.edits) == 1
+
+    await run_due(ticker, 0.5)
+    assert len(first.message.edits) + len(second.message.edits) == 1
+
+    await run_due(ticker, 1.0)
+    assert len(first.message.edits) + len(second.message.edits) == 2
+
+
+async def test_frame_interval_grows_with_active_animations(ticker):
+    ticker.rate = 2
+    animations = [running_animation(ticker, chat_id=n) for n in range(4)]
+
+    #  4 animations share 2 edits/s: each one gets a frame every 2 s
+    assert ticker.frame_interval(animations[0]) == 2
+    ticker._animations.clear()
+    solo = running_animation(ticker)
+    assert ticker.frame_interval(solo) == solo.interval
+
+
+async def test_retry_after_halves_rate_and_delays_animation(ticker, monkeypatch):
+    monkeypatch.setattr(message_animation, "monotonic", lambda: 100.0)
+    flood = TelegramRetryAfter(
+        method=SimpleNamespace(), message="Too Many Requests", retry_after=5
+    )
+    animation = running_animation(ticker)
+    animation.message = FakeMessage(edit_errors=[flood])
+
+    animation.begin_frame()
+    await animation.render()
+
+    assert ticker.rate == 10
+    assert animation.next_frame_at == 105.0
+    assert not animation.busy
+
+
+async def test_rate_recovers_after_quiet_period(ticker):
+    ticker.rate = 5
+    ticker._last_refill = 0.0
+
+    ticker._refill(3.0)
+    assert ticker.rate == 8
+    ticker._refill(100.0)
+    assert ticker.rate == ticker.max_rate
+
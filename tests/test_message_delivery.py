@@ -0,0 +1,207 @@
+from types import SimpleNamespace
+
+import pytest
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+from schemas import GENERATION_ERROR_ANSWER
+from services import message_delivery
+from services.message_delivery import (
+    CAPTION_LIMIT,
+    MESSAGE_LIMIT,
+    StreamingReply,
+    answer_long,
+    answer_photo_with_caption,
+    split_text,
+)
+
+
+class FakeMessage:
+    """Bot message that records edits and answers instead of calling Telegram."""
+
+    def __init__(self, edit_errors=()):
+        self.edits: list[tuple[str, dict]] = []
+        self.answers: list[tuple[str, dict]] = []
+        self.photos: list[dict] = []
+        self.deleted = False
+        self._edit_errors = list(edit_errors)
+
+    async def edit_text(self, text, **kwargs):
+        self.edits.append((text, kwargs))
+        if self._edit_errors:
+            error = self._edit_errors.pop(0)
+            if error is not None:
+                raise error
+
+    async def answer(self, text, **kwargs):
+        self.answers.append((text, kwargs))
+        return SimpleNamespace(text=text)
+
+    async def answer_photo(self, **kwargs):
+        self.photos.append(kwargs)
+        return SimpleNamespace(photo=kwargs["photo"])
+
+    async def delete(self):
+        self.deleted = True
+
+
+#  ----------- SPLITTING -----------
+
+
+def test_short_text_is_not_split():
+    assert split_text("hello") == ["hello"]
+
+
+def test_paragraphs_are_packed_up_to_limit():
+    text = "\n\n".join(["a" * 6, "b" * 6, "c" * 6])
+    assert split_text(text, limit=14) == ["aaaaaa\n\nbbbbbb", "cccccc"]
+
+
+def test_long_paragraph_falls_back_to_lines():
+    assert split_text("aaa bbb\nccc ddd", limit=7) == ["aaa bbb", "ccc ddd"]
+
+
+def test_hard_split_does_not_break_html_entities():
+    assert split_text("a" * 8 + "&amp;b", limit=10) == ["a" * 8, "&amp;b"]
+
+
+def test_chunks_fit_limit_and_keep_all_words():
+    text = " ".join(f"word{i}" for i in range(3000))
+    chunks = split_text(text)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= MESSAGE_LIMIT for chunk in chunks)
+    assert " ".join(chunks) == text
+
+
+async def test_answer_long_attaches_markup_to_last_message():
+    message = FakeMessage()
+    text = "a" * 3000 + "\n\n" + "b" * 3000
+
+    sent = await answer_long(message, text, reply_markup="kbd")
+
+    assert message.answers == [
+        ("a" * 3000, {"reply_markup": None}),
+        ("b" * 3000, {"reply_markup": "kbd"}),
+    ]
+    assert sent.text == "b" * 3000
+
+
+async def test_short_caption_stays_on_photo():
+    message = FakeMessage()
+
+    await answer_photo_with_caption(message, "photo", "caption", reply_markup="kbd")
+
+    assert message.photos == [
+        {"photo": "photo", "caption": "caption", "reply_markup": "kbd"}
+    ]
+    assert message.answers == []
+
+
+async def test_long_caption_is_sent_after_photo():
+    message = FakeMessage()
+    caption = "c" * (CAPTION_LIMIT + 1)
+
+    sent = await answer_photo_with_caption(
+        message, "photo", caption, reply_markup="kbd"
+    )
+
+    assert sent.photo == "photo"
+    assert message.photos == [{"photo": "photo"}]
+    assert message.answers == [(caption, {"reply_markup": "kbd"})]
+
+
+#  ----------- STREAMING -----------
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual monotonic clock for the module under test."""
+    now = SimpleNamespace(value=0.0)
+    monkeypatch.setattr(message_delivery, "monotonic", lambda: now.value)
+    return now
+
+
+def ticking(clock, *steps: tuple[float, str]):
+    """Yields each chunk after moving the clock to its timestamp."""
+
+    async def chunks():
+        for at, chunk in steps:
+            clock.value = at
+            yield chunk
+
+    return chunks()
+
+
+async def test_previews_are_throttled_to_interval(clock):
+    message = FakeMessage()
+    reply = StreamingReply(message, interval=1.5)
+
+    answer = await reply.run(
+        ticking(clock, (0.0, "a"), (0.5, "b"), (1.0, "c"), (1.6, "d"), (2.0, "e"))
+    )
+
+    previews = [text for text, kwargs in message.edits if "parse_mode" in kwargs]
+    assert previews == ["a ▌", "abcd ▌"]
+    assert message.edits[-1] == ("abcde", {})
+    assert answer == "abcde"
+
+
+async def test_retry_after_postpones_next_preview(clock):
+    flood = TelegramRetryAfter(
+        method=SimpleNamespace(), message="Too Many Requests", retry_after=5
+    )
+    message = FakeMessage(edit_errors=[flood])
+    reply = StreamingReply(message, interval=1.5)
+
+    await reply.run(ticking(clock, (0.0, "a"), (2.0, "b"), (5.5, "c")))
+
+    previews = [text for text, kwargs in message.edits if "parse_mode" in kwargs]
+    assert previews == ["a ▌", "abc ▌"]
+
+
+async def test_whitespace_only_chunks_are_not_previewed(clock):
+    message = FakeMessage()
+
+    await StreamingReply(message).run(ticking(clock, (0.0, "  "), (0.1, "a")))
+
+    assert message.edits[0] == ("  a ▌", {"parse_mode": None})
+
+
+async def test_final_answer_is_escaped_and_split(clock):
+    message = FakeMessage()
+    paragraph = "x" * (MESSAGE_LIMIT - 10)
+
+    answer = await StreamingReply(message).run(
+        ticking(clock, (0.0, "<b>"), (0.1, f"\n\n{paragraph}"))
+    )
+
+    assert answer.startswith("&lt;b&gt;")
+    assert message.edits[-1] == ("&lt;b&gt;", {})
+    assert message.answers == [(paragraph, {})]
+
+
+async def test_final_edit_ignores_not_modified(clock):
+    not_modified = TelegramBadRequest(
+        method=SimpleNamespace(), message="Bad Request: message is not modified"
+    )
+    message = FakeMessage(edit_errors=[None, not_modified])
+
+    assert await StreamingReply(message).run(ticking(clock, (0.0, "a"))) == "a"
+
+
+async def test_empty_stream_shows_error_answer(clock):
+    message = FakeMessage()
+
+    assert await StreamingReply(message).run(ticking(clock)) == ""
+    assert message.edits == [(GENERATION_ERROR_ANSWER, {})]
+
+
+async def test_failed_stream_deletes_placeholder(clock):
+    message = FakeMessage()
+
+    async def broken():
+        yield "a"
+        raise RuntimeError("stream broke")
+
+    with pytest.raises(RuntimeError):
+        await StreamingReply(message).run(broken())
+    assert message.deleted
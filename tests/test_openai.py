@@ -0,0 +1,62 @@
+from types import SimpleNamespace
+
+import pytest
+
+from core.config import settings
+from services.openai import OpenAIClient, OpenAIIncompleteResponse, length_limits
+
+
+def make_client(*responses) -> tuple[OpenAIClient, list[dict]]:
+    calls = []
+    responses = iter(responses)
+
+    async def create(**kwargs):
+        calls.append(kwargs)
+        return next(responses)
+
+    client = OpenAIClient(
+        client=SimpleNamespace(responses=SimpleNamespace(create=create))
+    )
+    client._build_prompt = lambda feature, context: "prompt"
+    return client, calls
+
+
+def response(status: str = "completed", text: str = "ответ", reason=None):
+    return SimpleNamespace(
+        status=status,
+        output_text=text,
+        incomplete_details=SimpleNamespace(reason=reason),
+    )
+
+
+async def test_incomplete_response_is_not_retried():
+    client, calls = make_client(
+        response("incomplete", reason="max_output_tokens"), response()
+    )
+
+    with pytest.raises(OpenAIIncompleteResponse, match="max_output_tokens"):
+        await client.chatgpt_response("first", {}, max_length=100)
+    assert len(calls) == 1
+
+
+async def test_response_text_is_escaped():
+    client, calls = make_client(response(text="<b>"))
+
+    answer, conversation_id = await client.chatgpt_response("first", {})
+    assert answer == "&lt;b&gt;"
+    assert conversation_id is None
+
+
+def test_reasoning_budget_and_effort_come_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "openai_reasoning_tokens", 100)
+    monkeypatch.setattr(settings, "openai_reasoning_effort", "low")
+
+    limits = length_limits(200)
+    assert limits["max_output_tokens"] == 200
+    assert limits["reasoning"] == {"effort": "low"}
+
+
+def test_reasoning_effort_is_omitted_by_default(monkeypatch):
+    monkeypatch.setattr(settings, "openai_reasoning_effort", None)
+
+    assert "reasoning" not in length_limits(200)
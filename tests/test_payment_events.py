@@ -0,0 +1,77 @@
+from datetime import timedelta
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+
+from db.crud import (
+    add_payment_event,
+    claim_payment_events,
+    create_payment,
+    update_payment_status,
+    upsert_user,
+)
+from db.database import AsyncSessionLocal
+from db.models import Payment, PaymentEvent, User
+from services import payment_events, topup_routine
+from services.payment_events import PaymentEventConsumer
+from services.payment_status import PAYMENT_STATUSES
+
+
+async def test_payment_expired_locally_then_succeeded_is_settled(db, monkeypatch):
+    sent = []
+
+    async def send_message(**kwargs):
+        sent.append(kwargs)
+
+    bot = SimpleNamespace(send_message=send_message)
+    monkeypatch.setattr(topup_routine, "bot", bot)
+    async with AsyncSessionLocal() as session:
+        user = await upsert_user(
+            user_id=100, username=None, first_name=None, last_name=None, session=session
+        )
+        await create_payment(
+            user_id=user.id,
+            payment_id="late",
+            amount=10,
+            rub_amount=100,
+            status="pending",
+            session=session,
+        )
+        #  The poller gave up on it by TTL
+        await update_payment_status(
+            payment_id="late", status="canceled", session=session
+        )
+        await add_payment_event(
+            payment_id="late", status="succeeded", payload={}, session=session
+        )
+        [event] = await claim_payment_events(session, lease=timedelta(minutes=1))
+
+    await PaymentEventConsumer()._handle(event)
+
+    async with AsyncSessionLocal() as session:
+        status = await session.scalar(
+            select(Payment.status).where(Payment.payment_id == "late")
+        )
+        balance = await session.scalar(select(User.balance).where(User.id == user.id))
+        processed_at = await session.scalar(
+            select(PaymentEvent.processed_at).where(PaymentEvent.id == event.id)
+        )
+    assert status == "completed"
+    assert balance == 10
+    assert processed_at is not None
+    assert len(sent) == 1
+    assert PAYMENT_STATUSES.cached("late") == "succeeded"
+
+
+async def test_cache_is_not_updated_when_handling_fails(monkeypatch):
+    async def broken_lookup(payment_id, session):
+        raise RuntimeError("database hiccup")
+
+    monkeypatch.setattr(payment_events, "get_payment_by_payment_id", broken_lookup)
+    event = SimpleNamespace(id=1, payment_id="unseen", status="succeeded")
+
+    with pytest.raises(RuntimeError):
+        await PaymentEventConsumer()._handle(event)
+
+    assert PAYMENT_STATUSES.cached("unseen") is None
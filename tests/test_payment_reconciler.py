@@ -0,0 +1,139 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import httpx
+from sqlalchemy import select
+
+from db.crud import create_payment, update_payment_status, upsert_user
+from db.database import AsyncSessionLocal
+from db.models import Payment, User
+from services import payment_reconciler, topup_routine
+from services.payment_reconciler import PaymentReconciler
+from services.yk_client import YKPaymentInfo, YooKassaClient
+
+NOW = datetime(2026, 10, 18, 12, tzinfo=timezone.utc)
+
+
+async def test_list_payments_follows_next_cursor():
+    pages = {
+        None: {"items": [{"id": "a", "status": "succeeded"}], "next_cursor": "c2"},
+        "c2": {"items": [{"id": "b", "status": "canceled"}]},
+    }
+    requests = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.params)
+        return httpx.Response(200, json=pages[request.url.params.get("cursor")])
+
+    yk = YooKassaClient(base_url="https://yk.test/v3/")
+    await yk._client.aclose()
+    yk._client = httpx.AsyncClient(
+        base_url="https://yk.test/v3/", transport=httpx.MockTransport(handler)
+    )
+
+    payments = [
+        payment
+        async for payment in yk.list_payments(
+            created_gte=NOW.replace(hour=0), created_lt=NOW, page_size=1
+        )
+    ]
+    await yk.close()
+
+    assert [(p.id, p.status) for p in payments] == [
+        ("a", "succeeded"),
+        ("b", "canceled"),
+    ]
+    assert len(requests) == 2
+    assert requests[1]["cursor"] == "c2"
+    assert requests[1]["created_at.lt"] == requests[0]["created_at.lt"]
+    assert requests[0]["limit"] == "1"
+
+
+def fake_yk(*statuses: tuple[str, str]):
+    async def list_payments(**kwargs):
+        for payment_id, status in statuses:
+            yield YKPaymentInfo(id=payment_id, status=status)
+
+    return SimpleNamespace(list_payments=list_payments)
+
+
+async def make_pending_payments(*payment_ids: str) -> User:
+    async with AsyncSessionLocal() as session:
+        user = await upsert_user(
+            user_id=100, username=None, first_name=None, last_name=None, session=session
+        )
+        for payment_id in payment_ids:
+            await create_payment(
+                user_id=user.id,
+                payment_id=payment_id,
+                amount=10,
+                rub_amount=100,
+                status="pending",
+                session=session,
+            )
+    return user
+
+
+async def statuses() -> dict[str, str]:
+    async with AsyncSessionLocal() as session:
+        rows = await session.execute(select(Payment.payment_id, Payment.status))
+        return dict(rows.all())
+
+
+async def test_reconcile_settles_succeeded_and_cancels_canceled(db, monkeypatch):
+    async def send_message(**kwargs):
+        pass
+
+    bot = SimpleNamespace(send_message=send_message)
+    monkeypatch.setattr(topup_routine, "bot", bot)
+    user = await make_pending_payments("paid", "dropped", "waiting")
+    yk = fake_yk(
+        ("paid", "succeeded"),
+        ("dropped", "canceled"),
+        ("waiting", "pending"),
+        ("unknown", "succeeded"),
+    )
+
+    assert await PaymentReconciler(yk).reconcile(NOW) == (1, 1)
+    assert await statuses() == {
+        "paid": "completed",
+        "dropped": "canceled",
+        "waiting": "pending",
+    }
+    async with AsyncSessionLocal() as session:
+        balance = await session.scalar(select(User.balance).where(User.id == user.id))
+    assert balance == 10
+
+
+async def test_failed_payment_does_not_roll_back_others(db, monkeypatch):
+    update_payment_status = payment_reconciler.update_payment_status
+
+    async def flaky_update(*, payment_id, **kwargs):
+        if payment_id == "broken":
+            raise RuntimeError("database hiccup")
+        return await update_payment_status(payment_id=payment_id, **kwargs)
+
+    monkeypatch.setattr(payment_reconciler, "update_payment_status", flaky_update)
+    await make_pending_payments("broken", "dropped")
+    yk = fake_yk(("broken", "canceled"), ("dropped", "canceled"))
+
+    assert await PaymentReconciler(yk).reconcile(NOW) == (0, 1)
+    assert await statuses() == {"broken": "pending", "dropped": "canceled"}
+
+
+async def test_reconcile_settles_payment_canceled_locally(db, monkeypatch):
+    async def send_message(**kwargs):
+        pass
+
+    bot = SimpleNamespace(send_message=send_message)
+    monkeypatch.setattr(topup_routine, "bot", bot)
+    await make_pending_payments("late", "gone")
+    async with AsyncSessionLocal() as session:
+        for payment_id in ("late", "gone"):
+            await update_payment_status(
+                payment_id=payment_id, status="canceled", session=session
+            )
+    yk = fake_yk(("late", "succeeded"), ("gone", "canceled"))
+
+    assert await PaymentReconciler(yk).reconcile(NOW) == (1, 0)
+    assert await statuses() == {"late": "completed", "gone": "canceled"}
@@ -0,0 +1,89 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services import payment_status
+from services.payment_status import PaymentStatusCache
+from services.yk_client import YKPaymentInfo, YooKassaError
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual monotonic clock for the module under test."""
+    now = SimpleNamespace(value=0.0)
+    monkeypatch.setattr(payment_status, "monotonic", lambda: now.value)
+    return now
+
+
+def fake_yk(status: str = "pending", error: Exception | None = None):
+    calls = []
+
+    async def get_payment(payment_id):
+        calls.append(payment_id)
+        #  Keep the request in flight long enough for others to join it
+        await asyncio.sleep(0.01)
+        if error is not None:
+            raise error
+        return YKPaymentInfo(id=payment_id, status=status)
+
+    return SimpleNamespace(get_payment=get_payment, calls=calls)
+
+
+def test_least_recently_set_entry_is_evicted(clock):
+    cache = PaymentStatusCache(max_entries=2)
+    cache.set("a", "succeeded")
+    cache.set("b", "succeeded")
+    cache.set("a", "succeeded")
+    cache.set("c", "succeeded")
+
+    assert cache.cached("a") == "succeeded"
+    assert cache.cached("b") is None
+    assert cache.cached("c") == "succeeded"
+
+
+def test_pending_status_expires_after_negative_ttl(clock):
+    cache = PaymentStatusCache(negative_ttl=10)
+    cache.set("open", "pending")
+    cache.set("paid", "succeeded")
+    clock.value = 9
+    assert cache.cached("open") == "pending"
+
+    clock.value = 10
+    assert cache.cached("open") is None
+    #  Final statuses never go stale
+    assert cache.cached("paid") == "succeeded"
+
+
+async def test_concurrent_gets_share_one_request(clock):
+    cache = PaymentStatusCache()
+    yk = fake_yk("succeeded")
+
+    statuses = await asyncio.gather(*(cache.get("p", yk) for _ in range(10)))
+
+    assert statuses == ["succeeded"] * 10
+    assert yk.calls == ["p"]
+    assert cache._inflight == {}
+
+
+async def test_cancelled_waiter_does_not_cancel_shared_request(clock):
+    cache = PaymentStatusCache()
+    yk = fake_yk("succeeded")
+
+    impatient = asyncio.create_task(cache.get("p", yk))
+    patient = asyncio.create_task(cache.get("p", yk))
+    await asyncio.sleep(0)
+    impatient.cancel()
+
+    assert await patient == "succeeded"
+    assert yk.calls == ["p"]
+    assert cache.cached("p") == "succeeded"
+
+
+async def test_api_error_returns_none_and_is_not_cached(clock):
+    cache = PaymentStatusCache()
+    yk = fake_yk(error=YooKassaError("GET payments/p: timed out"))
+
+    assert await cache.get("p", yk) is None
+    assert cache.cached("p") is None
+    assert cache._inflight == {}
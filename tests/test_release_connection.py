@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from core.config import settings
+from db.crud import upsert_user
+from db.database import AsyncSessionLocal, release_connection
+from db.models import User
+
+GENERATIONS = 200
+POOL_SIZE = 10
+
+
+@pytest.fixture
+async def small_pool(db):
+    """Session factory over a 10-connection pool that fails fast when empty."""
+    engine = create_async_engine(
+        settings.database_url, pool_size=POOL_SIZE, max_overflow=0, pool_timeout=1
+    )
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def slow_provider() -> str:
+    """Stands in for OpenAI / Gemini: long enough to exhaust a held pool."""
+    await asyncio.sleep(0.5)
+    return "answer"
+
+
+async def generation(sessions, *, release: bool) -> str:
+    #  Same shape as the handlers: read the user, wait for the provider,
+    #  then touch the database again with the result
+    async with sessions() as session:
+        await session.scalar(select(User).where(User.user_id == 1))
+        if release:
+            await release_connection(session)
+        answer = await slow_provider()
+        await session.scalar(select(User.balance).where(User.user_id == 1))
+        await session.commit()
+        return answer
+
+
+async def seed_user() -> None:
+    async with AsyncSessionLocal() as session:
+        await upsert_user(
+            user_id=1, username=None, first_name=None, last_name=None, session=session
+        )
+
+
+async def test_released_sessions_share_a_small_pool(small_pool):
+    await seed_user()
+
+    results = await asyncio.gather(
+        *(generation(small_pool, release=True) for _ in range(GENERATIONS))
+    )
+
+    assert results == ["answer"] * GENERATIONS
+
+
+async def test_held_sessions_exhaust_the_pool(small_pool):
+    #  Control: without release_connection the same load runs out of connections
+    await seed_user()
+
+    results = await asyncio.gather(
+        *(generation(small_pool, release=False) for _ in range(GENERATIONS)),
+        return_exceptions=True,
+    )
+
+    assert any(isinstance(result, PoolTimeoutError) for result in results)
@@ -0,0 +1,46 @@
+from sqlalchemy import select
+
+from db.crud import create_payment, settle_payment, upsert_user
+from db.database import AsyncSessionLocal
+from db.models import User
+
+
+async def test_settle_credits_user_and_fractional_referral_bonus(db):
+    async with AsyncSessionLocal() as session:
+        referrer = await upsert_user(
+            user_id=1, username=None, first_name=None, last_name=None, session=session
+        )
+        user = await upsert_user(
+            user_id=2,
+            username=None,
+            first_name=None,
+            last_name=None,
+            referred_id=referrer.id,
+            session=session,
+        )
+        await create_payment(
+            user_id=user.id,
+            payment_id="yk-1",
+            amount=55,
+            rub_amount=550,
+            status="pending",
+            session=session,
+        )
+
+        settled = await settle_payment(
+            payment_id="yk-1", bonus_percent=0.1, session=session
+        )
+        assert settled.balance == 55
+        assert settled.bonus_amount == 6
+        assert settled.referrer_id == referrer.id
+
+        again = await settle_payment(
+            payment_id="yk-1", bonus_percent=0.1, session=session
+        )
+        assert again is None
+
+    async with AsyncSessionLocal() as session:
+        balances = dict(
+            (await session.execute(select(User.user_id, User.balance))).all()
+        )
+    assert balances == {1: 6, 2: 55}
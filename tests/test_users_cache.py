@@ -0,0 +1,122 @@
+from types import SimpleNamespace
+
+from sqlalchemy import event
+
+from db.crud import (
+    cache_user,
+    change_user_balance,
+    decrease_user_balance,
+    get_user_balance,
+    get_user_by_telegram_id,
+    upsert_user,
+)
+from db.crud.users_crud import _sync_balance
+from db.database import AsyncSessionLocal, engine
+from db.models import User
+from middlewares import DatabaseMiddleware, UserMiddleware
+from routers.lk_hand import lk_handler
+
+
+class NoQuerySession:
+    """Session stand-in that fails the test if a query is issued."""
+
+    def __init__(self):
+        self.info = {}
+
+    async def execute(self, *args, **kwargs):
+        raise AssertionError("cached lookup must not query the database")
+
+
+async def test_cached_user_is_returned_without_query():
+    session = NoQuerySession()
+    user = User(id=1, user_id=100, balance=7)
+    cache_user(user, session)
+
+    assert await get_user_by_telegram_id(100, session) is user
+    assert await get_user_balance(100, session) == 7
+
+
+def test_cache_user_none_clears_cache():
+    session = SimpleNamespace(info={})
+    cache_user(User(id=1, user_id=100), session)
+    cache_user(None, session)
+
+    assert "user" not in session.info
+
+
+def test_sync_balance_only_touches_matching_user():
+    session = SimpleNamespace(info={})
+    user = User(id=1, user_id=100, balance=7)
+    cache_user(user, session)
+
+    _sync_balance(2, 50, session)
+    _sync_balance(1, None, session)
+    assert user.balance == 7
+
+    _sync_balance(1, 50, session)
+    assert user.balance == 50
+
+
+async def upsert(session) -> User:
+    return await upsert_user(
+        user_id=100,
+        username="tester",
+        first_name=None,
+        last_name=None,
+        session=session,
+    )
+
+
+async def test_balance_changes_update_cached_user(db):
+    async with AsyncSessionLocal() as session:
+        user = await upsert(session)
+        assert session.info["user"] is user
+
+        await change_user_balance(user.id, 30, session)
+        assert user.balance == 30
+        assert await get_user_balance(100, session) == 30
+
+        await decrease_user_balance(user.id, 10, session)
+        assert user.balance == 20
+
+
+async def test_rejected_withdrawal_keeps_cached_balance(db):
+    async with AsyncSessionLocal() as session:
+        user = await upsert(session)
+        await change_user_balance(user.id, 5, session)
+
+        assert await decrease_user_balance(user.id, 10, session) is None
+        assert user.balance == 5
+
+
+async def test_update_reads_user_once(db):
+    async with AsyncSessionLocal() as session:
+        user = await upsert(session)
+        user.name = "Анна"
+        await session.commit()
+
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    async def handler(update, data):
+        await lk_handler(update, data["db_session"])
+
+    async def with_user(update, data):
+        return await UserMiddleware()(handler, update, data)
+
+    #  Not a Message: lk_handler reads the user and returns without replying
+    update = SimpleNamespace(from_user=SimpleNamespace(id=100))
+    event.listen(engine.sync_engine, "before_cursor_execute", count)
+    try:
+        await DatabaseMiddleware()(
+            with_user, update, {"event_from_user": update.from_user}
+        )
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", count)
+
+    user_selects = [
+        s for s in statements if s.lstrip().startswith("SELECT") and "FROM users" in s
+    ]
+    assert len(user_selects) == 1, statements
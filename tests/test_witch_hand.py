@@ -0,0 +1,203 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from routers import witch_hand
+from schemas import GENERATION_ERROR_ANSWER, PARTIAL_IMAGE_ANSWER, PARTIAL_TEXT_ANSWER
+from services.google_ai import GoogleAIUnavailable
+from services.openai import OpenAIIncompleteResponse
+
+FSM_DATA = {"name": "Анна", "sex": "f", "birthday": "17.04.1990"}
+
+
+class FakeState:
+    def __init__(self):
+        self.data = dict(FSM_DATA)
+        self.state = None
+
+    async def get_data(self):
+        return dict(self.data)
+
+    async def clear(self):
+        self.data = {}
+
+    async def set_state(self, state):
+        self.state = state
+
+    async def update_data(self, **kwargs):
+        self.data.update(kwargs)
+
+
+class FakeAnimation:
+    def __init__(self, **kwargs):
+        pass
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+
+@pytest.fixture
+def sent(monkeypatch):
+    """Patch the handler's collaborators and collect what the user receives."""
+    sent = SimpleNamespace(texts=[], photos=[], errors=[], generations=[])
+    user = SimpleNamespace(id=1, name="Анна", birthday="17.04.1990", sex="f")
+
+    async def get_user(user_id, session):
+        return user
+
+    async def noop(*args, **kwargs):
+        pass
+
+    async def answer_long(message, text, **kwargs):
+        sent.texts.append(text)
+
+    async def answer_photo_with_caption(message, *, photo, caption, **kwargs):
+        sent.photos.append(photo)
+        sent.texts.append(caption)
+
+    async def handle_error(*, error, upd, job, user_answer):
+        sent.errors.append(type(error))
+        sent.texts.append(user_answer)
+
+    async def record(**kwargs):
+        sent.generations.append(kwargs)
+
+    monkeypatch.setattr(witch_hand, "MessageAnimation", FakeAnimation)
+    monkeypatch.setattr(witch_hand, "get_user_by_telegram_id", get_user)
+    monkeypatch.setattr(witch_hand, "release_connection", noop)
+    monkeypatch.setattr(witch_hand, "update_user_info", noop)
+    monkeypatch.setattr(witch_hand, "answer_long", answer_long)
+    monkeypatch.setattr(
+        witch_hand, "answer_photo_with_caption", answer_photo_with_caption
+    )
+    monkeypatch.setattr(witch_hand, "handle_google_ai_error", handle_error)
+    monkeypatch.setattr(witch_hand, "handle_openai_error", handle_error)
+    monkeypatch.setattr(witch_hand, "GENERATIONS", SimpleNamespace(record=record))
+    return sent
+
+
+def make_call(sent):
+    async def answer(text=None, **kwargs):
+        if text is not None:
+            sent.texts.append(text)
+
+    async def answer_photo(photo, **kwargs):
+        sent.photos.append(photo)
+
+    message = SimpleNamespace(answer=answer, answer_photo=answer_photo)
+    return SimpleNamespace(
+        answer=answer, message=message, from_user=SimpleNamespace(id=100)
+    )
+
+
+def make_ai(picture, text):
+    return SimpleNamespace(
+        google=SimpleNamespace(generate_picture=picture),
+        openai=SimpleNamespace(chatgpt_response=text),
+    )
+
+
+async def run(sent, picture, text):
+    await witch_hand.stir_the_cauldron(
+        make_call(sent), FakeState(), db_session=None, ai=make_ai(picture, text)
+    )
+
+
+async def test_providers_run_concurrently(sent):
+    started = []
+    both_started = asyncio.Event()
+
+    async def wait_for_other(name):
+        started.append(name)
+        if len(started) == 2:
+            both_started.set()
+        #  Deadlocks (and times out) if the handler awaits the providers in turn
+        await asyncio.wait_for(both_started.wait(), 1)
+
+    async def picture(**kwargs):
+        await wait_for_other("image")
+        return "photo"
+
+    async def text(**kwargs):
+        await wait_for_other("text")
+        return "reading", "conversation"
+
+    await run(sent, picture, text)
+
+    assert sent.photos == ["photo"]
+    assert sent.texts == ["reading"]
+    assert [g["gen_status"] for g in sent.generations] == ["success"]
+    assert sent.generations[0]["gen_type"] == "image, text"
+
+
+async def test_text_is_delivered_when_image_fails(sent):
+    async def picture(**kwargs):
+        raise GoogleAIUnavailable("down")
+
+    async def text(**kwargs):
+        return "reading", "conversation"
+
+    await run(sent, picture, text)
+
+    assert sent.errors == [GoogleAIUnavailable]
+    assert sent.texts == [PARTIAL_IMAGE_ANSWER, "reading"]
+    assert [g["gen_status"] for g in sent.generations] == ["success"]
+
+
+async def test_text_is_delivered_when_image_is_empty(sent):
+    async def picture(**kwargs):
+        return None
+
+    async def text(**kwargs):
+        return "reading", "conversation"
+
+    await run(sent, picture, text)
+
+    assert sent.photos == []
+    assert sent.texts == [PARTIAL_IMAGE_ANSWER, "reading"]
+    assert [g["gen_status"] for g in sent.generations] == ["success"]
+
+
+async def test_image_is_delivered_when_text_fails(sent):
+    async def picture(**kwargs):
+        return "photo"
+
+    async def text(**kwargs):
+        raise OpenAIIncompleteResponse("max_output_tokens")
+
+    await run(sent, picture, text)
+
+    assert sent.errors == [OpenAIIncompleteResponse]
+    assert sent.texts == [PARTIAL_TEXT_ANSWER]
+    assert sent.photos == ["photo"]
+
+
+async def test_both_failing_sends_one_error(sent):
+    async def picture(**kwargs):
+        return None
+
+    async def text(**kwargs):
+        raise OpenAIIncompleteResponse("max_output_tokens")
+
+    await run(sent, picture, text)
+
+    assert sent.texts == [GENERATION_ERROR_ANSWER]
+    assert sent.photos == []
+    assert [g["gen_status"] for g in sent.generations] == ["error"]
+
+
+async def test_unexpected_error_is_raised_after_delivery(sent):
+    async def picture(**kwargs):
+        raise RuntimeError("bug")
+
+    async def text(**kwargs):
+        return "reading", "conversation"
+
+    with pytest.raises(RuntimeError):
+        await run(sent, picture, text)
+
+    assert sent.texts == ["reading"]